@@ -1,19 +1,72 @@
 from .base_agent import BaseAgent, ChatAgent
-from provider import ProviderFactory
+from .cache import AgentCache
+from .history import Message, SessionLog, SessionLogs
+from .context import (
+    ContextManager,
+    ContextStrategy,
+    FullHistory,
+    SlidingWindow,
+    PinnedSlidingWindow,
+    RollingSummary,
+    TokenCounter
+)
+import os
+from metrics import span
+from typing import List, Optional, Tuple
+from provider import (
+    ProviderFactory,
+    CachingProvider,
+    CoalescingProvider,
+    RoutingProvider,
+    response_cache,
+    single_flight,
+    validation_cache
+)
 
 class AgentFactory:
     """Factory class to create agent instances"""
     
     @staticmethod
-    def create_agent(agent_type: str, provider_name: str, api_key: str, model_name: str) -> BaseAgent:
-        """Create an agent instance with the specified provider"""
+    def create_agent(agent_type: str, provider_name: str, api_key: str, model_name: str,
+                     fallbacks: Optional[List[Tuple[str, str, str]]] = None,
+                     log: Optional[SessionLog] = None) -> BaseAgent:
+        """Create an agent instance with the specified provider
+
+        fallbacks lists equivalent (provider_name, api_key, model_name) targets
+        that requests fail over to when the primary provider is slow or down.
+        log is the shared message log of the chat session the agent answers in.
+        """
         # Create provider first
         provider = ProviderFactory.create_provider(provider_name, api_key, model_name)
         
-        # Validate the model exists
-        if not provider.validate_model():
+        # Validate the model exists (cached per provider, key and model)
+        with span('validation'):
+            valid = validation_cache.validate(provider)
+        if not valid:
             raise ValueError(f"Model '{model_name}' not found for provider '{provider_name}'. Please check the model name.")
         
+        # Route across equivalent models when fallbacks are configured
+        if fallbacks:
+            candidates = [provider]
+            for fallback_provider, fallback_key, fallback_model in fallbacks:
+                fallback = ProviderFactory.create_provider(fallback_provider, fallback_key, fallback_model)
+                if validation_cache.validate(fallback):
+                    candidates.append(fallback)
+            if len(candidates) > 1:
+                provider = RoutingProvider(
+                    candidates,
+                    max_retries=int(os.environ.get('ROUTING_MAX_RETRIES', '1')),
+                    hedge=os.environ.get('ROUTING_HEDGING', '1').lower() in ('1', 'true', 'yes')
+                )
+        
+        # Share one upstream call among concurrent identical requests
+        if os.environ.get('REQUEST_COALESCING', '1').lower() in ('1', 'true', 'yes'):
+            provider = CoalescingProvider(provider, single_flight)
+        
+        # Answer repeated deterministic prompts from the shared response cache (opt-in)
+        if os.environ.get('RESPONSE_CACHE_ENABLED', '').lower() in ('1', 'true', 'yes'):
+            provider = CachingProvider(provider, response_cache)
+        
         # Create agent based on type
         agents = {
             'chat': ChatAgent,
@@ -23,7 +76,7 @@ class AgentFactory:
         if agent_type not in agents:
             agent_type = 'chat'  # default to chat agent
         
-        return agents[agent_type](provider)
+        return agents[agent_type](provider, log=log, model_id=f"{provider_name}/{model_name}")
     
     @staticmethod
     def get_supported_agent_types():
@@ -1,62 +1,95 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional
+from datetime import datetime
+import asyncio
 from provider import ProviderFactory, BaseProvider
+from .context import ContextManager
+from .history import Message, SessionLog
 
 class BaseAgent(ABC):
-    """Base class for all chat agents"""
+    """Base class for all chat agents
     
-    def __init__(self, provider: BaseProvider):
+    The conversation lives in a SessionLog. An agent given the shared log of
+    a chat session only reads its view of it; whoever owns the log (the app)
+    records both sides of every turn. Without one, the agent keeps a private
+    log and records the messages itself.
+    """
+    
+    def __init__(self, provider: BaseProvider, context_manager: Optional[ContextManager] = None,
+                 log: Optional[SessionLog] = None, model_id: Optional[str] = None):
         self.provider = provider
-        self.conversation_history = []
+        self.log = log if log is not None else SessionLog()
+        self.owns_log = log is None
+        self.model_id = model_id
+        self.context_manager = context_manager or ContextManager.for_provider(provider)
+    
+    @property
+    def conversation_history(self) -> List[Message]:
+        """The conversation as seen by this agent's model"""
+        return self.log.view(self.model_id)
     
     def add_message_to_history(self, role: str, content: str):
-        """Add a message to conversation history"""
-        self.conversation_history.append({
-            "role": role,
-            "content": content,
-            "timestamp": self._get_timestamp()
-        })
+        """Add a message to conversation history, unless the log is shared and recorded by its owner"""
+        if self.owns_log:
+            self.log.append(Message(role, content, self._get_timestamp(), self.model_id))
+    
+    def load_history(self, messages: List[Dict[str, Any]]):
+        """Replace conversation history with previously persisted messages"""
+        self.log.replace(messages)
     
     def clear_history(self):
-        """Clear conversation history"""
-        self.conversation_history = []
+        """Clear conversation history, detaching the agent from a shared log"""
+        self.log = SessionLog()
+        self.owns_log = True
     
     def get_conversation_context(self) -> List[Dict[str, str]]:
         """Get conversation context for the model"""
         return [
-            {"role": msg["role"], "content": msg["content"]} 
+            {"role": msg.role, "content": msg.content}
             for msg in self.conversation_history
         ]
     
     @abstractmethod
-    def process_message(self, message: str) -> str:
-        """Process a user message and return agent response"""
+    def process_message(self, message: str, **kwargs) -> str:
+        """Process a user message and return agent response
+
+        Keyword arguments (temperature, max_tokens, cache, ...) are passed
+        through to the provider.
+        """
         pass
     
+    def process_message_stream(self, message: str, **kwargs) -> Iterator[str]:
+        """Process a user message and yield the agent response in chunks"""
+        yield self.process_message(message, **kwargs)
+    
+    async def aprocess_message(self, message: str, **kwargs) -> str:
+        """Async counterpart of process_message; runs it in a worker thread by default"""
+        return await asyncio.to_thread(self.process_message, message, **kwargs)
+    
+    async def aprocess_message_stream(self, message: str, **kwargs) -> AsyncIterator[str]:
+        """Async counterpart of process_message_stream"""
+        yield await self.aprocess_message(message, **kwargs)
+    
     def _get_timestamp(self) -> str:
         """Get current timestamp"""
-        from datetime import datetime
         return datetime.now().isoformat()
 
 class ChatAgent(BaseAgent):
     """Basic chat agent for general conversation"""
     
-    def __init__(self, provider: BaseProvider):
-        super().__init__(provider)
+    def __init__(self, provider: BaseProvider, context_manager: Optional[ContextManager] = None,
+                 log: Optional[SessionLog] = None, model_id: Optional[str] = None):
+        super().__init__(provider, context_manager, log, model_id)
         self.system_prompt = "You are a helpful AI assistant. Provide clear, accurate, and helpful responses."
     
-    def process_message(self, message: str) -> str:
+    def process_message(self, message: str, **kwargs) -> str:
         """Process user message and generate response"""
         try:
             # Add user message to history
             self.add_message_to_history("user", message)
             
-            # Prepare context with system prompt
-            context = [{"role": "system", "content": self.system_prompt}]
-            context.extend(self.get_conversation_context())
-            
             # Generate response
-            response = self.provider.generate_response(context)
+            response = self.provider.generate_response(self._build_context(), **kwargs)
             
             # Add assistant response to history
             self.add_message_to_history("assistant", response)
@@ -66,4 +99,61 @@ class ChatAgent(BaseAgent):
         except Exception as e:
             error_msg = f"Error generating response: {str(e)}"
             self.add_message_to_history("assistant", error_msg)
-            return error_msg
\ No newline at end of file
+            return error_msg
+    
+    def process_message_stream(self, message: str, **kwargs) -> Iterator[str]:
+        """Process user message and yield response deltas as the provider streams them"""
+        self.add_message_to_history("user", message)
+        
+        chunks = []
+        try:
+            for delta in self.provider.stream_response(self._build_context(), **kwargs):
+                chunks.append(delta)
+                yield delta
+        except Exception as e:
+            error_msg = f"Error generating response: {str(e)}"
+            chunks.append(error_msg)
+            yield error_msg
+        finally:
+            # Record whatever was produced, even if the client disconnected mid-stream
+            self.add_message_to_history("assistant", "".join(chunks))
+    
+    async def aprocess_message(self, message: str, **kwargs) -> str:
+        """Process user message with the provider's async client"""
+        try:
+            self.add_message_to_history("user", message)
+            
+            response = await self.provider.agenerate_response(await self._abuild_context(), **kwargs)
+            
+            self.add_message_to_history("assistant", response)
+            
+            return response
+            
+        except Exception as e:
+            error_msg = f"Error generating response: {str(e)}"
+            self.add_message_to_history("assistant", error_msg)
+            return error_msg
+    
+    async def aprocess_message_stream(self, message: str, **kwargs) -> AsyncIterator[str]:
+        """Process user message and yield response deltas from the provider's async stream"""
+        self.add_message_to_history("user", message)
+        
+        chunks = []
+        try:
+            async for delta in self.provider.astream_response(await self._abuild_context(), **kwargs):
+                chunks.append(delta)
+                yield delta
+        except Exception as e:
+            error_msg = f"Error generating response: {str(e)}"
+            chunks.append(error_msg)
+            yield error_msg
+        finally:
+            self.add_message_to_history("assistant", "".join(chunks))
+    
+    def _build_context(self) -> List[Dict[str, str]]:
+        """Prepare context with system prompt, trimmed to the model's token budget"""
+        return self.context_manager.build(self.system_prompt, self.conversation_history)
+    
+    async def _abuild_context(self) -> List[Dict[str, str]]:
+        """Async counterpart of _build_context; summarizing awaits the provider instead of blocking"""
+        return await self.context_manager.abuild(self.system_prompt, self.conversation_history)
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+from .base_agent import BaseAgent
+
+class AgentCache:
+    """Bounded LRU cache of agents with idle expiry
+
+    Entries are kept in least-recently-used order, so both capacity eviction
+    and idle expiry only ever look at the front of the queue. Evicted agents
+    hold no state that is not also persisted with the session, so callers
+    simply rebuild them on the next miss.
+    """
+    
+    def __init__(self, capacity: int = 256, idle_ttl: float = 1800):
+        self.capacity = capacity
+        self.idle_ttl = idle_ttl
+        self._entries = OrderedDict()  # key -> [agent, last_used]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get_or_create(self, key: Hashable, factory: Callable[[], BaseAgent]) -> BaseAgent:
+        """Return the cached agent for key, building it with factory on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = now
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        # Build outside the lock: agent creation may call the provider
+        agent = factory()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another request built the same agent concurrently; keep the first one
+                return entry[0]
+            self._entries[key] = [agent, now]
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return agent
+    
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches predicate and return how many were dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit, miss and eviction counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'capacity': self.capacity,
+                'idle_ttl': self.idle_ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _expire(self, now: float):
+        """Drop entries idle for longer than idle_ttl (caller holds the lock)"""
+        while self._entries:
+            key, (agent, last_used) = next(iter(self._entries.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            del self._entries[key]
+            self.expirations += 1
@@ -0,0 +1,290 @@
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional
+from .history import Message
+
+# Context window sizes by model name prefix; the longest matching prefix wins
+MODEL_CONTEXT_BUDGETS = {
+    'gpt-3.5': 16000,
+    'gpt-4': 8000,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4.1': 1000000,
+    'o1': 128000,
+    'o3': 200000,
+    'claude': 200000,
+    'deepseek': 64000,
+}
+DEFAULT_CONTEXT_BUDGET = 8000
+
+# Tokens kept free for the model's reply (the providers default to max_tokens=1000)
+RESPONSE_RESERVE = 1000
+
+# Per-message overhead for role markers and separators
+MESSAGE_OVERHEAD = 4
+
+# Fraction of the budget a sliding window shrinks to when it has to move
+DEFAULT_TRIM_TO = 0.75
+
+class TokenCounter:
+    """Count tokens with tiktoken when it is installed, otherwise estimate ~4 characters per token"""
+    
+    def __init__(self):
+        self._encoding = None
+        self._loaded = False
+    
+    def count(self, text: str) -> int:
+        """Return the number of tokens in text"""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+    
+    def message_tokens(self, message: Message) -> int:
+        """Return the token count of a history message, caching it on the message"""
+        if message.tokens is None:
+            message.tokens = self.count(message.content) + MESSAGE_OVERHEAD
+        return message.tokens
+    
+    def _get_encoding(self):
+        if not self._loaded:
+            self._loaded = True
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding('cl100k_base')
+            except Exception:
+                self._encoding = None
+        return self._encoding
+
+token_counter = TokenCounter()
+
+class ContextStrategy(ABC):
+    """Base class for strategies that choose which history messages are sent to the model"""
+    
+    @abstractmethod
+    def select(self, history: List[Message], budget: int, counter: TokenCounter) -> List[Message]:
+        """Return the history messages to send, within budget tokens where possible"""
+        pass
+    
+    async def aselect(self, history: List[Message], budget: int, counter: TokenCounter) -> List[Message]:
+        """Async counterpart of select, for strategies that call the model"""
+        return self.select(history, budget, counter)
+    
+    def summary(self) -> Optional[str]:
+        """Return a summary of messages left out of the context, if the strategy keeps one"""
+        return None
+
+class FullHistory(ContextStrategy):
+    """Send the whole conversation every turn"""
+    
+    def select(self, history, budget, counter):
+        return list(history)
+
+class SlidingWindow(ContextStrategy):
+    """Send the most recent messages that fit in the token budget
+
+    The window always starts on a user message, and the latest message is
+    always included even if it alone exceeds the budget. The start of the
+    window only moves when the window outgrows the budget, and then it skips
+    ahead until the window fits in trim_to of the budget, so the context
+    keeps the same prefix for several turns and provider prompt caches hit.
+    """
+    
+    def __init__(self, trim_to: float = 1.0):
+        self.trim_to = trim_to
+        self._start = 0
+    
+    def select(self, history, budget, counter):
+        if self._start >= len(history):
+            self._start = 0  # the history was cleared or replaced
+        used = sum(counter.message_tokens(message) for message in history[self._start:])
+        if used > budget:
+            self._start = self._fit(history, budget * self.trim_to, counter)
+        
+        start = self._start
+        while start < len(history) - 1 and history[start].role != 'user':
+            start += 1
+        return list(history[start:])
+    
+    @staticmethod
+    def _fit(history, budget, counter) -> int:
+        """Return the start of the longest suffix of history within budget tokens"""
+        start = len(history)
+        used = 0
+        while start > 0:
+            tokens = counter.message_tokens(history[start - 1])
+            if used + tokens > budget and start < len(history):
+                break
+            used += tokens
+            start -= 1
+        return start
+
+class PinnedSlidingWindow(ContextStrategy):
+    """Keep the first messages of the conversation and slide a window over the rest"""
+    
+    def __init__(self, pinned: int = 2, trim_to: float = 1.0):
+        self.pinned = pinned
+        self.window = SlidingWindow(trim_to)
+    
+    def select(self, history, budget, counter):
+        if sum(counter.message_tokens(message) for message in history) <= budget:
+            return list(history)
+        
+        pinned = list(history[:self.pinned])
+        pinned_tokens = sum(counter.message_tokens(message) for message in pinned)
+        return pinned + self.window.select(history[self.pinned:], budget - pinned_tokens, counter)
+
+class RollingSummary(ContextStrategy):
+    """Slide a window over recent messages and fold older turns into a running summary
+
+    The summary is only extended when messages drop out of the window, so the
+    summarizer runs once per evicted stretch of history rather than every turn.
+    aselect awaits asummarize when given, so async agents do not block the
+    event loop on the summarizing call.
+    """
+    
+    def __init__(self, summarize: Callable[[Optional[str], List[Message]], str], summary_budget: int = 500,
+                 trim_to: float = 1.0,
+                 asummarize: Optional[Callable[[Optional[str], List[Message]], Awaitable[str]]] = None):
+        self.summarize = summarize
+        self.asummarize = asummarize
+        self.summary_budget = summary_budget
+        self.window = SlidingWindow(trim_to)
+        self._summary = None
+        self._summarized = 0  # number of leading history messages covered by the summary
+    
+    def select(self, history, budget, counter):
+        if sum(counter.message_tokens(message) for message in history) <= budget:
+            return list(history)
+        
+        window, cutoff = self._window(history, budget, counter)
+        if cutoff > self._summarized:
+            try:
+                self._fold(self.summarize(self._summary, list(history[self._summarized:cutoff])), cutoff)
+            except Exception as e:
+                print(f"Error summarizing conversation: {e}")
+        return window
+    
+    async def aselect(self, history, budget, counter):
+        if sum(counter.message_tokens(message) for message in history) <= budget:
+            return list(history)
+        
+        window, cutoff = self._window(history, budget, counter)
+        if cutoff > self._summarized:
+            evicted = list(history[self._summarized:cutoff])
+            try:
+                if self.asummarize is not None:
+                    summary = await self.asummarize(self._summary, evicted)
+                else:
+                    summary = await asyncio.to_thread(self.summarize, self._summary, evicted)
+                self._fold(summary, cutoff)
+            except Exception as e:
+                print(f"Error summarizing conversation: {e}")
+        return window
+    
+    def summary(self):
+        return self._summary
+    
+    def _window(self, history, budget, counter):
+        """Return the window and the number of leading messages left out of it"""
+        window = self.window.select(history, budget - self.summary_budget, counter)
+        return window, len(history) - len(window)
+    
+    def _fold(self, summary, cutoff):
+        # A concurrent turn may already have summarized further
+        if cutoff > self._summarized:
+            self._summary = summary
+            self._summarized = cutoff
+
+class ContextManager:
+    """Builds the model context from the system prompt and conversation history"""
+    
+    def __init__(self, strategy: ContextStrategy, budget: int, counter: TokenCounter = token_counter):
+        self.strategy = strategy
+        self.budget = budget
+        self.counter = counter
+    
+    @classmethod
+    def for_provider(cls, provider, strategy_name: Optional[str] = None) -> 'ContextManager':
+        """Create a context manager with the configured strategy and the model's budget"""
+        strategy_name = strategy_name or os.environ.get('CONTEXT_STRATEGY', 'pinned')
+        trim_to = float(os.environ.get('CONTEXT_TRIM_TO', DEFAULT_TRIM_TO))
+        strategies = {
+            'full': FullHistory,
+            'sliding': lambda: SlidingWindow(trim_to),
+            'pinned': lambda: PinnedSlidingWindow(trim_to=trim_to),
+            'summary': lambda: RollingSummary(
+                lambda summary, messages: summarize_with(provider, summary, messages),
+                trim_to=trim_to,
+                asummarize=lambda summary, messages: asummarize_with(provider, summary, messages)
+            ),
+        }
+        
+        if strategy_name not in strategies:
+            raise ValueError(f"Unsupported context strategy: {strategy_name}")
+        
+        return cls(strategies[strategy_name](), get_context_budget(provider.model_name))
+    
+    def build(self, system_prompt: str, history: List[Message]) -> List[Dict[str, str]]:
+        """Return the messages to send to the provider for the next turn"""
+        messages = self.strategy.select(history, self._history_budget(system_prompt), self.counter)
+        return self._context(system_prompt, messages)
+    
+    async def abuild(self, system_prompt: str, history: List[Message]) -> List[Dict[str, str]]:
+        """Async counterpart of build"""
+        messages = await self.strategy.aselect(history, self._history_budget(system_prompt), self.counter)
+        return self._context(system_prompt, messages)
+    
+    def _history_budget(self, system_prompt: str) -> int:
+        return self.budget - RESPONSE_RESERVE - self.counter.count(system_prompt) - MESSAGE_OVERHEAD
+    
+    def _context(self, system_prompt: str, messages: List[Message]) -> List[Dict[str, str]]:
+        summary = self.strategy.summary()
+        if summary:
+            system_prompt = f"{system_prompt}\n\nSummary of the earlier conversation:\n{summary}"
+        
+        context = [{"role": "system", "content": system_prompt}]
+        context.extend({"role": msg.role, "content": msg.content} for msg in messages)
+        return context
+
+def get_context_budget(model_name: str) -> int:
+    """Return the context token budget for a model
+
+    CONTEXT_TOKEN_BUDGET overrides the budget for every model, and
+    CONTEXT_BUDGETS (a JSON object of model name prefix to tokens) extends
+    or overrides MODEL_CONTEXT_BUDGETS.
+    """
+    if os.environ.get('CONTEXT_TOKEN_BUDGET'):
+        return int(os.environ['CONTEXT_TOKEN_BUDGET'])
+    
+    budgets = dict(MODEL_CONTEXT_BUDGETS)
+    if os.environ.get('CONTEXT_BUDGETS'):
+        budgets.update(json.loads(os.environ['CONTEXT_BUDGETS']))
+    
+    matches = [prefix for prefix in budgets if model_name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_BUDGET
+    return budgets[max(matches, key=len)]
+
+def summary_prompt(previous_summary: Optional[str], messages: List[Message]) -> str:
+    """Build the prompt asking the model to fold messages into the running summary"""
+    transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+    prompt = (
+        "Update the summary of a conversation between a user and an AI assistant. "
+        "Keep facts, names, decisions and open questions; drop small talk. "
+        "Reply with the summary only.\n\n"
+    )
+    if previous_summary:
+        prompt += f"Current summary:\n{previous_summary}\n\n"
+    prompt += f"New messages:\n{transcript}"
+    return prompt
+
+def summarize_with(provider, previous_summary: Optional[str], messages: List[Message]) -> str:
+    """Ask the provider to fold messages into the running summary"""
+    return provider.generate_response(summary_prompt(previous_summary, messages), max_tokens=500)
+
+async def asummarize_with(provider, previous_summary: Optional[str], messages: List[Message]) -> str:
+    """Async counterpart of summarize_with"""
+    return await provider.agenerate_response(summary_prompt(previous_summary, messages), max_tokens=500)
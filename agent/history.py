@@ -0,0 +1,141 @@
+import sys
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+class Message:
+    """One chat message; role and model names are interned, so every message shares one copy of them"""
+    
+    __slots__ = ('id', 'role', 'content', 'timestamp', 'model', 'tokens')
+    
+    def __init__(self, role: str, content: str, timestamp: Optional[str] = None,
+                 model: Optional[str] = None, id: Optional[int] = None):
+        self.id = id
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = timestamp
+        self.model = sys.intern(model) if model else None
+        self.tokens = None  # token count, filled in by the context manager on first use
+    
+    @classmethod
+    def from_dict(cls, message: Dict[str, Any]) -> 'Message':
+        return cls(message['role'], message['content'], message.get('timestamp'), message.get('model'), message.get('id'))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        message = {'role': self.role, 'content': self.content, 'timestamp': self.timestamp}
+        if self.model:
+            message['model'] = self.model
+        if self.id is not None:
+            message['id'] = self.id
+        return message
+
+class SessionLog:
+    """Append-only message log of one chat session, shared by the agents of all its models
+
+    Agents read a per-model view instead of keeping their own copy, so a
+    conversation is held in memory once however many models take part, and
+    a model that joins later sees the turns answered by the others.
+    """
+    
+    def __init__(self, messages: Iterable[Dict[str, Any]] = ()):
+        self._messages = [Message.from_dict(message) for message in messages]
+        self._lock = threading.Lock()
+    
+    @property
+    def last_id(self) -> Optional[int]:
+        """Store id of the latest message, or None if no message has one"""
+        with self._lock:
+            return self._last_id()
+    
+    def append(self, message: Message):
+        """Add a message; a stored message already in the log (e.g. after a reload) is skipped"""
+        with self._lock:
+            last_id = self._last_id()
+            if message.id is not None and last_id is not None and message.id <= last_id:
+                return
+            self._messages.append(message)
+    
+    def replace(self, messages: Iterable[Dict[str, Any]]):
+        """Replace the log with messages loaded from the session store"""
+        loaded = [Message.from_dict(message) for message in messages]
+        with self._lock:
+            self._messages = loaded
+    
+    def view(self, model: Optional[str] = None) -> List[Message]:
+        """The conversation as seen by model, as alternating user and assistant messages
+
+        Each user message is followed by model's answer to it, or by the first
+        answer if model did not answer it (a fan-out request has several).
+        Other models' answers to the latest user message are left out, so a
+        model taking part in a fan-out turn still sees that turn's question last.
+        """
+        with self._lock:
+            messages = list(self._messages)
+        
+        view = []
+        question = answer = None
+        for message in messages:
+            if message.role == 'user':
+                if question is not None and answer is not None:
+                    view.extend((question, answer))
+                question, answer = message, None
+            elif question is not None and (answer is None or (message.model == model and answer.model != model)):
+                answer = message
+        
+        if question is not None:
+            view.append(question)
+            if answer is not None and answer.model == model:
+                view.append(answer)
+        return view
+    
+    def __len__(self) -> int:
+        return len(self._messages)
+    
+    def _last_id(self) -> Optional[int]:
+        for message in reversed(self._messages):
+            if message.id is not None:
+                return message.id
+        return None
+
+class SessionLogs:
+    """Live session logs by session id
+
+    A log stays in memory only while an agent that reads it is cached, and is
+    reloaded from the store when another worker process has appended to the
+    session since it was loaded.
+    """
+    
+    def __init__(self):
+        self._logs = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+    
+    def get(self, session_id: str, load: Callable[[], List[Dict[str, Any]]], version: Optional[int] = None) -> SessionLog:
+        """Return the live log of a session, loading it with load() if there is none or it is behind version"""
+        with self._lock:
+            log = self._logs.get(session_id)
+        
+        if log is None:
+            # Load outside the lock; if another request loaded the session meanwhile, keep that log
+            loaded = SessionLog(load())
+            with self._lock:
+                log = self._logs.setdefault(session_id, loaded)
+        elif version is not None and log.last_id != version:
+            log.replace(load())
+        return log
+    
+    def record(self, session_id: str, message: Dict[str, Any]):
+        """Append a stored message to the session's live log, if it has one"""
+        with self._lock:
+            log = self._logs.get(session_id)
+        if log is not None:
+            log.append(Message.from_dict(message))
+    
+    def discard(self, session_id: str):
+        with self._lock:
+            self._logs.pop(session_id, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of live logs and the messages they hold"""
+        with self._lock:
+            logs = list(self._logs.values())
+        return {'sessions': len(logs), 'messages': sum(len(log) for log in logs)}
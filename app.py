@@ -1,13 +1,28 @@
-from flask import Flask, request, jsonify, render_template, session, Response
+from flask import Flask, request, jsonify, render_template, session, Response, send_file
 from flask_cors import CORS
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
-from dotenv import load_dotenv
-from agent import AgentFactory
-from provider import ProviderFactory
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from agent import AgentFactory, AgentCache, SessionLogs
+from provider import (
+    ProviderFactory,
+    admission_registry,
+    answered_by,
+    client_registry,
+    provider_registry,
+    response_cache,
+    routing_stats,
+    single_flight,
+    validation_cache
+)
+from storage import SessionLocks, StoreFactory
+from batch import BatchJobManager
+from metrics import RequestTrace, render as render_metrics, span
 
 load_dotenv()
 
@@ -17,57 +32,271 @@ CORS(app)
 
 # Persistent storage files
 API_KEYS_FILE = 'api_keys.json'
-CHAT_SESSIONS_FILE = 'chat_sessions.json'
+CHAT_SESSIONS_FILE = 'chat_sessions.json'  # legacy format, migrated into the session store
+CHAT_SESSIONS_DB = os.environ.get('CHAT_SESSIONS_DB', 'chat_sessions.db')
+SESSION_STORE = os.environ.get('SESSION_STORE', 'sqlite')
+KEY_STORE = os.environ.get('KEY_STORE', 'file')
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+AGENT_CACHE_CAPACITY = int(os.environ.get('AGENT_CACHE_CAPACITY', '256'))
+AGENT_CACHE_TTL = float(os.environ.get('AGENT_CACHE_TTL', '1800'))
+BATCH_JOBS_DIR = os.environ.get('BATCH_JOBS_DIR', 'batch_jobs')
+SESSION_ARCHIVE_DB = os.environ.get('SESSION_ARCHIVE_DB') or None
+SESSION_ARCHIVE_AFTER = float(os.environ.get('SESSION_ARCHIVE_AFTER', str(7 * 86400)))
+SESSION_ARCHIVE_INTERVAL = float(os.environ.get('SESSION_ARCHIVE_INTERVAL', '3600'))
+
+# Equivalent models to fail over to, e.g. {"openai/gpt-4o": ["claude/claude-sonnet-4-5"]}
+PROVIDER_FALLBACKS = json.loads(os.environ.get('PROVIDER_FALLBACKS') or '{}')
 
-# In-memory storage for API keys and chat sessions
+# In-memory copy of the API keys, reloaded whenever another worker changes the key store
 api_keys = {}
-chat_sessions = {}
-agents = {}  # Store agent instances per session
+api_keys_version = None
+api_keys_lock = threading.Lock()
+
+# Agent instances per (session, provider, model), rebuilt from the session store on a miss
+agents = AgentCache(capacity=AGENT_CACHE_CAPACITY, idle_ttl=AGENT_CACHE_TTL)
+
+# One shared message log per active session, read by the agents of all its models
+session_logs = SessionLogs()
+
+# Offline prompt jobs submitted through /api/batch
+batch_jobs = BatchJobManager(BATCH_JOBS_DIR)
+
+# Turns of one session run one at a time; different sessions run in parallel
+session_locks = SessionLocks()
+
+# Response latency per provider/model, as measured by the fan-out endpoint
+model_latency = {}
+model_latency_lock = threading.Lock()
+
+# Chat sessions live in a pluggable store so each message is an O(1) append
+session_store = StoreFactory.create_store(
+    SESSION_STORE,
+    **({'path': CHAT_SESSIONS_DB, 'archive_path': SESSION_ARCHIVE_DB} if SESSION_STORE == 'sqlite' else {}),
+    **({'url': REDIS_URL} if SESSION_STORE == 'redis' else {})
+)
+
+# Key configuration shared by every worker process (and host, with redis)
+key_store = StoreFactory.create_key_store(
+    KEY_STORE,
+    **({'path': API_KEYS_FILE} if KEY_STORE == 'file' else {'url': REDIS_URL})
+)
 
 def load_api_keys():
-    """Load API keys from persistent storage"""
-    global api_keys
+    """Reload API keys from the key store if they changed since the last load"""
+    global api_keys, api_keys_version
     try:
-        if os.path.exists(API_KEYS_FILE):
-            with open(API_KEYS_FILE, 'r') as f:
-                api_keys = json.load(f)
+        version = key_store.version()
+        if version == api_keys_version:
+            return
+        with api_keys_lock:
+            if version == api_keys_version:
+                return
+            loaded = key_store.load()
+            # Agents built with a key that another worker replaced or removed must not be reused
+            changed = {provider for provider in set(api_keys) | set(loaded) if api_keys.get(provider) != loaded.get(provider)}
+            api_keys, api_keys_version = loaded, version
+            if changed:
+                agents.invalidate(lambda key: key[1] in changed)
                 print(f"Loaded {len(api_keys)} API key configurations from storage")
     except Exception as e:
         print(f"Error loading API keys: {e}")
-        api_keys = {}
-
-def save_api_keys():
-    """Save API keys to persistent storage"""
-    try:
-        with open(API_KEYS_FILE, 'w') as f:
-            json.dump(api_keys, f, indent=2)
-        print("API keys saved to storage")
-    except Exception as e:
-        print(f"Error saving API keys: {e}")
 
-def load_chat_sessions():
-    """Load chat sessions from persistent storage"""
-    global chat_sessions
+def migrate_legacy_chat_sessions():
+    """Import chat sessions from the old JSON file into the session store (runs once)"""
     try:
         if os.path.exists(CHAT_SESSIONS_FILE):
             with open(CHAT_SESSIONS_FILE, 'r') as f:
-                chat_sessions = json.load(f)
-                print(f"Loaded {len(chat_sessions)} chat sessions from storage")
+                legacy_sessions = json.load(f)
+            imported = session_store.import_sessions(legacy_sessions)
+            os.replace(CHAT_SESSIONS_FILE, CHAT_SESSIONS_FILE + '.migrated')
+            print(f"Migrated {imported} chat sessions from {CHAT_SESSIONS_FILE}")
     except Exception as e:
-        print(f"Error loading chat sessions: {e}")
-        chat_sessions = {}
+        print(f"Error migrating chat sessions: {e}")
 
-def save_chat_sessions():
-    """Save chat sessions to persistent storage"""
-    try:
-        with open(CHAT_SESSIONS_FILE, 'w') as f:
-            json.dump(chat_sessions, f, indent=2)
-    except Exception as e:
-        print(f"Error saving chat sessions: {e}")
+def archive_idle_sessions():
+    """Move sessions idle for SESSION_ARCHIVE_AFTER seconds to the compressed archive tier, periodically"""
+    while True:
+        try:
+            idle_before = (datetime.now() - timedelta(seconds=SESSION_ARCHIVE_AFTER)).isoformat()
+            archived = 0
+            while True:
+                count = session_store.archive_idle(idle_before, limit=100)
+                archived += count
+                if count < 100:
+                    break
+            if archived:
+                print(f"Archived {archived} idle chat sessions")
+        except Exception as e:
+            print(f"Error archiving chat sessions: {e}")
+        time.sleep(SESSION_ARCHIVE_INTERVAL)
 
-# Load data on startup
-load_api_keys()
-load_chat_sessions()
+# Stores are loaded by the first request rather than at import, so a new worker accepts connections at once
+stores_ready = False
+stores_ready_lock = threading.Lock()
+
+def prepare_stores():
+    """Run the one-off store setup of this process, then pick up API key changes"""
+    global stores_ready
+    if not stores_ready:
+        with stores_ready_lock:
+            if not stores_ready:
+                migrate_legacy_chat_sessions()
+                if SESSION_ARCHIVE_AFTER > 0 and session_store.supports_archive:
+                    threading.Thread(target=archive_idle_sessions, daemon=True, name='session-archiver').start()
+                stores_ready = True
+    load_api_keys()
+
+@app.before_request
+def refresh_api_keys():
+    prepare_stores()
+
+# Shared by the WSGI routes below and the asyncio server in asgi.py
+SSE_CONTENT_TYPE = 'text/event-stream; charset=utf-8'
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def validate_chat_request(data):
+    """Validate a chat message request body, returning an error message or None"""
+    data = data or {}
+    message = data.get('message')
+    model_provider = data.get('model_provider')
+    model_name = data.get('model_name')
+    
+    if not message or not model_provider or not model_name:
+        return 'Message, model_provider, and model_name are required'
+    
+    # Check if API key exists for the provider
+    if model_provider not in api_keys:
+        return f'No API key configured for {model_provider}'
+    
+    # Check if model is in the configured models list
+    if model_name not in api_keys[model_provider]['models']:
+        return f'Model "{model_name}" not configured for provider "{model_provider}"'
+    
+    return None
+
+def generation_options(data, session_id=None):
+    """Extract optional generation parameters (temperature, max_tokens, cache) from a request body"""
+    options = {'session_id': session_id} if session_id else {}
+    if data.get('temperature') is not None:
+        options['temperature'] = float(data['temperature'])
+    if data.get('max_tokens') is not None:
+        options['max_tokens'] = int(data['max_tokens'])
+    if data.get('cache'):
+        options['cache'] = True
+    return options
+
+def get_agent(session_id, model_provider, model_name):
+    """Get or create agent for this session and model"""
+    # The log is reloaded from the store if another worker appended to the session since it was loaded
+    log = session_logs.get(
+        session_id,
+        lambda: session_store.get_messages(session_id),
+        version=session_store.last_message_id(session_id)
+    )
+    
+    def create_agent():
+        with span('create_agent'):
+            return AgentFactory.create_agent(
+                'chat',  # agent type
+                model_provider,
+                api_keys[model_provider]['key'],
+                model_name,
+                fallbacks=fallbacks_for(model_provider, model_name),
+                log=log
+            )
+    
+    # On a miss the lookup includes the nested create_agent span
+    with span('agent_cache'):
+        return agents.get_or_create((session_id, model_provider, model_name), create_agent)
+
+def fallbacks_for(model_provider, model_name):
+    """Return the configured fallback targets of a model whose provider has an API key"""
+    fallbacks = []
+    for target in PROVIDER_FALLBACKS.get(f"{model_provider}/{model_name}", []):
+        fallback_provider, _, fallback_model = target.partition('/')
+        if fallback_provider in api_keys:
+            fallbacks.append((fallback_provider, api_keys[fallback_provider]['key'], fallback_model))
+    return fallbacks
+
+def add_user_message(session_id, message):
+    """Add user message to session"""
+    user_message = {
+        'role': 'user',
+        'content': message,
+        'timestamp': datetime.now().isoformat()
+    }
+    with span('persist'):
+        session_store.append_message(session_id, user_message)
+        session_logs.record(session_id, user_message)
+    return user_message
+
+def new_assistant_message(content, model_provider, model_name):
+    """Build an assistant message record, attributed to the model that actually answered"""
+    return {
+        'role': 'assistant',
+        'content': str(content),
+        'timestamp': datetime.now().isoformat(),
+        'model': answered_by(content, f"{model_provider}/{model_name}")
+    }
+
+def add_assistant_message(session_id, message, assistant_message):
+    """Add assistant response to session"""
+    with span('persist'):
+        message_count = session_store.append_message(session_id, assistant_message)
+        session_logs.record(session_id, assistant_message)
+        
+        # Update chat title if this is the first exchange
+        if message_count == 2:
+            session_store.update_title(session_id, message[:50] + ('...' if len(message) > 50 else ''))
+
+def parse_fanout_targets(data):
+    """Validate a fan-out request body, returning (targets, error message)
+    
+    Targets are deduplicated (provider, model) pairs in request order.
+    """
+    targets = []
+    for target in (data or {}).get('targets') or []:
+        pair = (target.get('provider'), target.get('model'))
+        error = validate_chat_request({'message': data.get('message'), 'model_provider': pair[0], 'model_name': pair[1]})
+        if error:
+            return None, error
+        if pair not in targets:
+            targets.append(pair)
+    
+    if not targets:
+        return None, 'At least one target with provider and model is required'
+    return targets, None
+
+def record_model_latency(model_id, latency_ms):
+    """Record the response latency of a model for /api/stats"""
+    with model_latency_lock:
+        stats = model_latency.setdefault(model_id, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0})
+        stats['count'] += 1
+        stats['total_ms'] += latency_ms
+        stats['max_ms'] = max(stats['max_ms'], latency_ms)
+        stats['last_ms'] = latency_ms
+
+def fanout_result(session_id, message, model_provider, model_name, content, latency_ms):
+    """Persist one fan-out answer and build its event payload"""
+    assistant_message = new_assistant_message(content, model_provider, model_name)
+    add_assistant_message(session_id, message, assistant_message)
+    record_model_latency(assistant_message['model'], latency_ms)
+    return dict(assistant_message, latency_ms=round(latency_ms, 1))
+
+def conditional_response(etag, build_response):
+    """Answer 304 Not Modified if the client holds etag, otherwise the response from build_response()"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = build_response()
+    response.set_etag(etag)
+    # Browsers revalidate with If-None-Match on every fetch instead of serving a stale copy
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def sse_event(event_type, data):
+    """Format a server-sent event"""
+    return f"data: {json.dumps({'type': event_type, 'data': data})}\n\n"
 
 @app.route('/')
 def index():
@@ -102,228 +331,346 @@ def manage_api_keys():
         # Test the API key with the first model
         try:
             test_provider = ProviderFactory.create_provider(provider, api_key, models[0])
-            if not test_provider.validate_model():
+            if not validation_cache.validate(test_provider):
                 return jsonify({'error': f'Model "{models[0]}" not found for provider "{provider}". Please check the model name.'}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to validate API key: {str(e)}'}), 400
         
-        # Store API key with associated models
-        api_keys[provider] = {
+        # Store API key with associated models; other workers pick it up on their next request
+        key_store.save(provider, {
             'key': api_key,
             'models': models,
             'created_at': datetime.now().isoformat()
-        }
-        
-        save_api_keys()  # Save to persistent storage
+        })
+        load_api_keys()
         
         return jsonify({'message': f'API key for {provider} saved successfully'})
     
     elif request.method == 'DELETE':
         provider = request.args.get('provider')
-        if provider in api_keys:
-            del api_keys[provider]
-            save_api_keys()  # Save changes to persistent storage
+        if key_store.delete(provider):
+            load_api_keys()
             return jsonify({'message': f'API key for {provider} deleted'})
         return jsonify({'error': 'Provider not found'}), 404
 
+@app.route('/api/providers', methods=['GET'])
+def get_providers():
+    """List the provider names keys can be configured for, including installed plugins"""
+    return jsonify(ProviderFactory.get_supported_providers())
+
 @app.route('/api/chat/new', methods=['POST'])
 def new_chat():
     """Create a new chat session"""
     session_id = str(uuid.uuid4())
-    chat_sessions[session_id] = {
-        'id': session_id,
-        'created_at': datetime.now().isoformat(),
-        'messages': [],
-        'title': 'New Chat'
-    }
-    save_chat_sessions()  # Save to persistent storage
+    session_store.create_session(session_id, 'New Chat', datetime.now().isoformat())
     return jsonify({'session_id': session_id})
 
 @app.route('/api/chat/<session_id>/messages', methods=['GET', 'POST'])
 def chat_messages(session_id):
     """Get or send messages in a chat session"""
-    if session_id not in chat_sessions:
+    if not session_store.has_session(session_id):
         return jsonify({'error': 'Chat session not found'}), 404
     
     if request.method == 'GET':
-        return jsonify(chat_sessions[session_id]['messages'])
-    
-    elif request.method == 'POST':
-        data = request.get_json()
-        message = data.get('message')
-        model_provider = data.get('model_provider')
-        model_name = data.get('model_name')
-        
-        if not message or not model_provider or not model_name:
-            return jsonify({'error': 'Message, model_provider, and model_name are required'}), 400
+        try:
+            since, before, limit = (
+                int(request.args[name]) if request.args.get(name) else None
+                for name in ('since', 'before', 'limit')
+            )
+        except ValueError:
+            return jsonify({'error': 'since, before and limit must be integers'}), 400
         
-        # Check if API key exists for the provider
-        if model_provider not in api_keys:
-            return jsonify({'error': f'No API key configured for {model_provider}'}), 400
+        # Messages are append-only, so the count identifies the state of a page
+        message_count = session_store.get_session(session_id)['message_count']
+        etag = f"{message_count}-{since}-{before}-{limit}"
         
-        # Check if model is in the configured models list
-        if model_name not in api_keys[model_provider]['models']:
-            return jsonify({'error': f'Model "{model_name}" not configured for provider "{model_provider}"'}), 400
+        def build_page():
+            messages, has_more = session_store.get_message_page(session_id, since=since, before=before, limit=limit)
+            response = jsonify(messages)
+            response.headers['X-Has-More'] = 'true' if has_more else 'false'
+            return response
         
-        try:
-            # Get or create agent for this session and model
-            agent_key = f"{session_id}_{model_provider}_{model_name}"
-            
-            if agent_key not in agents:
-                agents[agent_key] = AgentFactory.create_agent(
-                    'chat',  # agent type
-                    model_provider,
-                    api_keys[model_provider]['key'],
-                    model_name
-                )
-            
-            agent = agents[agent_key]
-            
-            # Add user message to session
-            user_message = {
-                'role': 'user',
-                'content': message,
-                'timestamp': datetime.now().isoformat()
-            }
-            chat_sessions[session_id]['messages'].append(user_message)
-            
-            # Generate response using the agent
-            response = agent.process_message(message)
-            
-            # Add assistant response to session
-            assistant_message = {
-                'role': 'assistant',
-                'content': str(response),
-                'timestamp': datetime.now().isoformat(),
-                'model': f"{model_provider}/{model_name}"
-            }
-            chat_sessions[session_id]['messages'].append(assistant_message)
-            
-            # Update chat title if this is the first exchange
-            if len(chat_sessions[session_id]['messages']) == 2:
-                chat_sessions[session_id]['title'] = message[:50] + ('...' if len(message) > 50 else '')
+        return conditional_response(etag, build_page)
+    
+    elif request.method == 'POST':
+        trace = RequestTrace('messages')
+        with trace.activate():
+            with span('parse'):
+                data = request.get_json()
+                error = validate_chat_request(data)
+            if error:
+                trace.finish('invalid')
+                return jsonify({'error': error}), 400
             
-            save_chat_sessions()  # Save changes to persistent storage
+            message = data['message']
+            model_provider = data['model_provider']
+            model_name = data['model_name']
+            trace.provider, trace.model = model_provider, model_name
             
-            return jsonify(assistant_message)
+            try:
+                with session_locks.hold(session_id):
+                    agent = get_agent(session_id, model_provider, model_name)
+                    
+                    add_user_message(session_id, message)
+                    
+                    # Generate response using the agent
+                    with span('upstream'):
+                        response = agent.process_message(message, **generation_options(data, session_id))
+                    
+                    assistant_message = new_assistant_message(response, model_provider, model_name)
+                    add_assistant_message(session_id, message, assistant_message)
+                
+                trace.finish()
+                result = jsonify(assistant_message)
+                result.headers['Server-Timing'] = trace.server_timing()
+                return result
             
-        except Exception as e:
-            error_msg = f'Failed to generate response: {str(e)}'
-            return jsonify({'error': error_msg}), 500
+            except Exception as e:
+                trace.finish('error')
+                error_msg = f'Failed to generate response: {str(e)}'
+                return jsonify({'error': error_msg}), 500
 
 @app.route('/api/chat/<session_id>/stream', methods=['POST'])
 def stream_chat_message(session_id):
-    """Stream chat messages with letter-by-letter response"""
-    if session_id not in chat_sessions:
+    """Stream chat messages as the provider generates them"""
+    if not session_store.has_session(session_id):
         return jsonify({'error': 'Chat session not found'}), 404
     
-    data = request.get_json()
-    message = data.get('message')
-    model_provider = data.get('model_provider')
-    model_name = data.get('model_name')
+    trace = RequestTrace('stream')
+    with trace.activate(), span('parse'):
+        data = request.get_json()
+        error = validate_chat_request(data)
+    if error:
+        trace.finish('invalid')
+        return jsonify({'error': error}), 400
     
-    if not message or not model_provider or not model_name:
-        return jsonify({'error': 'Message, model_provider, and model_name are required'}), 400
+    message = data['message']
+    model_provider = data['model_provider']
+    model_name = data['model_name']
+    trace.provider, trace.model = model_provider, model_name
     
-    # Check if API key exists for the provider
-    if model_provider not in api_keys:
-        return jsonify({'error': f'No API key configured for {model_provider}'}), 400
+    def generate_stream():
+        status = 'aborted'
+        with trace.activate():
+            try:
+                with session_locks.hold(session_id):
+                    agent = get_agent(session_id, model_provider, model_name)
+                    
+                    user_message = add_user_message(session_id, message)
+                    with span('sse_emit'):
+                        yield sse_event('user_message', user_message)
+                    
+                    assistant_message = new_assistant_message('', model_provider, model_name)
+                    with span('sse_emit'):
+                        yield sse_event('start', assistant_message)
+                    
+                    # Forward provider deltas as they arrive; clients accumulate the content
+                    chunks = []
+                    upstream_start = time.perf_counter()
+                    for delta in agent.process_message_stream(message, **generation_options(data, session_id)):
+                        if not chunks:
+                            trace.add('ttft', time.perf_counter() - upstream_start)
+                        chunks.append(delta)
+                        with span('sse_emit'):
+                            yield sse_event('chunk', {'content': delta})
+                    assistant_message['content'] = ''.join(chunks)
+                    if chunks:
+                        # A fallback may have answered instead of the requested model
+                        assistant_message['model'] = answered_by(chunks[-1], assistant_message['model'])
+                    
+                    add_assistant_message(session_id, message, assistant_message)
+                    with span('sse_emit'):
+                        yield sse_event('complete', assistant_message)
+                status = 'ok'
+            
+            except Exception as e:
+                status = 'error'
+                error_msg = f'Failed to generate response: {str(e)}'
+                yield sse_event('error', {'error': error_msg})
+            finally:
+                trace.finish(status)
     
-    # Check if model is in the configured models list
-    if model_name not in api_keys[model_provider]['models']:
-        return jsonify({'error': f'Model "{model_name}" not configured for provider "{model_provider}"'}), 400
+    return Response(generate_stream(), content_type=SSE_CONTENT_TYPE, headers=SSE_HEADERS)
+
+@app.route('/api/chat/<session_id>/fanout', methods=['POST'])
+def fanout_chat_message(session_id):
+    """Send one message to several models at once and stream each answer as it completes"""
+    if not session_store.has_session(session_id):
+        return jsonify({'error': 'Chat session not found'}), 404
     
-    def generate_stream():
+    trace = RequestTrace('fanout')
+    with trace.activate(), span('parse'):
+        data = request.get_json() or {}
+        message = data.get('message')
+        targets, error = parse_fanout_targets(data) if message else (None, 'Message is required')
+    if error:
+        trace.finish('invalid')
+        return jsonify({'error': error}), 400
+    
+    options = generation_options(data, session_id)
+    
+    def run_target(model_provider, model_name):
+        start = time.perf_counter()
         try:
-            # Get or create agent for this session and model
-            agent_key = f"{session_id}_{model_provider}_{model_name}"
-            
-            if agent_key not in agents:
-                agents[agent_key] = AgentFactory.create_agent(
-                    'chat',  # agent type
-                    model_provider,
-                    api_keys[model_provider]['key'],
-                    model_name
-                )
-            
-            agent = agents[agent_key]
-            
-            # Add user message to session
-            user_message = {
-                'role': 'user',
-                'content': message,
-                'timestamp': datetime.now().isoformat()
-            }
-            chat_sessions[session_id]['messages'].append(user_message)
-            
-            # Send user message event
-            yield f"data: {json.dumps({'type': 'user_message', 'data': user_message})}\n\n"
-            
-            # Generate response using the agent
-            response = agent.process_message(message)
-            
-            # Stream the response letter by letter
-            assistant_message = {
-                'role': 'assistant',
-                'content': '',
-                'timestamp': datetime.now().isoformat(),
-                'model': f"{model_provider}/{model_name}"
-            }
-            
-            # Send start event
-            yield f"data: {json.dumps({'type': 'start', 'data': assistant_message})}\n\n"
-            
-            # Stream each character with a small delay
-            for char in str(response):
-                assistant_message['content'] += char
-                yield f"data: {json.dumps({'type': 'chunk', 'data': {'content': char, 'full_content': assistant_message['content']}})}\n\n"
-                time.sleep(0.03)  # 30ms delay between characters
-            
-            # Add complete response to session
-            chat_sessions[session_id]['messages'].append(assistant_message)
-            
-            # Update chat title if this is the first exchange
-            if len(chat_sessions[session_id]['messages']) == 2:
-                chat_sessions[session_id]['title'] = message[:50] + ('...' if len(message) > 50 else '')
-            
-            # Save changes to persistent storage
-            save_chat_sessions()
-            
-            # Send completion event
-            yield f"data: {json.dumps({'type': 'complete', 'data': assistant_message})}\n\n"
-            
+            agent = get_agent(session_id, model_provider, model_name)
+            content = agent.process_message(message, **options)
         except Exception as e:
-            error_msg = f'Failed to generate response: {str(e)}'
-            yield f"data: {json.dumps({'type': 'error', 'data': {'error': error_msg}})}\n\n"
+            content = f'Failed to generate response: {str(e)}'
+        return model_provider, model_name, content, (time.perf_counter() - start) * 1000
+    
+    def generate_stream():
+        start = time.perf_counter()
+        status = 'aborted'
+        with trace.activate():
+            try:
+                with session_locks.hold(session_id):
+                    user_message = add_user_message(session_id, message)
+                    with span('sse_emit'):
+                        yield sse_event('user_message', user_message)
+                    
+                    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+                        futures = [pool.submit(run_target, model_provider, model_name) for model_provider, model_name in targets]
+                        for future in as_completed(futures):
+                            result = fanout_result(session_id, message, *future.result())
+                            with span('sse_emit'):
+                                yield sse_event('result', result)
+                
+                with span('sse_emit'):
+                    yield sse_event('complete', {'total_ms': round((time.perf_counter() - start) * 1000, 1)})
+                status = 'ok'
+            finally:
+                trace.finish(status)
     
-    return Response(generate_stream(), content_type='text/plain; charset=utf-8')
+    return Response(generate_stream(), content_type=SSE_CONTENT_TYPE, headers=SSE_HEADERS)
 
 @app.route('/api/chat/sessions', methods=['GET'])
 def get_chat_sessions():
     """Get list of all chat sessions"""
-    sessions = []
-    for session in chat_sessions.values():
-        sessions.append({
-            'id': session['id'],
-            'title': session['title'],
-            'created_at': session['created_at'],
-            'message_count': len(session['messages'])
-        })
-    return jsonify(sorted(sessions, key=lambda x: x['created_at'], reverse=True))
+    return conditional_response(f"sessions-{session_store.list_version()}", lambda: jsonify(session_store.list_sessions()))
+
+@app.route('/api/search', methods=['GET'])
+def search_messages():
+    """Full-text search across the messages of all chat sessions"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    
+    since, until = request.args.get('since') or None, request.args.get('until') or None
+    try:
+        limit = max(1, min(int(request.args.get('limit', '20')), 100))
+        for value in (since, until):
+            if value is not None:
+                datetime.fromisoformat(value)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer and since/until ISO dates'}), 400
+    
+    try:
+        results = session_store.search(query, model=request.args.get('model') or None, since=since, until=until, limit=limit)
+    except NotImplementedError as e:
+        return jsonify({'error': str(e)}), 501
+    return jsonify({'query': query, 'results': results})
 
 @app.route('/api/chat/<session_id>', methods=['DELETE'])
 def delete_chat_session(session_id):
     """Delete a chat session"""
-    if session_id in chat_sessions:
+    if session_store.delete_session(session_id):
         # Clean up associated agents
-        keys_to_remove = [key for key in agents.keys() if key.startswith(session_id)]
-        for key in keys_to_remove:
-            del agents[key]
+        agents.invalidate(lambda key: key[0] == session_id)
+        session_logs.discard(session_id)
         
-        del chat_sessions[session_id]
-        save_chat_sessions()  # Save changes to persistent storage
         return jsonify({'message': 'Chat session deleted'})
     return jsonify({'error': 'Chat session not found'}), 404
 
+@app.route('/api/batch', methods=['POST'])
+def create_batch_job():
+    """Start a batch job on a JSON lines request body of prompt records"""
+    provider = request.args.get('provider')
+    model = request.args.get('model')
+    if not provider or not model:
+        return jsonify({'error': 'provider and model are required'}), 400
+    if provider not in api_keys:
+        return jsonify({'error': f'No API key configured for {provider}'}), 400
+    if model not in api_keys[provider]['models']:
+        return jsonify({'error': f'Model "{model}" not configured for provider "{provider}"'}), 400
+    
+    try:
+        options = {
+            'concurrency': int(request.args.get('concurrency', '8')),
+            'use_batch_api': request.args.get('batch_api', '1').lower() in ('1', 'true', 'yes'),
+            'batch_size': int(request.args.get('batch_size', '10000'))
+        }
+    except ValueError:
+        return jsonify({'error': 'concurrency and batch_size must be integers'}), 400
+    
+    batch_provider = ProviderFactory.create_provider(provider, api_keys[provider]['key'], model)
+    try:
+        if not validation_cache.validate(batch_provider):
+            return jsonify({'error': f'Model "{model}" not found for provider "{provider}"'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to validate model: {str(e)}'}), 400
+    
+    job_id = batch_jobs.create(provider, model, options, request.stream)
+    batch_jobs.start(job_id, batch_provider)
+    return jsonify({'job_id': job_id}), 202
+
+@app.route('/api/batch/<job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    """Get the state and progress of a batch job"""
+    status = batch_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Batch job not found'}), 404
+    return jsonify(status)
+
+@app.route('/api/batch/<job_id>/results', methods=['GET'])
+def get_batch_results(job_id):
+    """Download the results a batch job has written so far"""
+    status = batch_jobs.status(job_id)
+    if status is None or not os.path.exists(batch_jobs.results_path(status['id'])):
+        return jsonify({'error': 'Batch job not found'}), 404
+    return send_file(os.path.abspath(batch_jobs.results_path(status['id'])), mimetype='application/x-ndjson')
+
+@app.route('/api/batch/<job_id>/resume', methods=['POST'])
+def resume_batch_job(job_id):
+    """Resume a batch job that was interrupted or failed, skipping the records it already answered"""
+    status = batch_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Batch job not found'}), 404
+    job_id = status['id']
+    if status['state'] == 'running':
+        return jsonify({'error': 'Batch job is already running'}), 409
+    if status['provider'] not in api_keys:
+        return jsonify({'error': f"No API key configured for {status['provider']}"}), 400
+    
+    provider = ProviderFactory.create_provider(status['provider'], api_keys[status['provider']]['key'], status['model'])
+    if not batch_jobs.start(job_id, provider):
+        return jsonify({'error': 'Batch job is already running'}), 409
+    return jsonify({'job_id': job_id}), 202
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request timings and token usage in the Prometheus text format"""
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Get runtime statistics of the server's caches"""
+    return jsonify({
+        'agent_cache': agents.stats(),
+        'provider_clients': client_registry.stats(),
+        'model_validation': validation_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'request_coalescing': single_flight.stats(),
+        'routing': routing_stats.stats(),
+        'rate_limits': admission_registry.stats(),
+        'session_locks': session_locks.stats(),
+        'session_logs': session_logs.stats(),
+        'session_archive': session_store.archive_stats(),
+        'providers': {'registered': provider_registry.names(), 'loaded': provider_registry.loaded()},
+        'model_latency': {
+            model_id: dict(stats, avg_ms=stats['total_ms'] / stats['count'])
+            for model_id, stats in list(model_latency.items())
+        }
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8080)
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""Asyncio serving mode
+
+    hypercorn asgi:application --bind 0.0.0.0:8080
+
+Chat requests (POST /api/chat/<id>/messages, /stream and /fanout) are served
+on the event loop with the providers' async clients, so a slow LLM call holds
+a coroutine instead of a worker thread and one process can keep hundreds of
+conversations in flight. Every other route is cheap and is delegated to the
+Flask app in app.py through asgiref's WSGI adapter. Session store calls
+block (SQLite waits for its write lock and restores archived sessions), so
+they run in worker threads rather than on the event loop.
+"""
+import asyncio
+import re
+import time
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, Response, jsonify, request
+from metrics import RequestTrace, span
+from provider import answered_by
+from app import (
+    app as flask_app,
+    session_locks,
+    session_store,
+    validate_chat_request,
+    generation_options,
+    parse_fanout_targets,
+    fanout_result,
+    get_agent,
+    prepare_stores,
+    add_user_message,
+    new_assistant_message,
+    add_assistant_message,
+    sse_event,
+    SSE_CONTENT_TYPE,
+    SSE_HEADERS
+)
+
+ASYNC_ROUTE = re.compile(r'^/api/chat/[^/]+/(messages|stream|fanout)$')
+
+async_app = Quart(__name__)
+async_app.config['RESPONSE_TIMEOUT'] = None  # streams last as long as the upstream model
+
+wsgi_application = WsgiToAsgi(flask_app)
+
+@async_app.before_request
+async def refresh_api_keys():
+    await asyncio.to_thread(prepare_stores)
+
+@async_app.after_request
+async def add_cors_headers(response):
+    # Preflight requests are answered by flask-cors in the WSGI app
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+@async_app.route('/api/chat/<session_id>/messages', methods=['POST'])
+async def chat_messages(session_id):
+    """Send a message in a chat session without holding a thread during the LLM call"""
+    if not await asyncio.to_thread(session_store.has_session, session_id):
+        return jsonify({'error': 'Chat session not found'}), 404
+    
+    trace = RequestTrace('messages')
+    with trace.activate():
+        with span('parse'):
+            data = await request.get_json()
+            error = validate_chat_request(data)
+        if error:
+            trace.finish('invalid')
+            return jsonify({'error': error}), 400
+        
+        message = data['message']
+        model_provider = data['model_provider']
+        model_name = data['model_name']
+        trace.provider, trace.model = model_provider, model_name
+        
+        try:
+            async with session_locks.ahold(session_id):
+                # Agent creation may validate the model with a blocking call
+                agent = await asyncio.to_thread(get_agent, session_id, model_provider, model_name)
+                
+                await asyncio.to_thread(add_user_message, session_id, message)
+                
+                with span('upstream'):
+                    response = await agent.aprocess_message(message, **generation_options(data, session_id))
+                
+                assistant_message = new_assistant_message(response, model_provider, model_name)
+                await asyncio.to_thread(add_assistant_message, session_id, message, assistant_message)
+            
+            trace.finish()
+            result = jsonify(assistant_message)
+            result.headers['Server-Timing'] = trace.server_timing()
+            return result
+        
+        except Exception as e:
+            trace.finish('error')
+            error_msg = f'Failed to generate response: {str(e)}'
+            return jsonify({'error': error_msg}), 500
+
+@async_app.route('/api/chat/<session_id>/stream', methods=['POST'])
+async def stream_chat_message(session_id):
+    """Stream chat messages from the provider's async stream"""
+    if not await asyncio.to_thread(session_store.has_session, session_id):
+        return jsonify({'error': 'Chat session not found'}), 404
+    
+    trace = RequestTrace('stream')
+    with trace.activate(), span('parse'):
+        data = await request.get_json()
+        error = validate_chat_request(data)
+    if error:
+        trace.finish('invalid')
+        return jsonify({'error': error}), 400
+    
+    message = data['message']
+    model_provider = data['model_provider']
+    model_name = data['model_name']
+    trace.provider, trace.model = model_provider, model_name
+    
+    async def generate_stream():
+        status = 'aborted'
+        with trace.activate():
+            try:
+                async with session_locks.ahold(session_id):
+                    agent = await asyncio.to_thread(get_agent, session_id, model_provider, model_name)
+                    
+                    user_message = await asyncio.to_thread(add_user_message, session_id, message)
+                    with span('sse_emit'):
+                        yield sse_event('user_message', user_message)
+                    
+                    assistant_message = new_assistant_message('', model_provider, model_name)
+                    with span('sse_emit'):
+                        yield sse_event('start', assistant_message)
+                    
+                    chunks = []
+                    upstream_start = time.perf_counter()
+                    async for delta in agent.aprocess_message_stream(message, **generation_options(data, session_id)):
+                        if not chunks:
+                            trace.add('ttft', time.perf_counter() - upstream_start)
+                        chunks.append(delta)
+                        with span('sse_emit'):
+                            yield sse_event('chunk', {'content': delta})
+                    assistant_message['content'] = ''.join(chunks)
+                    if chunks:
+                        assistant_message['model'] = answered_by(chunks[-1], assistant_message['model'])
+                    
+                    await asyncio.to_thread(add_assistant_message, session_id, message, assistant_message)
+                    with span('sse_emit'):
+                        yield sse_event('complete', assistant_message)
+                status = 'ok'
+            
+            except Exception as e:
+                status = 'error'
+                error_msg = f'Failed to generate response: {str(e)}'
+                yield sse_event('error', {'error': error_msg})
+            finally:
+                trace.finish(status)
+    
+    return Response(generate_stream(), content_type=SSE_CONTENT_TYPE, headers=SSE_HEADERS)
+
+@async_app.route('/api/chat/<session_id>/fanout', methods=['POST'])
+async def fanout_chat_message(session_id):
+    """Send one message to several models concurrently on the event loop"""
+    if not await asyncio.to_thread(session_store.has_session, session_id):
+        return jsonify({'error': 'Chat session not found'}), 404
+    
+    trace = RequestTrace('fanout')
+    with trace.activate(), span('parse'):
+        data = await request.get_json() or {}
+        message = data.get('message')
+        targets, error = parse_fanout_targets(data) if message else (None, 'Message is required')
+    if error:
+        trace.finish('invalid')
+        return jsonify({'error': error}), 400
+    
+    options = generation_options(data, session_id)
+    
+    async def run_target(model_provider, model_name):
+        start = time.perf_counter()
+        try:
+            agent = await asyncio.to_thread(get_agent, session_id, model_provider, model_name)
+            content = await agent.aprocess_message(message, **options)
+        except Exception as e:
+            content = f'Failed to generate response: {str(e)}'
+        return model_provider, model_name, content, (time.perf_counter() - start) * 1000
+    
+    async def generate_stream():
+        start = time.perf_counter()
+        status = 'aborted'
+        with trace.activate():
+            async with session_locks.ahold(session_id):
+                user_message = await asyncio.to_thread(add_user_message, session_id, message)
+                with span('sse_emit'):
+                    yield sse_event('user_message', user_message)
+                
+                tasks = [asyncio.ensure_future(run_target(model_provider, model_name)) for model_provider, model_name in targets]
+                try:
+                    for next_result in asyncio.as_completed(tasks):
+                        result = await asyncio.to_thread(fanout_result, session_id, message, *await next_result)
+                        with span('sse_emit'):
+                            yield sse_event('result', result)
+                    
+                    with span('sse_emit'):
+                        yield sse_event('complete', {'total_ms': round((time.perf_counter() - start) * 1000, 1)})
+                    status = 'ok'
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    trace.finish(status)
+    
+    return Response(generate_stream(), content_type=SSE_CONTENT_TYPE, headers=SSE_HEADERS)
+
+async def application(scope, receive, send):
+    """ASGI entry point routing chat requests to the async app and the rest to Flask"""
+    if scope['type'] == 'lifespan' or (
+        scope['type'] == 'http'
+        and scope['method'] == 'POST'
+        and ASYNC_ROUTE.match(scope['path'])
+    ):
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
+
+if __name__ == '__main__':
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    
+    config = Config()
+    config.bind = ['0.0.0.0:8080']
+    asyncio.run(serve(application, config))
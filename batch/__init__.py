@@ -0,0 +1,2 @@
+from .job import BatchJob, ResultSink, read_jsonl
+from .manager import BatchJobManager
@@ -0,0 +1,74 @@
+"""Run a file of prompts through a model
+
+    python -m batch --provider openai --model gpt-4o-mini --input prompts.jsonl --output results.jsonl
+
+Each input line is a JSON object with a "prompt" string or a "messages" list
+and optionally an "id", "temperature" and "max_tokens"; "-" reads stdin.
+Results are appended to the output as they finish, one JSON object per line
+with the record's "id" and its "content" or "error". Running the same
+command again after a crash or interruption resumes the job: answered
+records are skipped and failed ones retried.
+
+OpenAI and Claude requests go through the providers' batch APIs (about half
+the price, results within 24 hours) unless --no-batch-api is given; other
+providers, and --no-batch-api, send up to --concurrency requests at once.
+The API key is read from the configured key store unless --api-key is given.
+"""
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+
+def main():
+    load_dotenv()
+    
+    parser = argparse.ArgumentParser(description='Run a JSON lines file of prompts through a model')
+    parser.add_argument('--provider', required=True)
+    parser.add_argument('--model', required=True)
+    parser.add_argument('--input', required=True, help='JSON lines file of prompt records, or - for stdin')
+    parser.add_argument('--output', required=True, help='JSON lines file the results are appended to')
+    parser.add_argument('--concurrency', type=int, default=8, help='requests in flight without the batch API')
+    parser.add_argument('--no-batch-api', dest='batch_api', action='store_false', help='send requests directly even if the provider has a batch API')
+    parser.add_argument('--batch-size', type=int, default=10000, help='requests per provider batch')
+    parser.add_argument('--poll-interval', type=float, default=30.0, help='seconds between provider batch status checks')
+    parser.add_argument('--api-key', default=None)
+    args = parser.parse_args()
+    
+    from provider import ProviderFactory
+    from .job import BatchJob, read_jsonl
+    
+    api_key = args.api_key or load_api_key(args.provider)
+    if not api_key:
+        parser.error(f"No API key configured for {args.provider}; pass --api-key")
+    
+    job = BatchJob(
+        ProviderFactory.create_provider(args.provider, api_key, args.model),
+        args.output,
+        concurrency=args.concurrency,
+        use_batch_api=args.batch_api,
+        batch_size=args.batch_size,
+        poll_interval=args.poll_interval
+    )
+    if args.input == '-':
+        stats = job.run(read_jsonl(sys.stdin))
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            stats = job.run(read_jsonl(f))
+    
+    print(f"{stats['records']} records: {stats['succeeded']} succeeded, {stats['failed']} failed, "
+          f"{stats['skipped']} already done")
+    sys.exit(1 if stats['failed'] else 0)
+
+def load_api_key(provider_name):
+    """Look up a provider's API key in the key store the server uses"""
+    from storage import StoreFactory
+    
+    key_store_type = os.environ.get('KEY_STORE', 'file')
+    key_store = StoreFactory.create_key_store(
+        key_store_type,
+        **({'path': 'api_keys.json'} if key_store_type == 'file' else {'url': os.environ.get('REDIS_URL', 'redis://localhost:6379/0')})
+    )
+    return (key_store.load().get(provider_name) or {}).get('key')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+from provider import BaseProvider
+
+# Per-record generation parameters passed through to the provider
+GENERATION_OPTIONS = ('temperature', 'max_tokens')
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse prompt records, one JSON object per line
+
+    A record has a "prompt" string or a "messages" list, and optionally an
+    "id" (the line number by default), "temperature" and "max_tokens".
+    Lines that are not valid JSON become records with an "invalid" reason.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('expected a JSON object')
+        except ValueError as e:
+            yield {'id': str(number), 'invalid': f"Invalid JSON on line {number}: {e}"}
+            continue
+        record['id'] = str(record.get('id', number))
+        yield record
+
+class ResultSink:
+    """Append-only JSON lines file of results; the last line written for an id is its result"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+    
+    def completed(self) -> Set[str]:
+        """Return the ids that already have a successful result"""
+        done = set()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        continue  # the partial last line of a crashed run
+                    if 'error' in result:
+                        done.discard(result['id'])
+                    else:
+                        done.add(result['id'])
+        except FileNotFoundError:
+            pass
+        return done
+    
+    def open(self):
+        # Drop a partial last line left by a crash so the next result starts on its own line
+        if os.path.exists(self.path):
+            with open(self.path, 'rb+') as f:
+                content = f.read()
+                if content and not content.endswith(b'\n'):
+                    f.truncate(content.rfind(b'\n') + 1)
+        self._file = open(self.path, 'a', encoding='utf-8')
+    
+    def write(self, result: Dict[str, Any]):
+        self._file.write(json.dumps(result, ensure_ascii=False) + '\n')
+        self._file.flush()
+    
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+class BatchJob:
+    """Run prompt records through one model and append each result to a JSON lines file as it finishes
+
+    Records that already have a successful result in the output are skipped,
+    so a crashed or interrupted job resumes by running it again with the same
+    input and output; failed records are retried. With use_batch_api, records
+    go to the provider's batch API (where it has one) in batches of
+    batch_size, and the ids of submitted batches are kept in a state file next
+    to the output so a resumed job collects them instead of submitting again.
+    Otherwise up to concurrency requests are in flight at once.
+    """
+    
+    def __init__(self, provider: BaseProvider, output_path: str, concurrency: int = 8, use_batch_api: bool = True,
+                 batch_size: int = 10000, poll_interval: float = 30.0, name: str = 'batch'):
+        self.provider = provider
+        self.output_path = output_path
+        self.state_path = output_path + '.batches.json'
+        self.concurrency = max(1, concurrency)
+        self.use_batch_api = use_batch_api
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        # Rate limited providers queue the whole job as one session, so chat traffic keeps its share
+        self.name = name
+        self.stats = {'records': 0, 'skipped': 0, 'succeeded': 0, 'failed': 0, 'batches_submitted': 0, 'batches_pending': 0}
+    
+    def run(self, records: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Process records and return the job counters"""
+        return asyncio.run(self.arun(records))
+    
+    async def arun(self, records: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        sink = ResultSink(self.output_path)
+        done = sink.completed()
+        pending = self._load_state()
+        submitted = {record_id for batch in pending for record_id in batch['ids']}
+        todo = self._todo(records, done | submitted)
+        
+        self._submitting = False
+        self._batch_added = asyncio.Event()
+        sink.open()
+        try:
+            if self.use_batch_api and self.provider.supports_batch:
+                await self._run_batches(todo, pending, sink)
+            else:
+                # Batches submitted by an earlier run of the job are still collected
+                await asyncio.gather(self._collect(pending, sink), self._run_direct(todo, sink))
+        finally:
+            sink.close()
+        return self.stats
+    
+    def _todo(self, records: Iterable[Dict[str, Any]], skip: Set[str]) -> Iterator[Dict[str, Any]]:
+        for record in records:
+            self.stats['records'] += 1
+            if record['id'] in skip:
+                self.stats['skipped'] += 1
+            else:
+                yield record
+    
+    async def _run_direct(self, records: Iterator[Dict[str, Any]], sink: ResultSink):
+        async def worker():
+            # The workers share one iterator, so at most concurrency records are read ahead
+            for record in records:
+                self._write(sink, await self._answer(record))
+        
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+    
+    async def _answer(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        error = self._invalid(record)
+        if error:
+            return {'id': record['id'], 'error': error}
+        
+        start = time.perf_counter()
+        try:
+            content = await self.provider.agenerate_response(self._message(record), session_id=self.name, **self._options(record))
+            return {'id': record['id'], 'content': content, 'latency_ms': round((time.perf_counter() - start) * 1000, 1)}
+        except Exception as e:
+            return {'id': record['id'], 'error': str(e)}
+    
+    async def _run_batches(self, records: Iterator[Dict[str, Any]], pending: List[Dict[str, Any]], sink: ResultSink):
+        self._submitting = True
+        collector = asyncio.ensure_future(self._collect(pending, sink))
+        try:
+            chunk = []
+            for record in records:
+                error = self._invalid(record)
+                if error:
+                    self._write(sink, {'id': record['id'], 'error': error})
+                    continue
+                chunk.append(record)
+                if len(chunk) >= self.batch_size:
+                    await self._submit(chunk, pending)
+                    chunk = []
+            if chunk:
+                await self._submit(chunk, pending)
+        finally:
+            self._submitting = False
+            self._batch_added.set()
+        await collector
+    
+    async def _submit(self, records: List[Dict[str, Any]], pending: List[Dict[str, Any]]):
+        # Custom ids are positions in the batch, since providers restrict their characters and length
+        requests = [(f"r{index}", self._message(record), self._options(record)) for index, record in enumerate(records)]
+        batch_id = await asyncio.to_thread(self.provider.submit_batch, requests)
+        pending.append({'batch_id': batch_id, 'ids': [record['id'] for record in records]})
+        self._save_state(pending)
+        self.stats['batches_submitted'] += 1
+        self._batch_added.set()
+        print(f"Submitted batch {batch_id} with {len(records)} requests")
+    
+    async def _collect(self, pending: List[Dict[str, Any]], sink: ResultSink):
+        """Poll submitted batches and write their results until every batch is done"""
+        while True:
+            for batch in list(pending):
+                try:
+                    if not await asyncio.to_thread(self.provider.batch_done, batch['batch_id']):
+                        continue
+                    results = await asyncio.to_thread(lambda: list(self.provider.batch_results(batch['batch_id'])))
+                except Exception as e:
+                    # Polled again on the next round
+                    print(f"Error polling batch {batch['batch_id']}: {e}")
+                    continue
+                self._write_batch_results(batch, results, sink)
+                pending.remove(batch)
+                self._save_state(pending)
+            self.stats['batches_pending'] = len(pending)
+            
+            if pending:
+                await asyncio.sleep(self.poll_interval)
+            elif self._submitting:
+                await self._batch_added.wait()
+                self._batch_added.clear()
+            else:
+                return
+    
+    def _write_batch_results(self, batch: Dict[str, Any], results: List[Dict[str, Any]], sink: ResultSink):
+        ids = batch['ids']
+        answered = set()
+        for result in results:
+            index = int(result.pop('custom_id')[1:])
+            answered.add(index)
+            self._write(sink, dict(result, id=ids[index]))
+        # Requests the batch returned nothing for are retried when the job is resumed
+        for index, record_id in enumerate(ids):
+            if index not in answered:
+                self._write(sink, {'id': record_id, 'error': f"No result in batch {batch['batch_id']}"})
+    
+    def _write(self, sink: ResultSink, result: Dict[str, Any]):
+        sink.write(result)
+        self.stats['failed' if 'error' in result else 'succeeded'] += 1
+    
+    def _load_state(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+    
+    def _save_state(self, pending: List[Dict[str, Any]]):
+        if not pending:
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            return
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(pending, f)
+        os.replace(temp_path, self.state_path)
+    
+    @staticmethod
+    def _invalid(record: Dict[str, Any]) -> Optional[str]:
+        if 'invalid' in record:
+            return record['invalid']
+        if isinstance(record.get('messages'), list) and record['messages']:
+            return None
+        if isinstance(record.get('prompt'), str) and record['prompt']:
+            return None
+        return 'A record needs a "prompt" string or a "messages" list'
+    
+    @staticmethod
+    def _message(record: Dict[str, Any]):
+        return record.get('messages') or record['prompt']
+    
+    @staticmethod
+    def _options(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: record[name] for name in GENERATION_OPTIONS if record.get(name) is not None}
@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import socket
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Optional
+from provider import BaseProvider
+from .job import BatchJob, read_jsonl
+
+class BatchJobManager:
+    """Batch jobs submitted over the API, each in its own directory
+
+    A job directory holds the uploaded input, the JSON lines results and a
+    job.json with the job's settings and state, so a job interrupted by a
+    restart can be resumed from where it stopped.
+    """
+    
+    def __init__(self, directory: str = 'batch_jobs'):
+        self.directory = directory
+        self._running = {}  # job_id -> BatchJob
+        self._lock = threading.Lock()
+    
+    def create(self, provider_name: str, model_name: str, options: Dict[str, Any], body: BinaryIO) -> str:
+        """Store the input of a new job and return its id"""
+        job_id = str(uuid.uuid4())
+        os.makedirs(self._path(job_id))
+        # Spool the upload to disk so large inputs are never held in memory
+        with open(self._path(job_id, 'input.jsonl'), 'wb') as f:
+            shutil.copyfileobj(body, f)
+        self._save(job_id, {
+            'id': job_id,
+            'provider': provider_name,
+            'model': model_name,
+            'options': options,
+            'state': 'queued',
+            'created_at': datetime.now().isoformat()
+        })
+        return job_id
+    
+    def start(self, job_id: str, provider: BaseProvider) -> bool:
+        """Run (or resume) a job in a background thread; returns False if it is already running"""
+        job_info = self._load(job_id)
+        job = BatchJob(provider, self._path(job_id, 'output.jsonl'), name=f"batch-{job_id}", **job_info['options'])
+        with self._lock:
+            if job_id in self._running:
+                return False
+            self._running[job_id] = job
+        
+        job_info.update(state='running', started_at=datetime.now().isoformat(), host=socket.gethostname(), pid=os.getpid())
+        job_info.pop('error', None)
+        self._save(job_id, job_info)
+        threading.Thread(target=self._run, args=(job_id, job, job_info), daemon=True).start()
+        return True
+    
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's settings, state and progress counters, or None for an unknown job
+
+        job_id may be any form uuid.UUID accepts (braces, urn:uuid:, ...); the
+        returned id is the canonical one the job's files and threads use.
+        """
+        try:
+            job_id = str(uuid.UUID(job_id))
+            job_info = self._load(job_id)
+        except (ValueError, FileNotFoundError):
+            return None
+        with self._lock:
+            job = self._running.get(job_id)
+        if job is not None:
+            job_info['stats'] = dict(job.stats)
+        elif job_info['state'] == 'running' and not self._worker_alive(job_info):
+            # The process running it stopped before the job finished
+            job_info['state'] = 'interrupted'
+        return job_info
+    
+    def results_path(self, job_id: str) -> str:
+        return self._path(job_id, 'output.jsonl')
+    
+    def _run(self, job_id: str, job: BatchJob, job_info: Dict[str, Any]):
+        try:
+            with open(self._path(job_id, 'input.jsonl'), 'r', encoding='utf-8') as f:
+                job_info['stats'] = job.run(read_jsonl(f))
+            job_info['state'] = 'completed'
+        except Exception as e:
+            print(f"Error running batch job {job_id}: {e}")
+            job_info.update(state='failed', error=str(e), stats=job.stats)
+        finally:
+            job_info['finished_at'] = datetime.now().isoformat()
+            self._save(job_id, job_info)
+            with self._lock:
+                del self._running[job_id]
+    
+    @staticmethod
+    def _worker_alive(job_info: Dict[str, Any]) -> bool:
+        if job_info.get('host') != socket.gethostname():
+            return True  # another host's process cannot be checked from here
+        try:
+            os.kill(job_info['pid'], 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+    
+    def _path(self, job_id: str, name: str = '') -> str:
+        return os.path.join(self.directory, job_id, name)
+    
+    def _load(self, job_id: str) -> Dict[str, Any]:
+        with open(self._path(job_id, 'job.json'), 'r') as f:
+            return json.load(f)
+    
+    def _save(self, job_id: str, job_info: Dict[str, Any]):
+        temp_path = self._path(job_id, 'job.json.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(job_info, f, indent=2)
+        os.replace(temp_path, self._path(job_id, 'job.json'))
@@ -0,0 +1,67 @@
+"""Compare thread-per-request and asyncio serving against the mock LLM server
+
+    python -m benchmarks.async_throughput --requests 400 --threads 16 --latency 1.0
+
+The sync run pushes every request through ChatAgent.process_message on a
+fixed-size thread pool, the way a WSGI server with N worker threads does.
+The async run issues the same requests with ChatAgent.aprocess_message on
+one event loop, as asgi.py does.
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .mock_llm_server import MockLLMConfig, start_mock_server
+
+def build_agents(provider_name: str, count: int):
+    from agent import ChatAgent
+    from provider import ProviderFactory
+    
+    return [
+        ChatAgent(ProviderFactory.create_provider(provider_name, 'mock-key', 'mock-model'))
+        for _ in range(count)
+    ]
+
+def run_sync(provider_name: str, requests: int, threads: int) -> float:
+    agents = build_agents(provider_name, requests)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda agent: agent.process_message('Hello'), agents))
+    return time.perf_counter() - start
+
+def run_async(provider_name: str, requests: int) -> float:
+    agents = build_agents(provider_name, requests)
+    
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(agent.aprocess_message('Hello') for agent in agents))
+        return time.perf_counter() - start
+    
+    return asyncio.run(run())
+
+def main():
+    parser = argparse.ArgumentParser(description='Thread pool vs asyncio throughput against a mock LLM')
+    parser.add_argument('--provider', default='openai', choices=['openai', 'deepseek', 'claude'])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=16, help='worker threads in the sync run')
+    parser.add_argument('--latency', type=float, default=1.0, help='mock time-to-first-token in seconds')
+    args = parser.parse_args()
+    
+    server = start_mock_server(MockLLMConfig(latency=args.latency, tokens_per_second=0))
+    os.environ['OPENAI_BASE_URL'] = f"{server.base_url}/v1"
+    os.environ['DEEPSEEK_BASE_URL'] = f"{server.base_url}/v1"
+    os.environ['ANTHROPIC_BASE_URL'] = server.base_url
+    
+    sync_elapsed = run_sync(args.provider, args.requests, args.threads)
+    async_elapsed = run_async(args.provider, args.requests)
+    
+    print(f"{args.requests} requests to {args.provider} with {args.latency:.2f}s upstream latency")
+    print(f"  sync  ({args.threads} threads): {sync_elapsed:7.2f}s  {args.requests / sync_elapsed:8.1f} req/s")
+    print(f"  async (1 event loop): {async_elapsed:7.2f}s  {args.requests / async_elapsed:8.1f} req/s")
+    print(f"  speedup: {sync_elapsed / async_elapsed:.1f}x")
+    
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Measure how long a fresh worker takes to import the app and answer its first request
+
+    python -m benchmarks.import_time --runs 5 --max-ms 500
+
+Each run starts a new interpreter in a throwaway working directory, imports
+app (or --module) and, if the module has a Flask app, serves GET /api/stats
+through its test client. The slowest imports of the last run are listed
+from python -X importtime. The run fails if the median import time exceeds
+--max-ms, or if a provider SDK (--forbid) was imported before any provider
+was used, so lazy loading does not quietly regress. Results are appended to
+--output like the load test's.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from .load_test import git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import {module} as module
+imported = time.perf_counter()
+first_request_ms = None
+if hasattr(module, 'app'):
+    module.app.test_client().get('/api/stats')
+    first_request_ms = (time.perf_counter() - imported) * 1000
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': first_request_ms,
+    'modules': sorted(name for name in sys.modules if '.' not in name)
+}}))
+'''
+
+def run_once(module, workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD.format(module=module)],
+        capture_output=True, text=True, cwd=workdir, env=env, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def slowest_imports(importtime_log, count):
+    """Top-level imports by cumulative microseconds, from python -X importtime output"""
+    imports = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting is shown by indentation; only count modules imported directly by the top level
+        if len(name) - len(name.lstrip()) <= 3:
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import time and time to the first request')
+    parser.add_argument('--module', default='app', help='module to import, e.g. app or asgi')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None, help='fail if the median import time exceeds this')
+    parser.add_argument('--forbid', default='openai,anthropic', help='modules that must not be imported at startup')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest imports to list')
+    parser.add_argument('--output', default='benchmarks/results.jsonl', help='JSON lines file the results are appended to')
+    args = parser.parse_args()
+    
+    forbidden = [name.strip() for name in args.forbid.split(',') if name.strip()]
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # The app creates its database and caches in the working directory
+        for _ in range(args.runs):
+            run, importtime_log = run_once(args.module, workdir)
+            runs.append(run)
+    
+    import_ms = [run['import_ms'] for run in runs]
+    first_request_ms = [run['first_request_ms'] for run in runs if run['first_request_ms'] is not None]
+    loaded = [name for name in forbidden if name in runs[-1]['modules']]
+    results = {
+        'import_ms_median': round(statistics.median(import_ms), 1),
+        'import_ms_min': round(min(import_ms), 1),
+        'first_request_ms_median': round(statistics.median(first_request_ms), 1) if first_request_ms else None,
+        'forbidden_modules_loaded': loaded
+    }
+    
+    print(f"import {args.module}: median {results['import_ms_median']} ms, min {results['import_ms_min']} ms "
+          f"over {args.runs} runs; first request {results['first_request_ms_median'] or '-'} ms")
+    print("Slowest imports:")
+    for cumulative, name in slowest_imports(importtime_log, args.top):
+        print(f"{cumulative / 1000:>10.1f} ms  {name}")
+    
+    record = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'config': vars(args),
+        'results': {'import_time': results}
+    }
+    with open(os.path.abspath(args.output), 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    print(f"Results appended to {os.path.abspath(args.output)}")
+    
+    failed = False
+    if loaded:
+        print(f"FAIL: imported at startup: {', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and results['import_ms_median'] > args.max_ms:
+        print(f"FAIL: median import time {results['import_ms_median']} ms exceeds {args.max_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
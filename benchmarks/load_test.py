@@ -0,0 +1,245 @@
+"""Load test the chat endpoints against the mock LLM server
+
+    python -m benchmarks.load_test --users 32 --turns 5 --latency 0.2 --error-rate 0.01
+
+Starts the mock LLM server and the Flask app (on a threaded WSGI server) in
+this process, inside a throwaway working directory so no real API keys,
+sessions or caches are touched. Simulated users are spread over the OpenAI,
+DeepSeek and Claude providers, all pointed at the mock, and each phase drives
+one endpoint with every user at once:
+
+    messages  POST /api/chat/<id>/messages
+    stream    POST /api/chat/<id>/stream (time to first token is the first chunk event)
+    sessions  GET /api/chat/sessions
+
+Every run appends its results as one JSON line to --output so regressions can
+be tracked over time.
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+import httpx
+from .mock_llm_server import MockLLMConfig, start_mock_server
+
+PROVIDERS = ['openai', 'deepseek', 'claude']
+MOCK_MODEL = 'mock-model'
+# ChatAgent reports upstream failures as the reply text
+AGENT_ERROR_PREFIX = 'Error generating response:'
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def rss_mb():
+    """Resident memory of this process in MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+class PhaseResult:
+    """Latencies and failures of one load phase"""
+    
+    def __init__(self):
+        self.latencies = []
+        self.ttfts = []
+        self.errors = 0
+        self._lock = threading.Lock()
+    
+    def record(self, latency, ttft=None, error=False):
+        with self._lock:
+            if error:
+                self.errors += 1
+            else:
+                self.latencies.append(latency)
+                if ttft is not None:
+                    self.ttfts.append(ttft)
+    
+    def summary(self, elapsed, memory_growth):
+        ms = lambda value: None if value is None else round(value * 1000, 1)
+        summary = {
+            'requests': len(self.latencies) + self.errors,
+            'errors': self.errors,
+            'throughput_rps': round(len(self.latencies) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': ms(percentile(self.latencies, 0.50)),
+            'p95_ms': ms(percentile(self.latencies, 0.95)),
+            'p99_ms': ms(percentile(self.latencies, 0.99)),
+            'memory_growth_mb': round(memory_growth, 1)
+        }
+        if self.ttfts:
+            summary.update({
+                'ttft_p50_ms': ms(percentile(self.ttfts, 0.50)),
+                'ttft_p95_ms': ms(percentile(self.ttfts, 0.95)),
+                'ttft_p99_ms': ms(percentile(self.ttfts, 0.99))
+            })
+        return summary
+
+def chat_body(user, turn):
+    provider = PROVIDERS[user % len(PROVIDERS)]
+    return {'message': f"Question {turn} from user {user}", 'model_provider': provider, 'model_name': MOCK_MODEL}
+
+def send_message(client, session_id, body, result):
+    start = time.perf_counter()
+    try:
+        response = client.post(f"/api/chat/{session_id}/messages", json=body)
+        failed = response.status_code != 200 or response.json()['content'].startswith(AGENT_ERROR_PREFIX)
+        result.record(time.perf_counter() - start, error=failed)
+    except httpx.HTTPError:
+        result.record(time.perf_counter() - start, error=True)
+
+def stream_message(client, session_id, body, result):
+    start = time.perf_counter()
+    ttft = None
+    failed = False
+    try:
+        with client.stream('POST', f"/api/chat/{session_id}/stream", json=body) as response:
+            failed = response.status_code != 200
+            for line in response.iter_lines():
+                if not line.startswith('data: '):
+                    continue
+                event = json.loads(line[6:])
+                if event['type'] == 'chunk' and ttft is None:
+                    ttft = time.perf_counter() - start
+                    failed = event['data']['content'].startswith(AGENT_ERROR_PREFIX)
+                elif event['type'] == 'error':
+                    failed = True
+    except httpx.HTTPError:
+        failed = True
+    result.record(time.perf_counter() - start, ttft=ttft, error=failed)
+
+def list_sessions(client, session_id, body, result):
+    start = time.perf_counter()
+    try:
+        response = client.get('/api/chat/sessions')
+        result.record(time.perf_counter() - start, error=response.status_code != 200)
+    except httpx.HTTPError:
+        result.record(time.perf_counter() - start, error=True)
+
+PHASES = {
+    'messages': send_message,
+    'stream': stream_message,
+    'sessions': list_sessions
+}
+
+def run_phase(base_url, sessions, turns, request_fn):
+    """Run every simulated user concurrently for the given number of turns"""
+    result = PhaseResult()
+    
+    def user_loop(user):
+        with httpx.Client(base_url=base_url, timeout=300) as client:
+            for turn in range(turns):
+                request_fn(client, sessions[user], chat_body(user, turn), result)
+    
+    gc.collect()
+    memory_before = rss_mb()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user_loop, args=(user,)) for user in range(len(sessions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    return result.summary(elapsed, rss_mb() - memory_before)
+
+def start_app(mock_url, store):
+    """Import the Flask app against the mock server and serve it on a free port"""
+    os.environ['OPENAI_BASE_URL'] = f"{mock_url}/v1"
+    os.environ['DEEPSEEK_BASE_URL'] = f"{mock_url}/v1"
+    os.environ['ANTHROPIC_BASE_URL'] = mock_url
+    os.environ['SESSION_STORE'] = store
+    
+    from werkzeug.serving import make_server
+    from app import app
+    
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the chat endpoints against a mock LLM')
+    parser.add_argument('--users', type=int, default=32, help='concurrent simulated users')
+    parser.add_argument('--turns', type=int, default=5, help='requests per user in each phase')
+    parser.add_argument('--phases', default='messages,stream,sessions')
+    parser.add_argument('--latency', type=float, default=0.2, help='mock time-to-first-token in seconds')
+    parser.add_argument('--tokens-per-second', type=float, default=500.0)
+    parser.add_argument('--response-tokens', type=int, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of upstream calls that fail')
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--store', default='sqlite', choices=['sqlite', 'memory'])
+    parser.add_argument('--output', default='benchmarks/results.jsonl', help='JSON lines file the results are appended to')
+    args = parser.parse_args()
+    
+    output = os.path.abspath(args.output)
+    phases = [phase.strip() for phase in args.phases.split(',') if phase.strip()]
+    mock = start_mock_server(MockLLMConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        models=[MOCK_MODEL],
+        error_rate=args.error_rate,
+        error_status=args.error_status
+    ))
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        # The app keeps its keys, database and caches in the working directory
+        os.chdir(workdir)
+        server, base_url = start_app(mock.base_url, args.store)
+        
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            for provider in PROVIDERS:
+                client.post('/api/keys', json={'provider': provider, 'api_key': 'mock-key', 'models': [MOCK_MODEL]}).raise_for_status()
+            sessions = [client.post('/api/chat/new').json()['session_id'] for _ in range(args.users)]
+        
+        results = {}
+        print(f"{args.users} users x {args.turns} turns, {args.latency:.2f}s upstream latency, "
+              f"{args.error_rate:.0%} upstream errors")
+        print(f"{'phase':<10}{'reqs':>6}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'ttft p50':>10}{'ttft p95':>10}{'mem MB':>8}")
+        for phase in phases:
+            summary = run_phase(base_url, sessions, args.turns, PHASES[phase])
+            results[phase] = summary
+            print(f"{phase:<10}{summary['requests']:>6}{summary['errors']:>8}{summary['throughput_rps']:>9}"
+                  f"{summary['p50_ms']!s:>9}{summary['p95_ms']!s:>9}{summary['p99_ms']!s:>9}"
+                  f"{summary.get('ttft_p50_ms', '-')!s:>10}{summary.get('ttft_p95_ms', '-')!s:>10}"
+                  f"{summary['memory_growth_mb']:>+8.1f}")
+        
+        server.shutdown()
+    mock.shutdown()
+    
+    record = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'config': vars(args),
+        'results': results
+    }
+    with open(output, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    print(f"Results appended to {output}")
+
+if __name__ == '__main__':
+    main()
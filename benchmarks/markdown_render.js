@@ -0,0 +1,92 @@
+// Compare the markdown parse cost of rendering a streamed reply naively (re-parse
+// everything on every chunk) and incrementally (parse completed blocks once and
+// re-parse only the unfinished tail), for growing response lengths.
+//
+// Usage:
+//     node benchmarks/markdown_render.js [--chunk-size 16] [--lengths 1000,4000,16000,32000]
+//
+// Runs without a browser, so only marked parsing is measured; the client also
+// runs Prism and MathJax once per completed block rather than on every update.
+
+const path = require('path');
+const {performance} = require('perf_hooks');
+
+const marked = require(path.join(__dirname, '..', 'static', 'js', 'vendor', 'marked', 'marked.min.js'));
+const MarkdownStream = require(path.join(__dirname, '..', 'static', 'js', 'markdown-stream.js'));
+
+marked.setOptions({breaks: true, gfm: true});
+
+function option(name, fallback) {
+    const index = process.argv.indexOf(`--${name}`);
+    return index === -1 ? fallback : process.argv[index + 1];
+}
+
+// A code-heavy answer: prose, lists, fenced code and display math
+function sampleResponse(length) {
+    const sections = [
+        'Here is how the function works. It walks the list once and keeps a running total, ' +
+            'so the cost is **linear** in the input size and `O(1)` in memory.\n\n',
+        '```python\ndef total(values):\n    result = 0\n    for value in values:\n' +
+            '        result += value\n    return result\n```\n\n',
+        '- first, validate the input\n- then, accumulate the values\n- finally, return the result\n\n',
+        'The closed form for the sum of the first n integers is\n\n$$\n\\sum_{i=1}^{n} i = \\frac{n(n+1)}{2}\n$$\n\n',
+        '```javascript\nfunction total(values) {\n    return values.reduce((sum, value) => sum + value, 0);\n}\n```\n\n'
+    ];
+    let text = '';
+    for (let i = 0; text.length < length; i++) {
+        text += sections[i % sections.length];
+    }
+    return text.slice(0, length);
+}
+
+function chunksOf(text, size) {
+    const chunks = [];
+    for (let i = 0; i < text.length; i += size) {
+        chunks.push(text.slice(i, i + size));
+    }
+    return chunks;
+}
+
+function naive(chunks) {
+    let content = '';
+    for (const chunk of chunks) {
+        content += chunk;
+        marked.parse(content);
+    }
+}
+
+function incremental(chunks) {
+    const stream = new MarkdownStream();
+    for (const chunk of chunks) {
+        stream.append(chunk).forEach(block => marked.parse(block));
+        marked.parse(stream.tail());
+    }
+    stream.finish().forEach(block => marked.parse(block));
+}
+
+function time(fn, chunks) {
+    fn(chunks);  // warm up
+    const start = performance.now();
+    fn(chunks);
+    return performance.now() - start;
+}
+
+function main() {
+    const chunkSize = parseInt(option('chunk-size', '16'), 10);
+    const lengths = option('lengths', '1000,4000,16000,32000').split(',').map(Number);
+
+    console.log(`chunk size: ${chunkSize} characters`);
+    console.log('length    chunks    naive ms    incremental ms    speedup');
+    for (const length of lengths) {
+        const chunks = chunksOf(sampleResponse(length), chunkSize);
+        const naiveMs = time(naive, chunks);
+        const incrementalMs = time(incremental, chunks);
+        console.log(
+            `${String(length).padEnd(10)}${String(chunks.length).padEnd(10)}` +
+            `${naiveMs.toFixed(1).padEnd(12)}${incrementalMs.toFixed(1).padEnd(18)}` +
+            `${(naiveMs / incrementalMs).toFixed(1)}x`
+        );
+    }
+}
+
+main();
@@ -0,0 +1,235 @@
+"""Local stand-in for the OpenAI-compatible and Anthropic HTTP APIs
+
+Serves /v1/chat/completions, /v1/messages and /v1/models with a configurable
+time-to-first-token, token rate and error rate, so the providers can be
+benchmarked without network access or API spend:
+
+    python -m benchmarks.mock_llm_server --port 9000 --latency 0.5 --error-rate 0.05
+
+Point the providers at it with OPENAI_BASE_URL=http://127.0.0.1:9000/v1,
+DEEPSEEK_BASE_URL=http://127.0.0.1:9000/v1 and
+ANTHROPIC_BASE_URL=http://127.0.0.1:9000.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockLLMConfig:
+    """Behaviour of the mock server"""
+    
+    def __init__(self, latency: float = 0.5, tokens_per_second: float = 200.0, response_tokens: int = 50,
+                 models=('mock-model',), error_rate: float = 0.0, error_status: int = 500):
+        self.latency = latency  # seconds before the first token
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.models = list(models)  # returned by GET /v1/models; any id can be retrieved
+        self.error_rate = error_rate  # fraction of completion requests answered with error_status
+        self.error_status = error_status
+    
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+    
+    def tokens(self):
+        """Return the token strings of a response"""
+        return [f"token{i} " for i in range(self.response_tokens)]
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    @property
+    def config(self) -> MockLLMConfig:
+        return self.server.config
+    
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path.endswith('/models'):
+            self._send_json({'object': 'list', 'data': [self._model(model) for model in self.config.models],
+                             'has_more': False, 'first_id': None, 'last_id': None})
+        elif '/models/' in path:
+            self._send_json(self._model(path.rsplit('/', 1)[1]))
+        else:
+            self._send_json({'error': {'message': 'not found'}}, status=404)
+    
+    @staticmethod
+    def _model(model_id: str):
+        # Satisfies both the OpenAI and the Anthropic model object schemas
+        return {'id': model_id, 'object': 'model', 'type': 'model', 'created': 0, 'owned_by': 'mock',
+                'display_name': model_id, 'created_at': '2024-01-01T00:00:00Z'}
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        
+        if self.path.endswith('/chat/completions'):
+            self._chat_completions(body)
+        elif self.path.endswith('/messages'):
+            self._anthropic_messages(body)
+        else:
+            self._send_json({'error': {'message': 'not found'}}, status=404)
+    
+    def _chat_completions(self, body):
+        model = body.get('model', 'mock-model')
+        tokens = self._limit_tokens(body.get('max_tokens'))
+        time.sleep(self.config.latency)
+        if self.config.should_fail():
+            self._send_json({'error': {'message': 'Injected failure', 'type': 'server_error', 'code': None}},
+                            status=self.config.error_status)
+            return
+        
+        if not body.get('stream'):
+            self._sleep_for_tokens(len(tokens))
+            self._send_json({
+                'id': f"chatcmpl-{uuid.uuid4().hex}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(tokens)}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 10, 'completion_tokens': len(tokens), 'total_tokens': 10 + len(tokens)}
+            })
+            return
+        
+        self._start_stream()
+        for token in tokens:
+            self._send_event(None, {
+                'id': 'chatcmpl-mock',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+            })
+            self._sleep_for_tokens(1)
+        if (body.get('stream_options') or {}).get('include_usage'):
+            self._send_event(None, {
+                'id': 'chatcmpl-mock',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [],
+                'usage': {'prompt_tokens': 10, 'completion_tokens': len(tokens), 'total_tokens': 10 + len(tokens)}
+            })
+        self._write_chunk(b'data: [DONE]\n\n')
+        self._end_stream()
+    
+    def _anthropic_messages(self, body):
+        model = body.get('model', 'mock-model')
+        tokens = self._limit_tokens(body.get('max_tokens'))
+        time.sleep(self.config.latency)
+        usage = {'input_tokens': 10, 'output_tokens': len(tokens)}
+        if self.config.should_fail():
+            self._send_json({'type': 'error', 'error': {'type': 'api_error', 'message': 'Injected failure'}},
+                            status=self.config.error_status)
+            return
+        
+        if not body.get('stream'):
+            self._sleep_for_tokens(len(tokens))
+            self._send_json({
+                'id': f"msg_{uuid.uuid4().hex}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': model,
+                'content': [{'type': 'text', 'text': ''.join(tokens)}],
+                'stop_reason': 'end_turn',
+                'stop_sequence': None,
+                'usage': usage
+            })
+            return
+        
+        self._start_stream()
+        self._send_event('message_start', {'type': 'message_start', 'message': {
+            'id': 'msg_mock', 'type': 'message', 'role': 'assistant', 'model': model, 'content': [],
+            'stop_reason': None, 'stop_sequence': None, 'usage': {'input_tokens': 10, 'output_tokens': 0}
+        }})
+        self._send_event('content_block_start', {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}})
+        for token in tokens:
+            self._send_event('content_block_delta', {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': token}})
+            self._sleep_for_tokens(1)
+        self._send_event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        self._send_event('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None}, 'usage': {'output_tokens': len(tokens)}})
+        self._send_event('message_stop', {'type': 'message_stop'})
+        self._end_stream()
+    
+    def _limit_tokens(self, max_tokens):
+        tokens = self.config.tokens()
+        return tokens[:max_tokens] if max_tokens else tokens
+    
+    def _sleep_for_tokens(self, count: int):
+        if self.config.tokens_per_second > 0:
+            time.sleep(count / self.config.tokens_per_second)
+    
+    def _send_json(self, payload, status: int = 200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+    
+    def _send_event(self, event, payload):
+        prefix = f"event: {event}\n" if event else ''
+        self._write_chunk(f"{prefix}data: {json.dumps(payload)}\n\n".encode())
+    
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+    
+    def _end_stream(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    
+    def __init__(self, address, config: MockLLMConfig):
+        super().__init__(address, MockLLMHandler)
+        self.config = config
+    
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose, e.g. when a stream is cancelled
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_mock_server(config: MockLLMConfig = None, host: str = '127.0.0.1', port: int = 0) -> MockLLMServer:
+    """Start the mock server on a background thread and return it"""
+    server = MockLLMServer((host, port), config or MockLLMConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds before the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--response-tokens', type=int, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of completions that fail')
+    parser.add_argument('--error-status', type=int, default=500, help='HTTP status of injected failures')
+    args = parser.parse_args()
+    
+    config = MockLLMConfig(args.latency, args.tokens_per_second, args.response_tokens,
+                           error_rate=args.error_rate, error_status=args.error_status)
+    server = MockLLMServer((args.host, args.port), config)
+    print(f"Mock LLM server listening on {server.base_url}")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+class Histogram:
+    """Histogram of durations in seconds; observing is a bisect and two additions under a lock"""
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+    
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics = []
+    
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str]) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str]) -> Histogram:
+        metric = Histogram(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+registry = MetricsRegistry()
+
+requests_total = registry.counter(
+    'chat_requests_total', 'Chat requests by endpoint, model and outcome', ('endpoint', 'provider', 'model', 'status')
+)
+stage_seconds = registry.histogram(
+    'chat_stage_seconds', 'Time spent in each stage of a chat request', ('stage', 'provider', 'model')
+)
+tokens_total = registry.counter(
+    'llm_tokens_total', 'Tokens reported in provider responses; input excludes cached_input (prompt cache reads) and cache_write', ('provider', 'model', 'type')
+)
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+class RequestTrace:
+    """Timing spans of one chat request
+    
+    Spans of the same stage add up (a stream spends many short moments
+    emitting events); all stages are recorded when the request finishes.
+    """
+    
+    def __init__(self, endpoint: str, provider: str = '', model: str = ''):
+        self.endpoint = endpoint
+        self.provider = provider
+        self.model = model
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.finished = False
+    
+    @contextmanager
+    def activate(self):
+        """Make this the trace that span() records into"""
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            try:
+                _current_trace.reset(token)
+            except ValueError:
+                # A stream generator closed from another context, e.g. by the garbage collector
+                pass
+    
+    def add(self, stage: str, seconds: float):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+    
+    def finish(self, status: str = 'ok'):
+        """Record the spans and the total request time"""
+        if self.finished:
+            return
+        self.finished = True
+        self.spans['total'] = time.perf_counter() - self.started
+        labels = (self.provider, self.model)
+        for stage, seconds in self.spans.items():
+            stage_seconds.observe((stage,) + labels, seconds)
+        requests_total.inc((self.endpoint,) + labels + (status,))
+    
+    def server_timing(self) -> str:
+        """Spans as a Server-Timing header value, in milliseconds"""
+        return ', '.join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.spans.items())
+
+@contextmanager
+def span(stage: str):
+    """Time a block as a stage of the current request, if there is one"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, time.perf_counter() - start)
+
+def record_tokens(provider: str, model: str, usage: Dict[str, Optional[int]]):
+    """Count token usage reported by a provider, e.g. {'input': 12, 'output': 80, 'cached_input': 2048}"""
+    for token_type, count in usage.items():
+        if count:
+            tokens_total.inc((provider, model, token_type), count)
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return registry.render()
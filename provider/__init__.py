@@ -1,7 +1,20 @@
 from .base import BaseProvider
-from .openai_provider import OpenAIProvider
-from .claude_provider import ClaudeProvider
-from .deepseek_provider import DeepSeekProvider
+from .clients import ClientRegistry, client_registry
+from .validation import ValidationCache, validation_cache
+from .wrapper import ProviderWrapper
+from .response_cache import ResponseCache, CachingProvider, response_cache
+from .singleflight import SingleFlight, CoalescingProvider, single_flight
+from .router import RoutedResponse, RoutingProvider, answered_by, routing_stats
+from .ratelimit import AdmissionController, RateLimitedProvider, RateLimitExceeded, admission_registry
+from .registry import ProviderRegistry, provider_registry
+
+# Built-in provider classes stay importable from here, but their modules (and SDKs) load on first access
+LAZY_PROVIDER_CLASSES = {'OpenAIProvider': 'openai', 'ClaudeProvider': 'claude', 'DeepSeekProvider': 'deepseek'}
+
+def __getattr__(name):
+    if name in LAZY_PROVIDER_CLASSES:
+        return provider_registry.get(LAZY_PROVIDER_CLASSES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class ProviderFactory:
     """Factory class to create provider instances"""
@@ -9,18 +22,15 @@ class ProviderFactory:
     @staticmethod
     def create_provider(provider_name: str, api_key: str, model_name: str) -> BaseProvider:
         """Create a provider instance based on the provider name"""
-        providers = {
-            'openai': OpenAIProvider,
-            'claude': ClaudeProvider,
-            'deepseek': DeepSeekProvider
-        }
-        
-        if provider_name not in providers:
-            raise ValueError(f"Unsupported provider: {provider_name}")
+        provider = provider_registry.get(provider_name)(api_key, model_name)
         
-        return providers[provider_name](api_key, model_name)
+        # Every provider of the same account shares one admission controller
+        controller = admission_registry.controller_for(provider_name, api_key)
+        if controller:
+            provider = RateLimitedProvider(provider, controller)
+        return provider
     
     @staticmethod
     def get_supported_providers():
-        """Get list of supported provider names"""
-        return ['openai', 'claude', 'deepseek']
\ No newline at end of file
+        """Get list of supported provider names, including providers installed as plugins"""
+        return provider_registry.names()
\ No newline at end of file
@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Union
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple, Union
+import asyncio
+from metrics import record_tokens
 
 class BaseProvider(ABC):
     """Base class for all LLM providers"""
     
+    # Providers with an asynchronous batch API (lower price, higher throughput) override the batch methods
+    supports_batch = False
+    
     def __init__(self, api_key: str, model_name: str):
         self.api_key = api_key
         self.model_name = model_name
@@ -13,6 +18,47 @@ class BaseProvider(ABC):
         """Generate a response from the model"""
         pass
     
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        """Generate a response from the model, yielding text deltas as they arrive.
+
+        Providers without a native streaming API fall back to yielding the
+        complete response as a single delta.
+        """
+        yield self.generate_response(message, **kwargs)
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        """Generate a response without blocking the event loop
+
+        Providers with an async SDK client should override this; the default
+        runs the blocking call in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate_response, message, **kwargs)
+    
+    async def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        """Async counterpart of stream_response"""
+        yield await self.agenerate_response(message, **kwargs)
+    
+    def submit_batch(self, requests: List[Tuple[str, Union[str, List[Dict[str, str]]], Dict[str, Any]]]) -> str:
+        """Submit (custom_id, message, options) requests to the provider's batch API and return the batch id"""
+        raise NotImplementedError(f"{self.provider_name} has no batch API")
+    
+    def batch_done(self, batch_id: str) -> bool:
+        """Return whether a submitted batch has finished processing"""
+        raise NotImplementedError(f"{self.provider_name} has no batch API")
+    
+    def batch_results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield {'custom_id', 'content'} or {'custom_id', 'error'} for each request of a finished batch"""
+        raise NotImplementedError(f"{self.provider_name} has no batch API")
+    
+    def _record_usage(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0, cache_write_tokens: int = 0):
+        """Count the tokens reported by an upstream response; input_tokens excludes prompt cache reads and writes"""
+        record_tokens(self.provider_name, self.model_name, {
+            'input': input_tokens,
+            'output': output_tokens,
+            'cached_input': cached_tokens,
+            'cache_write': cache_write_tokens
+        })
+    
     @abstractmethod
     def validate_model(self) -> bool:
         """Validate if the model exists and is accessible"""
@@ -22,4 +68,4 @@ class BaseProvider(ABC):
     @abstractmethod
     def provider_name(self) -> str:
         """Return the name of the provider"""
-        pass
\ No newline at end of file
+        pass
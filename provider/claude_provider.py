@@ -1,37 +1,110 @@
-from typing import Union, List, Dict
+import os
+from typing import Any, AsyncIterator, Iterator, Union, List, Dict, Optional, Tuple
 from .base import BaseProvider
+from .clients import client_registry
 import anthropic
 
+# Mark the system prompt and conversation prefix as cacheable (PROMPT_CACHING=0 turns it off)
+PROMPT_CACHING = os.environ.get('PROMPT_CACHING', '1').lower() not in ('0', 'false', 'no')
+CACHE_CONTROL = {"type": "ephemeral"}
+
 class ClaudeProvider(BaseProvider):
     """Claude provider using official Anthropic client"""
     
+    supports_batch = True
+    
     def __init__(self, api_key: str, model_name: str):
         super().__init__(api_key, model_name)
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = client_registry.anthropic_client(self.api_key)
+    
+    @property
+    def async_client(self) -> anthropic.AsyncAnthropic:
+        """Shared async client for the running event loop"""
+        return client_registry.async_anthropic_client(self.api_key)
     
     def generate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
         """Generate response using Anthropic API"""
         try:
-            if isinstance(message, str):
-                messages = [{"role": "user", "content": message}]
-            elif isinstance(message, list):
-                # Filter out system messages for Anthropic format
-                messages = [msg for msg in message if msg.get("role") in ["user", "assistant"]]
-                if not messages:
-                    messages = [{"role": "user", "content": str(message)}]
-            else:
-                messages = [{"role": "user", "content": str(message)}]
-            
-            response = self.client.messages.create(
-                model=self.model_name,
-                max_tokens=kwargs.get('max_tokens', 1000),
-                messages=messages
-            )
+            response = self.client.messages.create(**self._request_params(message, **kwargs))
+            self._record_message_usage(response.usage)
+            return response.content[0].text
+        except Exception as e:
+            raise Exception(f"Claude API error: {str(e)}")
+    
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        """Stream response deltas using Anthropic API"""
+        try:
+            with self.client.messages.stream(**self._request_params(message, **kwargs)) as stream:
+                for text in stream.text_stream:
+                    yield text
+                self._record_message_usage(stream.get_final_message().usage)
+        except Exception as e:
+            raise Exception(f"Claude API error: {str(e)}")
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        """Generate response using the async Anthropic client"""
+        try:
+            response = await self.async_client.messages.create(**self._request_params(message, **kwargs))
+            self._record_message_usage(response.usage)
             return response.content[0].text
         except Exception as e:
             raise Exception(f"Claude API error: {str(e)}")
     
+    async def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        """Stream response deltas using the async Anthropic client"""
+        try:
+            async with self.async_client.messages.stream(**self._request_params(message, **kwargs)) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                self._record_message_usage((await stream.get_final_message()).usage)
+        except Exception as e:
+            raise Exception(f"Claude API error: {str(e)}")
+    
+    def submit_batch(self, requests: List[Tuple[str, Union[str, List[Dict[str, str]]], Dict[str, Any]]]) -> str:
+        """Create a Message Batch from the requests"""
+        try:
+            batch = self.client.messages.batches.create(requests=[
+                {"custom_id": custom_id, "params": self._request_params(message, **options)}
+                for custom_id, message, options in requests
+            ])
+            return batch.id
+        except Exception as e:
+            raise Exception(f"Claude API error: {str(e)}")
+    
+    def batch_done(self, batch_id: str) -> bool:
+        """Check whether a Message Batch has ended"""
+        try:
+            return self.client.messages.batches.retrieve(batch_id).processing_status == "ended"
+        except Exception as e:
+            raise Exception(f"Claude API error: {str(e)}")
+    
+    def batch_results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream the results of an ended Message Batch"""
+        try:
+            for entry in self.client.messages.batches.results(batch_id):
+                result = entry.result
+                if result.type != "succeeded":
+                    error = getattr(result, 'error', None)
+                    yield {'custom_id': entry.custom_id, 'error': str(error) if error else result.type}
+                    continue
+                self._record_message_usage(result.message.usage)
+                yield {'custom_id': entry.custom_id, 'content': result.message.content[0].text}
+        except Exception as e:
+            raise Exception(f"Claude API error: {str(e)}")
+    
     def validate_model(self) -> bool:
+        """Validate if the model exists by looking it up in the models API"""
+        try:
+            self.client.models.retrieve(self.model_name)
+            return True
+        except (anthropic.NotFoundError, anthropic.AuthenticationError, anthropic.PermissionDeniedError) as e:
+            print(f"Model validation failed for {self.model_name}: {str(e)}")
+            return False
+        except Exception:
+            # Models endpoint unavailable; fall back to a minimal completion
+            return self._validate_with_completion()
+    
+    def _validate_with_completion(self) -> bool:
         """Validate if the model exists by making a test call"""
         try:
             response = self.client.messages.create(
@@ -46,4 +119,44 @@ class ClaudeProvider(BaseProvider):
     
     @property
     def provider_name(self) -> str:
-        return "claude"
\ No newline at end of file
+        return "claude"
+    
+    def _request_params(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Dict[str, Any]:
+        """Build Messages API parameters, with cache breakpoints on the prefix a chat resends every turn
+
+        The system prompt is cached on its own, so it is reused even when the
+        context window moves; the breakpoint on the latest message caches the
+        whole conversation so far for the next turn, which extends it.
+        """
+        system, messages = self._format_messages(message)
+        params = {"model": self.model_name, "max_tokens": kwargs.get('max_tokens', 1000), "messages": messages}
+        # One-off prompts are not worth the price of a cache write
+        caching = PROMPT_CACHING and isinstance(message, list)
+        if system:
+            params["system"] = [dict({"type": "text", "text": system}, **({"cache_control": CACHE_CONTROL} if caching else {}))]
+        if caching:
+            last = messages[-1]
+            messages[-1] = {"role": last["role"], "content": [{"type": "text", "text": last["content"], "cache_control": CACHE_CONTROL}]}
+        return params
+    
+    def _format_messages(self, message: Union[str, List[Dict[str, str]]]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """Convert a prompt or chat context into an Anthropic system prompt and messages"""
+        if isinstance(message, str):
+            return None, [{"role": "user", "content": message}]
+        if isinstance(message, list):
+            # Anthropic takes the system prompt as a separate parameter
+            system = "\n\n".join(msg["content"] for msg in message if msg.get("role") == "system")
+            messages = [{"role": msg["role"], "content": msg["content"]} for msg in message if msg.get("role") in ["user", "assistant"]]
+            if not messages:
+                messages = [{"role": "user", "content": str(message)}]
+            return system or None, messages
+        return None, [{"role": "user", "content": str(message)}]
+    
+    def _record_message_usage(self, usage):
+        """Count input, output, cache read and cache write tokens of a message"""
+        self._record_usage(
+            usage.input_tokens,
+            usage.output_tokens,
+            getattr(usage, 'cache_read_input_tokens', None) or 0,
+            getattr(usage, 'cache_creation_input_tokens', None) or 0
+        )
\ No newline at end of file
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+if TYPE_CHECKING:
+    import anthropic
+    import openai
+
+class ClientRegistry:
+    """Process-wide registry of SDK clients shared by all provider instances
+
+    Clients are keyed by SDK, API key and base URL, so every agent talking to
+    the same account reuses one HTTP connection pool and warm requests skip
+    DNS, TCP and TLS setup. Async clients are additionally kept per event
+    loop, since their connections cannot be shared across loops.
+    """
+    
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 60.0, timeout: float = 600.0, connect_timeout: float = 10.0):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._clients = {}
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> {key: client}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+    
+    @classmethod
+    def from_env(cls) -> 'ClientRegistry':
+        """Build a registry with pool sizes and timeouts from environment variables"""
+        return cls(
+            max_connections=int(os.environ.get('PROVIDER_MAX_CONNECTIONS', '100')),
+            max_keepalive_connections=int(os.environ.get('PROVIDER_MAX_KEEPALIVE_CONNECTIONS', '20')),
+            keepalive_expiry=float(os.environ.get('PROVIDER_KEEPALIVE_EXPIRY', '60')),
+            timeout=float(os.environ.get('PROVIDER_TIMEOUT', '600')),
+            connect_timeout=float(os.environ.get('PROVIDER_CONNECT_TIMEOUT', '10'))
+        )
+    
+    def openai_client(self, api_key: str, base_url: Optional[str] = None) -> 'openai.OpenAI':
+        """Shared OpenAI-compatible client for api_key and base_url"""
+        import openai  # imported on first use so startup does not pay for unused SDKs
+        return self._get(self._clients, ('openai', api_key, base_url), lambda: openai.OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self._timeout(openai),
+            http_client=openai.DefaultHttpxClient(limits=self._limits(openai), timeout=self._timeout(openai))
+        ))
+    
+    def async_openai_client(self, api_key: str, base_url: Optional[str] = None) -> 'openai.AsyncOpenAI':
+        """Shared async OpenAI-compatible client for the running event loop"""
+        import openai
+        return self._get(self._loop_clients(), ('openai', api_key, base_url), lambda: openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self._timeout(openai),
+            http_client=openai.DefaultAsyncHttpxClient(limits=self._limits(openai), timeout=self._timeout(openai))
+        ))
+    
+    def anthropic_client(self, api_key: str, base_url: Optional[str] = None) -> 'anthropic.Anthropic':
+        """Shared Anthropic client for api_key and base_url"""
+        import anthropic
+        return self._get(self._clients, ('anthropic', api_key, base_url), lambda: anthropic.Anthropic(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self._timeout(anthropic),
+            http_client=anthropic.DefaultHttpxClient(limits=self._limits(anthropic), timeout=self._timeout(anthropic))
+        ))
+    
+    def async_anthropic_client(self, api_key: str, base_url: Optional[str] = None) -> 'anthropic.AsyncAnthropic':
+        """Shared async Anthropic client for the running event loop"""
+        import anthropic
+        return self._get(self._loop_clients(), ('anthropic', api_key, base_url), lambda: anthropic.AsyncAnthropic(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self._timeout(anthropic),
+            http_client=anthropic.DefaultAsyncHttpxClient(limits=self._limits(anthropic), timeout=self._timeout(anthropic))
+        ))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of pooled clients and how often they were reused"""
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'async_clients': sum(len(clients) for clients in self._async_clients.values()),
+                'created': self.created,
+                'reused': self.reused,
+                'max_connections': self.max_connections,
+                'max_keepalive_connections': self.max_keepalive_connections
+            }
+    
+    def clear(self):
+        """Close and forget all sync clients (async clients close with their event loop)"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+    
+    def _get(self, clients: Dict, key: tuple, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            client = clients.get(key)
+            if client is not None:
+                self.reused += 1
+                return client
+            client = clients[key] = build()
+            self.created += 1
+            return client
+    
+    def _loop_clients(self) -> Dict:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            return self._async_clients.setdefault(loop, {})
+    
+    def _limits(self, sdk):
+        # Build the pool limits with the SDK's own HTTP transport classes
+        return type(sdk.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+    
+    def _timeout(self, sdk):
+        return sdk.Timeout(self.timeout, connect=self.connect_timeout)
+
+# Shared by every provider instance in the process
+client_registry = ClientRegistry.from_env()
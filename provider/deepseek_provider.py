@@ -1,36 +1,109 @@
-from typing import Union, List, Dict
+from typing import AsyncIterator, Iterator, Union, List, Dict
 from .base import BaseProvider
+from .clients import client_registry
 import openai
+import os
+
+DEFAULT_BASE_URL = "https://api.deepseek.com/v1"
 
 class DeepSeekProvider(BaseProvider):
     """DeepSeek provider using OpenAI-compatible API"""
     
     def __init__(self, api_key: str, model_name: str):
         super().__init__(api_key, model_name)
-        self.client = openai.OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com/v1"
-        )
+        self.base_url = os.environ.get('DEEPSEEK_BASE_URL', DEFAULT_BASE_URL)
+        self.client = client_registry.openai_client(self.api_key, self.base_url)
+    
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """Shared async client for the running event loop"""
+        return client_registry.async_openai_client(self.api_key, self.base_url)
     
     def generate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
         """Generate response using DeepSeek API"""
         try:
-            if isinstance(message, str):
-                messages = [{"role": "user", "content": message}]
-            else:
-                messages = message
-            
             response = self.client.chat.completions.create(
                 model=self.model_name,
-                messages=messages,
+                messages=self._format_messages(message),
                 max_tokens=kwargs.get('max_tokens', 1000),
                 temperature=kwargs.get('temperature', 0.7)
             )
+            if response.usage:
+                self._record_completion_usage(response.usage)
             return response.choices[0].message.content
         except Exception as e:
             raise Exception(f"DeepSeek API error: {str(e)}")
     
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        """Stream response deltas using DeepSeek API"""
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._format_messages(message),
+                max_tokens=kwargs.get('max_tokens', 1000),
+                temperature=kwargs.get('temperature', 0.7),
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    self._record_completion_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise Exception(f"DeepSeek API error: {str(e)}")
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        """Generate response using the async DeepSeek client"""
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=self._format_messages(message),
+                max_tokens=kwargs.get('max_tokens', 1000),
+                temperature=kwargs.get('temperature', 0.7)
+            )
+            if response.usage:
+                self._record_completion_usage(response.usage)
+            return response.choices[0].message.content
+        except Exception as e:
+            raise Exception(f"DeepSeek API error: {str(e)}")
+    
+    async def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        """Stream response deltas using the async DeepSeek client"""
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=self._format_messages(message),
+                max_tokens=kwargs.get('max_tokens', 1000),
+                temperature=kwargs.get('temperature', 0.7),
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    self._record_completion_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise Exception(f"DeepSeek API error: {str(e)}")
+    
     def validate_model(self) -> bool:
+        """Validate if the model exists by listing the available models"""
+        try:
+            available = {model.id for model in self.client.models.list()}
+        except (openai.AuthenticationError, openai.PermissionDeniedError) as e:
+            print(f"Model validation failed for {self.model_name}: {str(e)}")
+            return False
+        except Exception:
+            # Model listing unavailable; fall back to a minimal completion
+            return self._validate_with_completion()
+        
+        if self.model_name not in available:
+            print(f"Model validation failed for {self.model_name}: not in {sorted(available)}")
+            return False
+        return True
+    
+    def _validate_with_completion(self) -> bool:
         """Validate if the model exists by making a test call"""
         try:
             response = self.client.chat.completions.create(
@@ -45,4 +118,15 @@ class DeepSeekProvider(BaseProvider):
     
     @property
     def provider_name(self) -> str:
-        return "deepseek"
\ No newline at end of file
+        return "deepseek"
+    
+    def _record_completion_usage(self, usage):
+        """Count prompt, completion and context cache hit tokens (DeepSeek caches prompt prefixes on disk)"""
+        cached = getattr(usage, 'prompt_cache_hit_tokens', None) or 0
+        self._record_usage(usage.prompt_tokens - cached, usage.completion_tokens, cached)
+    
+    def _format_messages(self, message: Union[str, List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """Convert a prompt or chat context into chat completion messages"""
+        if isinstance(message, str):
+            return [{"role": "user", "content": message}]
+        return message
\ No newline at end of file
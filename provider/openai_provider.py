@@ -1,33 +1,161 @@
-from typing import Union, List, Dict
+from typing import Any, AsyncIterator, Iterator, Union, List, Dict, Tuple
+import json
 from .base import BaseProvider
+from .clients import client_registry
 import openai
 
 class OpenAIProvider(BaseProvider):
     """OpenAI provider using official OpenAI client"""
     
+    supports_batch = True
+    
     def __init__(self, api_key: str, model_name: str):
         super().__init__(api_key, model_name)
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = client_registry.openai_client(self.api_key)
+    
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """Shared async client for the running event loop"""
+        return client_registry.async_openai_client(self.api_key)
     
     def generate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
         """Generate response using OpenAI API"""
         try:
-            if isinstance(message, str):
-                messages = [{"role": "user", "content": message}]
-            else:
-                messages = message
-            
             response = self.client.chat.completions.create(
                 model=self.model_name,
-                messages=messages,
+                messages=self._format_messages(message),
                 max_tokens=kwargs.get('max_tokens', 1000),
                 temperature=kwargs.get('temperature', 0.7)
             )
+            if response.usage:
+                self._record_completion_usage(response.usage)
             return response.choices[0].message.content
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
     
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        """Stream response deltas using OpenAI API"""
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._format_messages(message),
+                max_tokens=kwargs.get('max_tokens', 1000),
+                temperature=kwargs.get('temperature', 0.7),
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    self._record_completion_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        """Generate response using the async OpenAI client"""
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=self._format_messages(message),
+                max_tokens=kwargs.get('max_tokens', 1000),
+                temperature=kwargs.get('temperature', 0.7)
+            )
+            if response.usage:
+                self._record_completion_usage(response.usage)
+            return response.choices[0].message.content
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    async def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        """Stream response deltas using the async OpenAI client"""
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=self._format_messages(message),
+                max_tokens=kwargs.get('max_tokens', 1000),
+                temperature=kwargs.get('temperature', 0.7),
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    self._record_completion_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    def submit_batch(self, requests: List[Tuple[str, Union[str, List[Dict[str, str]]], Dict[str, Any]]]) -> str:
+        """Upload chat completion requests as a JSONL file and start a batch on it"""
+        try:
+            lines = [
+                json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": self.model_name,
+                        "messages": self._format_messages(message),
+                        "max_tokens": options.get('max_tokens', 1000),
+                        "temperature": options.get('temperature', 0.7)
+                    }
+                })
+                for custom_id, message, options in requests
+            ]
+            batch_file = self.client.files.create(file=("batch.jsonl", "\n".join(lines).encode()), purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            return batch.id
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    def batch_done(self, batch_id: str) -> bool:
+        """Check whether a batch has completed, failed, expired or been cancelled"""
+        try:
+            return self.client.batches.retrieve(batch_id).status in ('completed', 'failed', 'expired', 'cancelled')
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    def batch_results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Read the output and error files of a finished batch"""
+        try:
+            batch = self.client.batches.retrieve(batch_id)
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    response = record.get('response') or {}
+                    body = response.get('body') or {}
+                    if record.get('error') or response.get('status_code') != 200:
+                        yield {'custom_id': record['custom_id'], 'error': str(record.get('error') or body.get('error'))}
+                        continue
+                    usage = body.get('usage') or {}
+                    cached = (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+                    self._record_usage((usage.get('prompt_tokens') or 0) - cached, usage.get('completion_tokens'), cached)
+                    yield {'custom_id': record['custom_id'], 'content': body['choices'][0]['message']['content']}
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
     def validate_model(self) -> bool:
+        """Validate if the model exists by looking it up in the models API"""
+        try:
+            self.client.models.retrieve(self.model_name)
+            return True
+        except (openai.NotFoundError, openai.AuthenticationError, openai.PermissionDeniedError) as e:
+            print(f"Model validation failed for {self.model_name}: {str(e)}")
+            return False
+        except Exception:
+            # Models endpoint unavailable; fall back to a minimal completion
+            return self._validate_with_completion()
+    
+    def _validate_with_completion(self) -> bool:
         """Validate if the model exists by making a test call"""
         try:
             response = self.client.chat.completions.create(
@@ -42,4 +170,16 @@ class OpenAIProvider(BaseProvider):
     
     @property
     def provider_name(self) -> str:
-        return "openai"
\ No newline at end of file
+        return "openai"
+    
+    def _record_completion_usage(self, usage):
+        """Count prompt, completion and cached prompt tokens (prompts are cached automatically by prefix)"""
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) or 0
+        self._record_usage(usage.prompt_tokens - cached, usage.completion_tokens, cached)
+    
+    def _format_messages(self, message: Union[str, List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """Convert a prompt or chat context into chat completion messages"""
+        if isinstance(message, str):
+            return [{"role": "user", "content": message}]
+        return message
\ No newline at end of file
@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+from .base import BaseProvider
+from .wrapper import ProviderWrapper
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot be admitted within the queue limits"""
+    pass
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute, holding at most one minute of budget"""
+    
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (0 if it can be taken now)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request larger than the whole bucket is admitted once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+class _Ticket:
+    def __init__(self, session_id: str, tokens: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.session_id = session_id
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        # Async waiters sleep on an event of their own loop instead of the condition
+        self.loop = loop
+        self.wakeup = asyncio.Event() if loop is not None else None
+
+class AdmissionController:
+    """Admits requests to one provider account under request and token rate limits
+
+    Requests that cannot be admitted immediately wait in a bounded queue
+    that is served round-robin across sessions, so one busy session cannot
+    starve the others. Token costs are estimated up front from the prompt
+    plus max_tokens, which is also how upstream APIs count them.
+    """
+    
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_queue: int = 100, max_wait: float = 60.0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._queues = OrderedDict()  # session_id -> deque of tickets, in round-robin order
+        self._queued = 0
+        self._condition = threading.Condition()
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+    
+    def try_acquire(self, tokens: int) -> bool:
+        """Admit a request immediately if nobody is queued and the buckets allow it"""
+        with self._condition:
+            if self._queued == 0 and self._wait_time(tokens, time.monotonic()) == 0:
+                self._take(tokens)
+                self._record_admission(0.0)
+                return True
+        return False
+    
+    def acquire(self, session_id: Optional[str], tokens: int):
+        """Block until the request is admitted, raising RateLimitExceeded if the queue is full or the wait too long"""
+        if self.try_acquire(tokens):
+            return
+        
+        ticket = _Ticket(session_id or '', tokens)
+        deadline = ticket.enqueued + self.max_wait
+        with self._condition:
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise RateLimitExceeded(f"Rate limit queue is full ({self.max_queue} requests waiting)")
+            self._queues.setdefault(ticket.session_id, deque()).append(ticket)
+            self._queued += 1
+            
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now >= deadline:
+                        self.rejected += 1
+                        raise RateLimitExceeded(f"Rate limited: not admitted within {self.max_wait:.0f}s")
+                    
+                    if self._head() is ticket:
+                        wait = self._wait_time(tokens, now)
+                        if wait == 0:
+                            self._take(tokens)
+                            self._record_admission(now - ticket.enqueued)
+                            return
+                        self._condition.wait(min(wait, deadline - now))
+                    else:
+                        self._condition.wait(deadline - now)
+            finally:
+                self._remove(ticket)
+                self._wake()
+    
+    async def aacquire(self, session_id: Optional[str], tokens: int):
+        """Async counterpart of acquire; waits on the event loop without occupying a thread"""
+        if self.try_acquire(tokens):
+            return
+        
+        ticket = _Ticket(session_id or '', tokens, asyncio.get_running_loop())
+        deadline = ticket.enqueued + self.max_wait
+        with self._condition:
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise RateLimitExceeded(f"Rate limit queue is full ({self.max_queue} requests waiting)")
+            self._queues.setdefault(ticket.session_id, deque()).append(ticket)
+            self._queued += 1
+        
+        try:
+            while True:
+                with self._condition:
+                    now = time.monotonic()
+                    if now >= deadline:
+                        self.rejected += 1
+                        raise RateLimitExceeded(f"Rate limited: not admitted within {self.max_wait:.0f}s")
+                    
+                    timeout = deadline - now
+                    if self._head() is ticket:
+                        wait = self._wait_time(tokens, now)
+                        if wait == 0:
+                            self._take(tokens)
+                            self._record_admission(now - ticket.enqueued)
+                            return
+                        timeout = min(wait, timeout)
+                    # Cleared under the lock, so a wake after this check is not lost
+                    ticket.wakeup.clear()
+                try:
+                    await asyncio.wait_for(ticket.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                self._remove(ticket)
+                self._wake()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'queue_depth': self._queued,
+                'queued_sessions': len(self._queues),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+                'max_wait_ms': round(self.max_observed_wait * 1000, 1)
+            }
+    
+    def _head(self) -> Optional[_Ticket]:
+        """The ticket allowed to try the buckets next: the oldest of the session whose turn it is"""
+        for queue in self._queues.values():
+            if queue:
+                return queue[0]
+        return None
+    
+    def _remove(self, ticket: _Ticket):
+        queue = self._queues.get(ticket.session_id)
+        if queue is None or ticket not in queue:
+            return
+        served_first = queue[0] is ticket
+        queue.remove(ticket)
+        self._queued -= 1
+        if not queue:
+            del self._queues[ticket.session_id]
+        elif served_first:
+            # Round-robin: the session goes to the back of the line for its next request
+            self._queues.move_to_end(ticket.session_id)
+    
+    def _wake(self):
+        """Wake every waiter to recheck the queue; call with the condition held"""
+        self._condition.notify_all()
+        for queue in self._queues.values():
+            for ticket in queue:
+                if ticket.loop is not None:
+                    try:
+                        ticket.loop.call_soon_threadsafe(ticket.wakeup.set)
+                    except RuntimeError:
+                        pass  # the waiter's loop is closed
+    
+    def _wait_time(self, tokens: int, now: float) -> float:
+        waits = [0.0]
+        if self.request_bucket:
+            waits.append(self.request_bucket.wait_time(1, now))
+        if self.token_bucket:
+            waits.append(self.token_bucket.wait_time(tokens, now))
+        return max(waits)
+    
+    def _take(self, tokens: int):
+        if self.request_bucket:
+            self.request_bucket.take(1)
+        if self.token_bucket:
+            self.token_bucket.take(tokens)
+    
+    def _record_admission(self, waited: float):
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_observed_wait = max(self.max_observed_wait, waited)
+
+class AdmissionRegistry:
+    """One admission controller per provider and API key
+
+    Limits come from RATE_LIMITS, a JSON object of provider name to
+    {"rpm": ..., "tpm": ...}; providers without an entry are not limited.
+    """
+    
+    def __init__(self, limits: Dict[str, Dict[str, float]], max_queue: int = 100, max_wait: float = 60.0):
+        self.limits = limits
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._controllers = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls) -> 'AdmissionRegistry':
+        return cls(
+            json.loads(os.environ.get('RATE_LIMITS') or '{}'),
+            max_queue=int(os.environ.get('RATE_LIMIT_QUEUE_SIZE', '100')),
+            max_wait=float(os.environ.get('RATE_LIMIT_MAX_WAIT', '60'))
+        )
+    
+    def controller_for(self, provider_name: str, api_key: str) -> Optional[AdmissionController]:
+        """Return the shared controller of a provider account, or None if it is not limited"""
+        limits = self.limits.get(provider_name)
+        if not limits:
+            return None
+        key = (provider_name, hashlib.sha256(api_key.encode()).hexdigest()[:16])
+        with self._lock:
+            if key not in self._controllers:
+                self._controllers[key] = AdmissionController(
+                    limits.get('rpm'), limits.get('tpm'), self.max_queue, self.max_wait
+                )
+            return self._controllers[key]
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            controllers = list(self._controllers.items())
+        return {f"{provider_name}:{fingerprint}": controller.stats() for (provider_name, fingerprint), controller in controllers}
+
+def estimate_tokens(message: Union[str, List[Dict[str, str]]], kwargs: Dict[str, Any]) -> int:
+    """Estimate a request's token cost as prompt characters / 4 plus max_tokens"""
+    if isinstance(message, str):
+        characters = len(message)
+    else:
+        characters = sum(len(msg.get('content', '')) for msg in message)
+    return characters // 4 + kwargs.get('max_tokens', 1000)
+
+class RateLimitedProvider(ProviderWrapper):
+    """Provider wrapper that waits for admission before every upstream call
+
+    The caller's session is taken from the session_id keyword argument,
+    which is consumed here and not sent upstream.
+    """
+    
+    def __init__(self, provider: BaseProvider, controller: AdmissionController):
+        super().__init__(provider)
+        self.controller = controller
+    
+    def generate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        session_id = kwargs.pop('session_id', None)
+        self.controller.acquire(session_id, estimate_tokens(message, kwargs))
+        return self.provider.generate_response(message, **kwargs)
+    
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        session_id = kwargs.pop('session_id', None)
+        self.controller.acquire(session_id, estimate_tokens(message, kwargs))
+        yield from self.provider.stream_response(message, **kwargs)
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        session_id = kwargs.pop('session_id', None)
+        await self.controller.aacquire(session_id, estimate_tokens(message, kwargs))
+        return await self.provider.agenerate_response(message, **kwargs)
+    
+    async def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        session_id = kwargs.pop('session_id', None)
+        await self.controller.aacquire(session_id, estimate_tokens(message, kwargs))
+        async for delta in self.provider.astream_response(message, **kwargs):
+            yield delta
+
+# Shared by every provider created through ProviderFactory
+admission_registry = AdmissionRegistry.from_env()
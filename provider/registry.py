@@ -0,0 +1,100 @@
+import importlib
+import threading
+from importlib.metadata import entry_points
+from typing import Any, Dict, List, Optional, Type
+from .base import BaseProvider
+
+# Entry point group installed packages register providers in, e.g. in their pyproject.toml:
+#   [project.entry-points."chatagent.providers"]
+#   mistral = "chatagent_mistral:MistralProvider"
+ENTRY_POINT_GROUP = 'chatagent.providers'
+
+BUILTIN_PROVIDERS = {
+    'openai': 'provider.openai_provider:OpenAIProvider',
+    'claude': 'provider.claude_provider:ClaudeProvider',
+    'deepseek': 'provider.deepseek_provider:DeepSeekProvider'
+}
+
+class ProviderRegistry:
+    """Provider classes by name, imported on first use
+
+    Providers are registered as "module:Class" references, so a provider's
+    module, and the SDK it wraps, is only imported when the provider is first
+    created. Installed packages add providers through the chatagent.providers
+    entry point group; built-in and register()ed names take precedence.
+    """
+    
+    def __init__(self, providers: Dict[str, Any], group: Optional[str] = ENTRY_POINT_GROUP):
+        self._targets = dict(providers)  # name -> "module:Class", entry point or class
+        self._classes = {}
+        self._group = group
+        self._discovered = group is None
+        self._lock = threading.Lock()
+    
+    def register(self, name: str, target: Any):
+        """Register a provider class, or a "module:Class" reference to import on first use"""
+        with self._lock:
+            self._targets[name] = target
+            self._classes.pop(name, None)
+    
+    def names(self) -> List[str]:
+        """Return the registered provider names"""
+        self._discover()
+        with self._lock:
+            return list(self._targets)
+    
+    def get(self, name: str) -> Type[BaseProvider]:
+        """Return the provider class registered as name, importing it on first use"""
+        self._discover()
+        with self._lock:
+            provider_class = self._classes.get(name)
+            target = self._targets.get(name)
+        if provider_class is not None:
+            return provider_class
+        if target is None:
+            raise ValueError(f"Unsupported provider: {name}")
+        
+        provider_class = self._resolve(target)
+        if not (isinstance(provider_class, type) and issubclass(provider_class, BaseProvider)):
+            raise TypeError(f"Provider '{name}' ({target}) is not a BaseProvider subclass")
+        with self._lock:
+            self._classes[name] = provider_class
+        return provider_class
+    
+    def loaded(self) -> List[str]:
+        """Return the names of providers whose classes have been imported"""
+        with self._lock:
+            return list(self._classes)
+    
+    def _discover(self):
+        if self._discovered:
+            return
+        with self._lock:
+            if self._discovered:
+                return
+            self._discovered = True
+            try:
+                found = entry_points(group=self._group)
+            except Exception as e:
+                print(f"Error reading provider entry points: {e}")
+                return
+            for entry_point in found:
+                if entry_point.name in self._targets:
+                    print(f"Ignoring provider entry point {entry_point.name} = {entry_point.value}: name already registered")
+                    continue
+                self._targets[entry_point.name] = entry_point
+    
+    @staticmethod
+    def _resolve(target: Any) -> Any:
+        if isinstance(target, str):
+            module_name, _, attribute = target.partition(':')
+            resolved = importlib.import_module(module_name)
+            for part in attribute.split('.') if attribute else ():
+                resolved = getattr(resolved, part)
+            return resolved
+        if hasattr(target, 'load'):
+            return target.load()  # an entry point
+        return target
+
+# Shared by ProviderFactory and anything that lists the available providers
+provider_registry = ProviderRegistry(BUILTIN_PROVIDERS)
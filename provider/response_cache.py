@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+from .base import BaseProvider
+from .wrapper import ProviderWrapper
+
+# Request parameters that change the model's output and so belong in the key
+SAMPLING_PARAMS = {'max_tokens', 'temperature', 'top_p', 'stop', 'seed', 'presence_penalty', 'frequency_penalty'}
+
+# Defaults the providers apply when a parameter is omitted; filled in before
+# hashing so an omitted parameter and its explicit default share a cache key
+SAMPLING_DEFAULTS = {
+    'max_tokens': 1000,
+    'temperature': 0.7,
+}
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode form, line endings and surrounding whitespace so trivially different prompts share a key
+
+    Inner whitespace is kept: indentation and line breaks change the meaning
+    of code and YAML prompts.
+    """
+    return unicodedata.normalize('NFC', text).replace('\r\n', '\n').strip()
+
+def request_key(provider_name: str, model_name: str, message: Union[str, List[Dict[str, str]]],
+                params: Dict[str, Any]) -> str:
+    """Hash a provider request into a cache key
+
+    The key covers the model, every message of the context (including the
+    system prompt) and the sampling parameters.
+    """
+    if isinstance(message, str):
+        message = [{"role": "user", "content": message}]
+    sampling = dict(SAMPLING_DEFAULTS)
+    sampling.update({name: value for name, value in params.items() if name in SAMPLING_PARAMS and value is not None})
+    payload = {
+        'provider': provider_name,
+        'model': model_name.strip().lower(),
+        'messages': [[msg['role'].strip().lower(), normalize_text(msg['content'])] for msg in message],
+        'params': sampling,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class ResponseCache:
+    """Two-tier cache of model responses
+
+    A bounded in-memory LRU sits in front of an on-disk tier of one small JSON
+    file per entry. The disk tier is capped by total size and evicts the least
+    recently used files (by modification time) once the cap is exceeded.
+    """
+    
+    def __init__(self, memory_entries: int = 1024, directory: Optional[str] = 'response_cache',
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.memory_entries = memory_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._disk_bytes = None  # measured by the first disk pass, then kept up to date approximately
+        self._disk_pass_running = False
+        self._written_during_pass = 0  # bytes the running disk pass may not have seen
+        self._lock = threading.Lock()
+        self._model_stats = {}
+    
+    @classmethod
+    def from_env(cls) -> 'ResponseCache':
+        """Build a cache configured from environment variables"""
+        return cls(
+            memory_entries=int(os.environ.get('RESPONSE_CACHE_MEMORY_ENTRIES', '1024')),
+            directory=os.environ.get('RESPONSE_CACHE_DIR', 'response_cache') or None,
+            max_disk_bytes=int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+        )
+    
+    def get(self, key: str, model: str) -> Optional[str]:
+        """Return the cached response for key, recording a hit or miss for model"""
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self._record(model, 'memory_hits')
+                return response
+        
+        response = self._read_disk(key)
+        with self._lock:
+            if response is None:
+                self._record(model, 'misses')
+                return None
+            self._remember(key, response)
+            self._record(model, 'disk_hits')
+            return response
+    
+    def put(self, key: str, model: str, response: str):
+        """Store a response in both tiers"""
+        with self._lock:
+            self._remember(key, response)
+        self._write_disk(key, model, response)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit and miss counters per model plus tier sizes"""
+        with self._lock:
+            return {
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_bytes or 0,
+                'models': {model: dict(counters) for model, counters in self._model_stats.items()}
+            }
+    
+    def _record(self, model: str, counter: str):
+        counters = self._model_stats.setdefault(model, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0})
+        counters[counter] += 1
+    
+    def _remember(self, key: str, response: str):
+        """Insert into the memory tier (caller holds the lock)"""
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+    
+    def _read_disk(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used for eviction
+            return entry['response']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading response cache entry {key}: {e}")
+            return None
+    
+    def _write_disk(self, key: str, model: str, response: str):
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps({'model': model, 'response': response, 'created_at': time.time()})
+            # A unique temp file, so concurrent writers of one key (threads or workers) never interleave
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{key}.", suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            print(f"Error writing response cache entry {key}: {e}")
+            return
+        
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            if self._disk_pass_running:
+                self._written_during_pass += len(data)
+            start_pass = not self._disk_pass_running and (self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes)
+            if start_pass:
+                self._disk_pass_running = True
+                self._written_during_pass = 0
+        if start_pass:
+            threading.Thread(target=self._disk_pass, daemon=True, name='response-cache-eviction').start()
+    
+    def _disk_pass(self):
+        """Measure the disk tier and delete least recently used entries down to 90% of its cap
+
+        Runs in a background thread, without the lock, so walking a large
+        cache directory never delays requests.
+        """
+        try:
+            entries = sorted(self._disk_entries())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_disk_bytes * 0.9
+            if total > self.max_disk_bytes:
+                for _, size, path in entries:
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except FileNotFoundError:
+                        pass
+            with self._lock:
+                self._disk_bytes = total + self._written_during_pass
+        except Exception as e:
+            print(f"Error evicting response cache entries: {e}")
+        finally:
+            with self._lock:
+                self._disk_pass_running = False
+    
+    def _disk_entries(self) -> List[Tuple[float, int, str]]:
+        """Return (mtime, size, path) of the stored entries, skipping temp files still being written"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # evicted or replaced meanwhile
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+class CachingProvider(ProviderWrapper):
+    """Provider wrapper that answers repeated requests from a ResponseCache
+
+    Only deterministic requests (temperature 0) are cached, unless the caller
+    passes cache=True to opt in for a sampled request.
+    """
+    
+    def __init__(self, provider: BaseProvider, cache: ResponseCache):
+        super().__init__(provider)
+        self.cache = cache
+    
+    def generate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        key, kwargs = self._cache_key(message, kwargs)
+        if key is None:
+            return self.provider.generate_response(message, **kwargs)
+        
+        response = self.cache.get(key, self._model_label)
+        if response is None:
+            response = self.provider.generate_response(message, **kwargs)
+            self.cache.put(key, self._model_label, response)
+        return response
+    
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        key, kwargs = self._cache_key(message, kwargs)
+        if key is None:
+            yield from self.provider.stream_response(message, **kwargs)
+            return
+        
+        response = self.cache.get(key, self._model_label)
+        if response is not None:
+            yield response
+            return
+        
+        chunks = []
+        for delta in self.provider.stream_response(message, **kwargs):
+            chunks.append(delta)
+            yield delta
+        self.cache.put(key, self._model_label, ''.join(chunks))
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        key, kwargs = self._cache_key(message, kwargs)
+        if key is None:
+            return await self.provider.agenerate_response(message, **kwargs)
+        
+        response = self.cache.get(key, self._model_label)
+        if response is None:
+            response = await self.provider.agenerate_response(message, **kwargs)
+            self.cache.put(key, self._model_label, response)
+        return response
+    
+    async def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        key, kwargs = self._cache_key(message, kwargs)
+        if key is None:
+            async for delta in self.provider.astream_response(message, **kwargs):
+                yield delta
+            return
+        
+        response = self.cache.get(key, self._model_label)
+        if response is not None:
+            yield response
+            return
+        
+        chunks = []
+        async for delta in self.provider.astream_response(message, **kwargs):
+            chunks.append(delta)
+            yield delta
+        self.cache.put(key, self._model_label, ''.join(chunks))
+    
+    @property
+    def _model_label(self) -> str:
+        return f"{self.provider_name}/{self.model_name}"
+    
+    def _cache_key(self, message, kwargs):
+        """Return the cache key (or None if the request is not cacheable) and the upstream kwargs"""
+        kwargs = dict(kwargs)
+        opt_in = kwargs.pop('cache', False)
+        if not opt_in and kwargs.get('temperature') != 0:
+            return None, kwargs
+        return request_key(self.provider_name, self.model_name, message, kwargs), kwargs
+
+# Shared by all agents when RESPONSE_CACHE_ENABLED is set
+response_cache = ResponseCache.from_env()
@@ -0,0 +1,311 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+from .base import BaseProvider
+
+class ProviderHealth:
+    """Rolling latency and error statistics of one upstream provider/model"""
+    
+    def __init__(self, window: int = 100):
+        self._samples = deque(maxlen=window)  # (latency seconds, succeeded)
+        self._lock = threading.Lock()
+    
+    def record(self, latency: float, succeeded: bool):
+        with self._lock:
+            self._samples.append((latency, succeeded))
+    
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, succeeded in self._samples if not succeeded) / len(self._samples)
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency percentile of successful calls, or None without samples"""
+        with self._lock:
+            latencies = sorted(latency for latency, succeeded in self._samples if succeeded)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+    
+    def sample_count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+    
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            'samples': self.sample_count(),
+            'error_rate': round(self.error_rate(), 3),
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+class RoutedResponse(str):
+    """Response text, or a stream delta, labelled with the provider/model that produced it"""
+    
+    def __new__(cls, text: str, model_id: str):
+        response = super().__new__(cls, text)
+        response.model_id = model_id
+        return response
+    
+    def __reduce__(self):
+        return RoutedResponse, (str(self), self.model_id)
+
+def answered_by(text: str, default: str) -> str:
+    """Return the provider/model a routed response came from, or default for any other text"""
+    return getattr(text, 'model_id', None) or default
+
+def model_label(provider: BaseProvider) -> str:
+    return f"{provider.provider_name}/{provider.model_name}"
+
+class RoutingProvider(BaseProvider):
+    """Routes requests across equivalent provider/model pairs
+
+    Providers are tried healthiest first: those with an error rate above
+    unhealthy_error_rate go last, the rest are ordered by rolling median
+    latency (providers without samples keep their configured order, so
+    the first one is the primary). Each provider is retried with
+    exponential backoff before failing over to the next. A non-streaming
+    request still running after the first provider's p95 latency is
+    hedged by sending a duplicate to the next provider; whichever answers
+    first wins. Streams fail over only until their first delta. Responses
+    and deltas are RoutedResponse strings naming the provider that answered.
+    """
+    
+    def __init__(self, providers: List[BaseProvider], max_retries: int = 1, backoff: float = 0.5,
+                 hedge: bool = True, min_hedge_delay: float = 1.0, min_hedge_samples: int = 20,
+                 unhealthy_error_rate: float = 0.5):
+        if not providers:
+            raise ValueError("RoutingProvider needs at least one provider")
+        super().__init__(providers[0].api_key, providers[0].model_name)
+        self.providers = providers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.min_hedge_samples = min_hedge_samples
+        self.unhealthy_error_rate = unhealthy_error_rate
+    
+    @property
+    def provider_name(self) -> str:
+        return self.providers[0].provider_name
+    
+    def validate_model(self) -> bool:
+        return self.providers[0].validate_model()
+    
+    def generate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        ranked = self._ranked()
+        last_error = None
+        for index, provider in enumerate(ranked):
+            if index > 0:
+                routing_stats.record_failover()
+            backup = ranked[1] if index == 0 and len(ranked) > 1 else None
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if attempt == 0 and backup is not None:
+                        return self._hedged_call(provider, backup, message, kwargs)
+                    return self._timed_call(provider, message, kwargs)
+                except Exception as e:
+                    last_error = e
+                    if attempt < self.max_retries:
+                        time.sleep(self._backoff_delay(attempt))
+        raise Exception(f"All providers failed: {str(last_error)}")
+    
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        last_error = None
+        for index, provider in enumerate(self._ranked()):
+            if index > 0:
+                routing_stats.record_failover()
+            for attempt in range(self.max_retries + 1):
+                health = health_for(provider)
+                start = time.perf_counter()
+                started = False
+                try:
+                    for delta in provider.stream_response(message, **kwargs):
+                        if not started:
+                            started = True
+                            health.record(time.perf_counter() - start, True)
+                        yield RoutedResponse(delta, model_label(provider))
+                    return
+                except Exception as e:
+                    if started:
+                        # Part of the answer has been sent; switching providers would garble it
+                        raise
+                    health.record(time.perf_counter() - start, False)
+                    last_error = e
+                    if attempt < self.max_retries:
+                        time.sleep(self._backoff_delay(attempt))
+        raise Exception(f"All providers failed: {str(last_error)}")
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        ranked = self._ranked()
+        last_error = None
+        for index, provider in enumerate(ranked):
+            if index > 0:
+                routing_stats.record_failover()
+            backup = ranked[1] if index == 0 and len(ranked) > 1 else None
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if attempt == 0 and backup is not None:
+                        return await self._ahedged_call(provider, backup, message, kwargs)
+                    return await self._atimed_call(provider, message, kwargs)
+                except Exception as e:
+                    last_error = e
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(self._backoff_delay(attempt))
+        raise Exception(f"All providers failed: {str(last_error)}")
+    
+    async def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        last_error = None
+        for index, provider in enumerate(self._ranked()):
+            if index > 0:
+                routing_stats.record_failover()
+            for attempt in range(self.max_retries + 1):
+                health = health_for(provider)
+                start = time.perf_counter()
+                started = False
+                try:
+                    async for delta in provider.astream_response(message, **kwargs):
+                        if not started:
+                            started = True
+                            health.record(time.perf_counter() - start, True)
+                        yield RoutedResponse(delta, model_label(provider))
+                    return
+                except Exception as e:
+                    if started:
+                        raise
+                    health.record(time.perf_counter() - start, False)
+                    last_error = e
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(self._backoff_delay(attempt))
+        raise Exception(f"All providers failed: {str(last_error)}")
+    
+    def _ranked(self) -> List[BaseProvider]:
+        def score(item):
+            index, provider = item
+            health = health_for(provider)
+            p50 = health.percentile(0.5)
+            return (health.error_rate() > self.unhealthy_error_rate, p50 if p50 is not None else float('inf'), index)
+        
+        return [provider for _, provider in sorted(enumerate(self.providers), key=score)]
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        return self.backoff * (2 ** attempt) * random.uniform(0.8, 1.2)
+    
+    def _hedge_delay(self, provider: BaseProvider) -> Optional[float]:
+        """Seconds to wait before hedging, or None if there is not enough data yet"""
+        health = health_for(provider)
+        if not self.hedge or health.sample_count() < self.min_hedge_samples:
+            return None
+        p95 = health.percentile(0.95)
+        return max(p95, self.min_hedge_delay) if p95 is not None else None
+    
+    def _timed_call(self, provider: BaseProvider, message, kwargs) -> str:
+        start = time.perf_counter()
+        try:
+            response = provider.generate_response(message, **kwargs)
+        except Exception:
+            health_for(provider).record(time.perf_counter() - start, False)
+            raise
+        health_for(provider).record(time.perf_counter() - start, True)
+        return RoutedResponse(response, model_label(provider))
+    
+    def _hedged_call(self, primary: BaseProvider, backup: BaseProvider, message, kwargs) -> str:
+        delay = self._hedge_delay(primary)
+        if delay is None:
+            return self._timed_call(primary, message, kwargs)
+        
+        pending = {hedge_pool.submit(self._timed_call, primary, message, kwargs)}
+        done, _ = wait(pending, timeout=delay)
+        if not done:
+            routing_stats.record_hedge()
+            pending.add(hedge_pool.submit(self._timed_call, backup, message, kwargs))
+        
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The slower call keeps running in the pool; its result is discarded
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    async def _atimed_call(self, provider: BaseProvider, message, kwargs) -> str:
+        start = time.perf_counter()
+        try:
+            response = await provider.agenerate_response(message, **kwargs)
+        except Exception:
+            health_for(provider).record(time.perf_counter() - start, False)
+            raise
+        health_for(provider).record(time.perf_counter() - start, True)
+        return RoutedResponse(response, model_label(provider))
+    
+    async def _ahedged_call(self, primary: BaseProvider, backup: BaseProvider, message, kwargs) -> str:
+        delay = self._hedge_delay(primary)
+        if delay is None:
+            return await self._atimed_call(primary, message, kwargs)
+        
+        pending = {asyncio.ensure_future(self._atimed_call(primary, message, kwargs))}
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            routing_stats.record_hedge()
+            pending.add(asyncio.ensure_future(self._atimed_call(backup, message, kwargs)))
+        
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+class RoutingStats:
+    """Process-wide counters of hedged requests and failovers"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.failovers = 0
+    
+    def record_hedge(self):
+        with self._lock:
+            self.hedged += 1
+    
+    def record_failover(self):
+        with self._lock:
+            self.failovers += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {'hedged_requests': self.hedged, 'failovers': self.failovers}
+        counters['providers'] = {label: health.stats() for label, health in list(_health.items())}
+        return counters
+
+# Health is tracked per upstream provider/model and shared by all routing providers
+_health = {}
+_health_lock = threading.Lock()
+
+def health_for(provider: BaseProvider) -> ProviderHealth:
+    """Return the shared health record of a provider's upstream model"""
+    label = model_label(provider)
+    with _health_lock:
+        if label not in _health:
+            _health[label] = ProviderHealth()
+        return _health[label]
+
+routing_stats = RoutingStats()
+
+# Runs hedged requests; the losing call of a hedge finishes here in the background
+hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix='hedge')
@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Union
+from .base import BaseProvider
+from .wrapper import ProviderWrapper
+
+# Keyword arguments consumed by provider wrappers rather than sent upstream
+LOCAL_KWARGS = {'cache', 'session_id'}
+
+def account_fingerprint(provider: BaseProvider) -> str:
+    """Hash the API key and endpoint a provider calls, so different accounts never share a call"""
+    account = f"{provider.api_key}\n{getattr(provider, 'base_url', None) or ''}"
+    return hashlib.sha256(account.encode()).hexdigest()
+
+def payload_key(provider_name: str, model_name: str, message: Union[str, List[Dict[str, str]]],
+                kwargs: Dict[str, Any], stream: bool, account: str = '') -> str:
+    """Hash exactly what a provider call would send upstream, and the account it is sent with"""
+    payload = {
+        'account': account,
+        'provider': provider_name,
+        'model': model_name,
+        'message': message,
+        'params': {name: value for name, value in kwargs.items() if name not in LOCAL_KWARGS},
+        'stream': stream,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+class _Call:
+    """An in-flight upstream call that later identical calls can join"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _AsyncCall:
+    """An in-flight upstream call run as a task, so no single caller's cancellation ends it"""
+    
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+class _StreamCall:
+    """An in-flight upstream stream whose deltas are buffered for every joined reader"""
+    
+    def __init__(self, upstream, condition):
+        self.upstream = upstream
+        self.pump = None  # async streams: the task reading upstream
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.readers = 1
+        self.condition = condition
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one upstream call
+
+    The first caller for a key (the leader) performs the call; callers
+    arriving while it is in flight wait for and share its result. For
+    streams, followers replay the deltas received so far and then follow
+    the live stream. Nothing is cached: once a call completes, the next
+    identical request goes upstream again.
+    """
+    
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self._async_calls = {}
+        self._async_streams = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+    
+    def do(self, key: str, fn: Callable[[], str]) -> str:
+        """Run fn once for all concurrent callers with the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def stream(self, key: str, fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Yield the deltas of fn's stream, sharing one upstream stream per key"""
+        with self._lock:
+            call = self._streams.get(key)
+            leader = call is None
+            if leader:
+                call = self._streams[key] = _StreamCall(fn(), threading.Condition())
+                self.leaders += 1
+            else:
+                with call.condition:
+                    call.readers += 1
+                self.followers += 1
+        
+        if leader:
+            yield from self._lead_stream(key, call)
+        else:
+            yield from self._follow_stream(call)
+    
+    async def ado(self, key: str, fn: Callable[[], Any]) -> str:
+        """Async counterpart of do; fn returns an awaitable
+
+        The upstream call runs in its own task that every caller awaits, so a
+        caller being cancelled (its client disconnected) does not cancel the
+        others; the task is only cancelled once nobody is waiting for it.
+        """
+        key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            call = self._async_calls.get(key)
+            if call is None:
+                call = self._async_calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+                call.task.add_done_callback(lambda task: self._aforget(key, call))
+                self.leaders += 1
+            else:
+                self.followers += 1
+            call.waiters += 1
+        
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.task.done()
+            if abandoned:
+                self._aforget(key, call)
+                call.task.cancel()
+    
+    async def astream(self, key: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Async counterpart of stream
+
+        The upstream stream is read by a task of its own and every caller,
+        the first one included, follows its buffer, so a caller that is
+        cancelled or disconnects only stops its own reading. The task is
+        cancelled once the last reader has gone.
+        """
+        key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            call = self._async_streams.get(key)
+            if call is None:
+                call = self._async_streams[key] = _StreamCall(fn(), asyncio.Condition())
+                call.pump = asyncio.ensure_future(self._apump_stream(key, call))
+                self.leaders += 1
+            else:
+                call.readers += 1
+                self.followers += 1
+        
+        async for delta in self._afollow_stream(key, call):
+            yield delta
+    
+    def stats(self) -> Dict[str, int]:
+        """Return how many upstream calls were made and how many were coalesced into them"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls) + len(self._streams) + len(self._async_calls) + len(self._async_streams),
+                'upstream_calls': self.leaders,
+                'coalesced_calls': self.followers
+            }
+    
+    def _lead_stream(self, key, call: _StreamCall) -> Iterator[str]:
+        try:
+            for delta in call.upstream:
+                with call.condition:
+                    call.chunks.append(delta)
+                    call.condition.notify_all()
+                yield delta
+        except GeneratorExit:
+            # The leader's client went away; finish the stream for any followers.
+            # Holding the registry lock keeps new followers from joining meanwhile.
+            with self._lock:
+                with call.condition:
+                    call.readers -= 1
+                    handover = call.readers > 0
+                if not handover:
+                    del self._streams[key]
+            if handover:
+                threading.Thread(target=self._drain_stream, args=(key, call), daemon=True).start()
+            else:
+                call.upstream.close()
+            raise
+        except Exception as e:
+            self._finish_stream(key, call, e)
+            raise
+        else:
+            self._finish_stream(key, call, None)
+    
+    def _drain_stream(self, key, call: _StreamCall):
+        try:
+            for delta in call.upstream:
+                with call.condition:
+                    call.chunks.append(delta)
+                    call.condition.notify_all()
+            self._finish_stream(key, call, None)
+        except Exception as e:
+            self._finish_stream(key, call, e)
+    
+    def _follow_stream(self, call: _StreamCall) -> Iterator[str]:
+        index = 0
+        try:
+            while True:
+                with call.condition:
+                    while index >= len(call.chunks) and not call.finished:
+                        call.condition.wait()
+                    chunks = call.chunks[index:]
+                    finished = call.finished
+                    error = call.error
+                index += len(chunks)
+                yield from chunks
+                if finished and index >= len(call.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            with call.condition:
+                call.readers -= 1
+    
+    def _finish_stream(self, key, call: _StreamCall, error):
+        with self._lock:
+            if self._streams.get(key) is call:
+                del self._streams[key]
+        with call.condition:
+            call.finished = True
+            call.error = error
+            call.condition.notify_all()
+    
+    async def _apump_stream(self, key, call: _StreamCall):
+        try:
+            async for delta in call.upstream:
+                async with call.condition:
+                    call.chunks.append(delta)
+                    call.condition.notify_all()
+        except asyncio.CancelledError:
+            # Every reader has gone
+            await call.upstream.aclose()
+            raise
+        except Exception as e:
+            await self._afinish_stream(key, call, e)
+        else:
+            await self._afinish_stream(key, call, None)
+    
+    async def _afollow_stream(self, key, call: _StreamCall) -> AsyncIterator[str]:
+        index = 0
+        try:
+            while True:
+                async with call.condition:
+                    await call.condition.wait_for(lambda: index < len(call.chunks) or call.finished)
+                    chunks = call.chunks[index:]
+                    finished = call.finished
+                    error = call.error
+                index += len(chunks)
+                for delta in chunks:
+                    yield delta
+                if finished and index >= len(call.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            call.readers -= 1
+            if call.readers == 0 and not call.pump.done():
+                with self._lock:
+                    if self._async_streams.get(key) is call:
+                        del self._async_streams[key]
+                call.pump.cancel()
+    
+    def _aforget(self, key, call: _AsyncCall):
+        with self._lock:
+            if self._async_calls.get(key) is call:
+                del self._async_calls[key]
+    
+    async def _afinish_stream(self, key, call: _StreamCall, error):
+        with self._lock:
+            if self._async_streams.get(key) is call:
+                del self._async_streams[key]
+        async with call.condition:
+            call.finished = True
+            call.error = error
+            call.condition.notify_all()
+
+class CoalescingProvider(ProviderWrapper):
+    """Provider wrapper that shares one upstream call among concurrent identical requests"""
+    
+    def __init__(self, provider: BaseProvider, group: SingleFlight):
+        super().__init__(provider)
+        self.group = group
+    
+    def generate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        key = self._key(message, kwargs, stream=False)
+        return self.group.do(key, lambda: self.provider.generate_response(message, **kwargs))
+    
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        key = self._key(message, kwargs, stream=True)
+        return self.group.stream(key, lambda: iter(self.provider.stream_response(message, **kwargs)))
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        key = self._key(message, kwargs, stream=False)
+        return await self.group.ado(key, lambda: self.provider.agenerate_response(message, **kwargs))
+    
+    def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        key = self._key(message, kwargs, stream=True)
+        return self.group.astream(key, lambda: self.provider.astream_response(message, **kwargs))
+    
+    def _key(self, message, kwargs, stream: bool) -> str:
+        return payload_key(self.provider_name, self.model_name, message, kwargs, stream, account_fingerprint(self.provider))
+
+# Shared by all agents so identical requests from different sessions coalesce
+single_flight = SingleFlight()
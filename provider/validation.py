@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from .base import BaseProvider
+
+class ValidationCache:
+    """Cache of model validation results
+
+    Entries are keyed by provider, a fingerprint of the API key and the model
+    name, so the key itself never ends up in memory dumps or on disk.
+    Successful validations are kept for ttl seconds and, when a path is
+    given, persisted across restarts. Failures are only remembered for
+    negative_ttl seconds so a fixed typo or newly granted access is picked
+    up quickly.
+    """
+    
+    def __init__(self, ttl: float = 86400, negative_ttl: float = 60, path: Optional[str] = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path = path
+        self._entries = None  # key -> {'valid': bool, 'checked_at': epoch seconds}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @classmethod
+    def from_env(cls) -> 'ValidationCache':
+        """Build a cache configured from environment variables"""
+        return cls(
+            ttl=float(os.environ.get('MODEL_VALIDATION_TTL', '86400')),
+            negative_ttl=float(os.environ.get('MODEL_VALIDATION_NEGATIVE_TTL', '60')),
+            path=os.environ.get('MODEL_VALIDATION_CACHE_FILE', 'model_validation_cache.json') or None
+        )
+    
+    @staticmethod
+    def cache_key(provider_name: str, api_key: str, model_name: str) -> str:
+        """Build the cache key for a provider, API key and model"""
+        fingerprint = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        return f"{provider_name}:{fingerprint}:{model_name}"
+    
+    def validate(self, provider: BaseProvider) -> bool:
+        """Return whether the provider's model is valid, asking the provider only on a miss"""
+        key = self.cache_key(provider.provider_name, provider.api_key, provider.model_name)
+        now = time.time()
+        
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None:
+                ttl = self.ttl if entry['valid'] else self.negative_ttl
+                if now - entry['checked_at'] < ttl:
+                    self.hits += 1
+                    return entry['valid']
+            self.misses += 1
+        
+        valid = provider.validate_model()
+        
+        with self._lock:
+            self._load()[key] = {'valid': valid, 'checked_at': now}
+            if valid:
+                self._save()
+        return valid
+    
+    def invalidate(self, provider_name: Optional[str] = None):
+        """Forget cached results, optionally only those of one provider"""
+        with self._lock:
+            entries = self._load()
+            for key in [key for key in entries if provider_name is None or key.startswith(f"{provider_name}:")]:
+                del entries[key]
+            self._save()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries or {}),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load persisted results on first use (caller holds the lock)"""
+        if self._entries is None:
+            self._entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r') as f:
+                        self._entries = json.load(f)
+                except Exception as e:
+                    print(f"Error loading model validation cache: {e}")
+        return self._entries
+    
+    def _save(self):
+        """Persist successful validations (caller holds the lock)"""
+        if not self.path:
+            return
+        try:
+            valid_entries = {key: entry for key, entry in self._entries.items() if entry['valid']}
+            # Per process: workers sharing the cache file must not write the same temp file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(valid_entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving model validation cache: {e}")
+
+# Shared by the agent factory and the API key endpoint
+validation_cache = ValidationCache.from_env()
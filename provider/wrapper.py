@@ -0,0 +1,53 @@
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple, Union
+from .base import BaseProvider
+
+class ProviderWrapper(BaseProvider):
+    """Base class for providers that add behaviour around another provider
+
+    Every call is delegated to the wrapped provider; subclasses override the
+    generation methods they need to intercept. Attributes that are not
+    defined on the wrapper (client, base_url, ...) are looked up on the
+    wrapped provider, so wrappers can be stacked freely.
+    """
+    
+    def __init__(self, provider: BaseProvider):
+        super().__init__(provider.api_key, provider.model_name)
+        self.provider = provider
+    
+    def generate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        return self.provider.generate_response(message, **kwargs)
+    
+    def stream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> Iterator[str]:
+        return self.provider.stream_response(message, **kwargs)
+    
+    async def agenerate_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> str:
+        return await self.provider.agenerate_response(message, **kwargs)
+    
+    def astream_response(self, message: Union[str, List[Dict[str, str]]], **kwargs) -> AsyncIterator[str]:
+        return self.provider.astream_response(message, **kwargs)
+    
+    @property
+    def supports_batch(self) -> bool:
+        return self.provider.supports_batch
+    
+    def submit_batch(self, requests: List[Tuple[str, Union[str, List[Dict[str, str]]], Dict[str, Any]]]) -> str:
+        return self.provider.submit_batch(requests)
+    
+    def batch_done(self, batch_id: str) -> bool:
+        return self.provider.batch_done(batch_id)
+    
+    def batch_results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        return self.provider.batch_results(batch_id)
+    
+    def validate_model(self) -> bool:
+        return self.provider.validate_model()
+    
+    @property
+    def provider_name(self) -> str:
+        return self.provider.provider_name
+    
+    def __getattr__(self, name):
+        # Only called for attributes the wrapper itself does not define
+        if name == 'provider':
+            raise AttributeError(name)
+        return getattr(self.provider, name)
@@ -2,18 +2,46 @@
 let currentSessionId = null;
 let isLoading = false;
 
+// Messages are loaded a page at a time, newest first; older pages load on scroll
+const MESSAGE_PAGE_SIZE = 50;
+let oldestMessageId = null;
+let hasOlderMessages = false;
+let isLoadingOlder = false;
+
 // DOM loaded event
 document.addEventListener('DOMContentLoaded', () => {
     // Load initial data
+    loadProviders();
     loadApiKeys();
     loadChatSessions();
 
     // Event listeners for form elements
     document.getElementById('provider-select').addEventListener('change', handleProviderSelect);
     document.getElementById('model-select').addEventListener('change', handleModelSelect);
+    document.getElementById('chat-container').addEventListener('scroll', handleChatScroll);
+    document.getElementById('session-search').addEventListener('input', handleSessionSearch);
 });
 
 // API Key Management
+async function loadProviders() {
+    // Providers installed as plugins are added after the built-in ones
+    try {
+        const response = await fetch('/api/providers');
+        const providers = await response.json();
+        const select = document.getElementById('provider-select');
+        const listed = new Set(Array.from(select.options).map(option => option.value));
+        
+        providers.filter(name => !listed.has(name)).forEach(name => {
+            const option = document.createElement('option');
+            option.value = name;
+            option.textContent = name;
+            select.appendChild(option);
+        });
+    } catch (error) {
+        console.error('Error loading providers:', error);
+    }
+}
+
 async function loadApiKeys() {
     try {
         const response = await fetch('/api/keys');
@@ -135,12 +163,77 @@ async function loadChatSessions() {
     }
 }
 
+// Message search replaces the session list while the search box has text
+let searchTimer = null;
+
+function handleSessionSearch() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(searchMessages, 250);
+}
+
+async function searchMessages() {
+    const query = document.getElementById('session-search').value.trim();
+    if (!query) {
+        loadChatSessions();
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/api/search?q=${encodeURIComponent(query)}`);
+        const result = await response.json();
+        if (query !== document.getElementById('session-search').value.trim()) {
+            return;  // a newer search is on its way
+        }
+        
+        const list = document.getElementById('chat-sessions-list');
+        list.innerHTML = '';
+        if (!response.ok || result.results.length === 0) {
+            list.textContent = response.ok ? 'No matching messages' : result.error;
+            return;
+        }
+        
+        result.results.forEach(hit => {
+            const item = document.createElement('div');
+            item.className = 'chat-session';
+            const title = document.createElement('div');
+            title.style.fontWeight = '500';
+            title.textContent = hit.session_title;
+            item.appendChild(title);
+            item.appendChild(renderSnippet(hit.snippet));
+            item.onclick = () => loadChatSession(hit.session_id);
+            list.appendChild(item);
+        });
+    } catch (error) {
+        console.error('Error searching messages:', error);
+    }
+}
+
+function renderSnippet(snippet) {
+    // Matches come back between \uE000 and \uE001; build the highlight with DOM nodes so message text is never parsed as HTML
+    const element = document.createElement('div');
+    element.className = 'search-snippet';
+    const highlight = /\uE000([^\uE000\uE001]*)\uE001/g;
+    let position = 0;
+    let match;
+    while ((match = highlight.exec(snippet)) !== null) {
+        element.appendChild(document.createTextNode(snippet.slice(position, match.index)));
+        const mark = document.createElement('mark');
+        mark.textContent = match[1];
+        element.appendChild(mark);
+        position = highlight.lastIndex;
+    }
+    element.appendChild(document.createTextNode(snippet.slice(position)));
+    return element;
+}
+
 async function newChat() {
     try {
         const response = await fetch('/api/chat/new', {method: 'POST'});
         const result = await response.json();
         
         currentSessionId = result.session_id;
+        oldestMessageId = null;
+        hasOlderMessages = false;
         document.getElementById('chat-title').textContent = 'New Chat';
         document.getElementById('chat-container').innerHTML = '';
         
@@ -160,9 +253,11 @@ async function loadChatSession(sessionId) {
     try {
         currentSessionId = sessionId;
         
-        const response = await fetch(`/api/chat/${sessionId}/messages`);
+        const response = await fetch(`/api/chat/${sessionId}/messages?limit=${MESSAGE_PAGE_SIZE}`);
         const messages = await response.json();
         
+        oldestMessageId = messages.length ? messages[0].id : null;
+        hasOlderMessages = response.headers.get('X-Has-More') === 'true';
         displayMessages(messages);
         loadChatSessions(); // Refresh to update active state
         
@@ -188,6 +283,7 @@ async function deleteSession(sessionId) {
                 // If the deleted session was the current one, clear the content
                 if (sessionId === currentSessionId) {
                     currentSessionId = null;
+                    hasOlderMessages = false;
                     document.getElementById('chat-title').textContent = 'Chat Agent';
                     document.getElementById('chat-container').innerHTML = `
                         <div class="welcome">
@@ -274,38 +370,153 @@ function renderMathAndHighlight(element) {
     }
 }
 
+async function loadOlderMessages() {
+    if (isLoadingOlder || !hasOlderMessages || !currentSessionId) return;
+    
+    isLoadingOlder = true;
+    const sessionId = currentSessionId;
+    try {
+        const response = await fetch(
+            `/api/chat/${sessionId}/messages?before=${oldestMessageId}&limit=${MESSAGE_PAGE_SIZE}`
+        );
+        const messages = await response.json();
+        if (sessionId !== currentSessionId) return;
+        
+        oldestMessageId = messages.length ? messages[0].id : oldestMessageId;
+        hasOlderMessages = response.headers.get('X-Has-More') === 'true';
+        
+        // Prepend without moving the messages the user is looking at
+        const container = document.getElementById('chat-container');
+        const previousHeight = container.scrollHeight;
+        const fragment = document.createDocumentFragment();
+        messages.forEach(message => fragment.appendChild(createMessageElement(message)));
+        container.insertBefore(fragment, container.firstChild);
+        container.scrollTop += container.scrollHeight - previousHeight;
+    } catch (error) {
+        console.error('Error loading older messages:', error);
+    } finally {
+        isLoadingOlder = false;
+    }
+}
+
+function handleChatScroll() {
+    if (this.scrollTop < 200) {
+        loadOlderMessages();
+    }
+}
+
 function displayMessages(messages) {
     const container = document.getElementById('chat-container');
     container.innerHTML = '';
     
-    messages.forEach(message => {
-        const messageDiv = document.createElement('div');
-        messageDiv.className = `message ${message.role}`;
-        
-        const contentDiv = document.createElement('div');
-        contentDiv.className = 'message-content';
-        
-        if (message.role === 'assistant') {
-            // Render markdown for assistant messages
-            contentDiv.innerHTML = renderMarkdown(message.content);
-            // Render math and syntax highlighting
-            renderMathAndHighlight(contentDiv);
-        } else {
-            contentDiv.textContent = message.content;
+    messages.forEach(message => container.appendChild(createMessageElement(message)));
+    
+    container.scrollTop = container.scrollHeight;
+    
+    // A short first page may not fill the view, leaving nothing to scroll
+    if (container.scrollHeight <= container.clientHeight) {
+        loadOlderMessages();
+    }
+}
+
+function createMessageElement(message) {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${message.role}`;
+    
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'message-content';
+    
+    if (message.role === 'assistant') {
+        // Render markdown for assistant messages
+        contentDiv.innerHTML = renderMarkdown(message.content);
+        // Render math and syntax highlighting
+        renderMathAndHighlight(contentDiv);
+    } else {
+        contentDiv.textContent = message.content;
+    }
+    
+    const infoDiv = document.createElement('div');
+    infoDiv.className = 'message-info';
+    const time = new Date(message.timestamp).toLocaleTimeString();
+    infoDiv.textContent = message.role === 'assistant' ? 
+        `${time} • ${message.model || 'AI'}` : time;
+    
+    messageDiv.appendChild(contentDiv);
+    messageDiv.appendChild(infoDiv);
+    return messageDiv;
+}
+
+// Streaming replies: completed markdown blocks are parsed, highlighted and
+// typeset once; only the unfinished tail is re-parsed, at most once per frame
+class StreamingMessageRenderer {
+    constructor(contentDiv) {
+        this.contentDiv = contentDiv;
+        this.stream = new MarkdownStream();
+        this.pending = '';
+        this.frame = null;
+        this.tailDiv = document.createElement('div');
+        contentDiv.appendChild(this.tailDiv);
+    }
+    
+    append(delta) {
+        this.pending += delta;
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => this.flush());
         }
+    }
+    
+    flush() {
+        this.frame = null;
+        const container = document.getElementById('chat-container');
+        const atBottom = container.scrollHeight - container.scrollTop - container.clientHeight < 50;
         
-        const infoDiv = document.createElement('div');
-        infoDiv.className = 'message-info';
-        const time = new Date(message.timestamp).toLocaleTimeString();
-        infoDiv.textContent = message.role === 'assistant' ? 
-            `${time} • ${message.model || 'AI'}` : time;
+        this.stream.append(this.pending).forEach(block => this.appendBlock(block));
+        this.pending = '';
+        this.tailDiv.innerHTML = renderMarkdown(this.stream.tail());
         
-        messageDiv.appendChild(contentDiv);
-        messageDiv.appendChild(infoDiv);
-        container.appendChild(messageDiv);
-    });
+        if (atBottom) {
+            container.scrollTop = container.scrollHeight;
+        }
+    }
     
-    container.scrollTop = container.scrollHeight;
+    finish() {
+        if (this.frame !== null) {
+            cancelAnimationFrame(this.frame);
+        }
+        this.flush();
+        this.stream.finish().forEach(block => this.appendBlock(block));
+        this.tailDiv.remove();
+    }
+    
+    appendBlock(source) {
+        const blockDiv = document.createElement('div');
+        blockDiv.innerHTML = renderMarkdown(source);
+        this.contentDiv.insertBefore(blockDiv, this.tailDiv);
+        renderMathAndHighlight(blockDiv);
+    }
+}
+
+// Read server-sent events from a fetch response, calling onEvent(type, data) for each
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const {done, value} = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, {stream: true});
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const event = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            if (event.startsWith('data: ')) {
+                const {type, data} = JSON.parse(event.slice(6));
+                onEvent(type, data);
+            }
+        }
+    }
 }
 
 // Message sending
@@ -322,6 +533,7 @@ async function sendMessage(event) {
     if (!message || !modelValue) return;
     
     const [provider, model] = modelValue.split(':');
+    const container = document.getElementById('chat-container');
     
     // Clear input and disable form
     messageInput.value = '';
@@ -329,28 +541,18 @@ async function sendMessage(event) {
     document.getElementById('send-btn').disabled = true;
     messageInput.disabled = true;
     
-    // Add loading indicator
+    // Add user message to UI
+    container.appendChild(createMessageElement({role: 'user', content: message, timestamp: new Date()}));
+    
+    // Add loading indicator until the first event arrives
     const loadingDiv = document.createElement('div');
     loadingDiv.className = 'loading';
     loadingDiv.textContent = 'Generating response...';
-    document.getElementById('chat-container').appendChild(loadingDiv);
-    document.getElementById('chat-container').scrollTop = document.getElementById('chat-container').scrollHeight;
+    container.appendChild(loadingDiv);
+    container.scrollTop = container.scrollHeight;
     
     try {
-        // Add user message to UI
-        const userMessageDiv = document.createElement('div');
-        userMessageDiv.className = 'message user';
-        userMessageDiv.innerHTML = `
-            <div class="message-content">${message}</div>
-            <div class="message-info">${new Date().toLocaleTimeString()}</div>
-        `;
-        document.getElementById('chat-container').appendChild(userMessageDiv);
-        
-        // Remove loading indicator
-        loadingDiv.remove();
-        
-        // Send to server - using regular endpoint instead of streaming
-        const response = await fetch(`/api/chat/${currentSessionId}/messages`, {
+        const response = await fetch(`/api/chat/${currentSessionId}/stream`, {
             method: 'POST',
             headers: {'Content-Type': 'application/json'},
             body: JSON.stringify({
@@ -364,27 +566,42 @@ async function sendMessage(event) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
-        const assistantMessage = await response.json();
+        let renderer = null;
+        let infoDiv = null;
+        let streamError = null;
         
-        // Display assistant message
-        const assistantMessageDiv = document.createElement('div');
-        assistantMessageDiv.className = 'message assistant';
-        
-        const contentDiv = document.createElement('div');
-        contentDiv.className = 'message-content';
-        contentDiv.innerHTML = renderMarkdown(assistantMessage.content);
-        
-        // Render LaTeX and syntax highlighting
-        renderMathAndHighlight(contentDiv);
-        
-        const infoDiv = document.createElement('div');
-        infoDiv.className = 'message-info';
-        const time = new Date(assistantMessage.timestamp).toLocaleTimeString();
-        infoDiv.textContent = `${time} • ${assistantMessage.model || 'AI'}`;
+        await readEventStream(response, (type, data) => {
+            if (type === 'start') {
+                // Display assistant message, filled in as chunks arrive
+                loadingDiv.remove();
+                const assistantMessageDiv = document.createElement('div');
+                assistantMessageDiv.className = 'message assistant';
+                
+                const contentDiv = document.createElement('div');
+                contentDiv.className = 'message-content';
+                renderer = new StreamingMessageRenderer(contentDiv);
+                
+                infoDiv = document.createElement('div');
+                infoDiv.className = 'message-info';
+                infoDiv.textContent = data.model || 'AI';
+                
+                assistantMessageDiv.appendChild(contentDiv);
+                assistantMessageDiv.appendChild(infoDiv);
+                container.appendChild(assistantMessageDiv);
+            } else if (type === 'chunk' && renderer) {
+                renderer.append(data.content);
+            } else if (type === 'complete' && renderer) {
+                renderer.finish();
+                const time = new Date(data.timestamp).toLocaleTimeString();
+                infoDiv.textContent = `${time} • ${data.model || 'AI'}`;
+            } else if (type === 'error') {
+                streamError = data.error;
+            }
+        });
         
-        assistantMessageDiv.appendChild(contentDiv);
-        assistantMessageDiv.appendChild(infoDiv);
-        document.getElementById('chat-container').appendChild(assistantMessageDiv);
+        if (streamError) {
+            throw new Error(streamError);
+        }
         
         // Update chat title if needed
         const titleElement = document.getElementById('chat-title');
@@ -399,16 +616,17 @@ async function sendMessage(event) {
         const errorDiv = document.createElement('div');
         errorDiv.className = 'error';
         errorDiv.textContent = 'Error: ' + error.message;
-        document.getElementById('chat-container').appendChild(errorDiv);
-        loadingDiv.remove();
+        container.appendChild(errorDiv);
     } finally {
+        loadingDiv.remove();
+        
         // Re-enable form
         isLoading = false;
         messageInput.disabled = false;
         document.getElementById('send-btn').disabled = false;
         messageInput.focus();
         
-        document.getElementById('chat-container').scrollTop = document.getElementById('chat-container').scrollHeight;
+        container.scrollTop = container.scrollHeight;
     }
 }
 
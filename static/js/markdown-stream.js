@@ -0,0 +1,94 @@
+// Splits streamed markdown into completed blocks and an unfinished tail.
+// Loaded by the browser (window.MarkdownStream) and by the node benchmark (require).
+(function(root, factory) {
+    if (typeof module === 'object' && module.exports) {
+        module.exports = factory();
+    } else {
+        root.MarkdownStream = factory();
+    }
+}(typeof self !== 'undefined' ? self : this, function() {
+    const FENCE_OPEN = /^ {0,3}(`{3,}|~{3,})/;
+
+    class MarkdownStream {
+        constructor() {
+            this.source = '';
+            this.blockStart = 0;   // start of the first block that is not complete yet
+            this.scanPos = 0;      // start of the first line not scanned yet
+            this.fence = null;     // opening marker of the fenced code block we are in
+            this.inMath = false;   // inside a $$ display math block
+        }
+
+        // Add streamed text and return the source of every block it completed.
+        // A block is complete after a blank line, a closing code fence or a
+        // closing $$, none of which later text can change.
+        append(delta) {
+            this.source += delta;
+            const completed = [];
+
+            let lineEnd;
+            while ((lineEnd = this.source.indexOf('\n', this.scanPos)) !== -1) {
+                const line = this.source.slice(this.scanPos, lineEnd);
+                this.scanPos = lineEnd + 1;
+
+                if (this.endsBlock(line)) {
+                    const block = this.source.slice(this.blockStart, this.scanPos);
+                    this.blockStart = this.scanPos;
+                    if (block.trim()) {
+                        completed.push(block);
+                    }
+                }
+            }
+            return completed;
+        }
+
+        // The unfinished trailing block, re-parsed on every update
+        tail() {
+            return this.source.slice(this.blockStart);
+        }
+
+        // End of stream: the tail is complete as it is
+        finish() {
+            const block = this.tail();
+            this.blockStart = this.scanPos = this.source.length;
+            this.fence = null;
+            this.inMath = false;
+            return block.trim() ? [block] : [];
+        }
+
+        endsBlock(line) {
+            const trimmed = line.trim();
+
+            if (this.fence) {
+                const closing = trimmed.match(/^(`{3,}|~{3,})$/);
+                if (closing && closing[1][0] === this.fence[0] && closing[1].length >= this.fence.length) {
+                    this.fence = null;
+                    return true;
+                }
+                return false;
+            }
+
+            const opening = line.match(FENCE_OPEN);
+            if (opening) {
+                this.fence = opening[1];
+                return false;
+            }
+
+            if (this.inMath) {
+                if (trimmed.endsWith('$$')) {
+                    this.inMath = false;
+                    return true;
+                }
+                return false;
+            }
+
+            if (trimmed.startsWith('$$') && !(trimmed.length > 2 && trimmed.endsWith('$$'))) {
+                this.inMath = true;
+                return false;
+            }
+
+            return trimmed === '';
+        }
+    }
+
+    return MarkdownStream;
+}));
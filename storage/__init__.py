@@ -0,0 +1,41 @@
+from .base import SessionStore
+from .memory_store import MemorySessionStore
+from .sqlite_store import SQLiteSessionStore
+from .redis_store import RedisSessionStore
+from .keys import KeyStore, FileKeyStore, RedisKeyStore
+from .locks import SessionLocks
+
+class StoreFactory:
+    """Factory class to create session store instances"""
+    
+    @staticmethod
+    def create_store(store_type: str, **kwargs) -> SessionStore:
+        """Create a session store based on the backend name"""
+        stores = {
+            'sqlite': SQLiteSessionStore,
+            'memory': MemorySessionStore,
+            'redis': RedisSessionStore
+        }
+        
+        if store_type not in stores:
+            raise ValueError(f"Unsupported session store: {store_type}")
+        
+        return stores[store_type](**kwargs)
+    
+    @staticmethod
+    def create_key_store(store_type: str, **kwargs) -> KeyStore:
+        """Create an API key store based on the backend name"""
+        stores = {
+            'file': FileKeyStore,
+            'redis': RedisKeyStore
+        }
+        
+        if store_type not in stores:
+            raise ValueError(f"Unsupported key store: {store_type}")
+        
+        return stores[store_type](**kwargs)
+    
+    @staticmethod
+    def get_supported_stores():
+        """Get list of supported session store names"""
+        return ['sqlite', 'memory', 'redis']
@@ -0,0 +1,107 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+class SessionStore(ABC):
+    """Base class for chat session storage backends
+
+    Sessions are split into a small metadata record (id, title, created_at,
+    message_count) and an ordered message log, so listing sessions never has
+    to touch message bodies and appending a message never rewrites history.
+    """
+    
+    # Stores with a cold tier for idle sessions override archive_idle and archive_stats
+    supports_archive = False
+    
+    @abstractmethod
+    def create_session(self, session_id: str, title: str, created_at: str) -> Dict[str, Any]:
+        """Create an empty session and return its metadata"""
+        pass
+    
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return session metadata, or None if the session does not exist"""
+        pass
+    
+    @abstractmethod
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """Return metadata for all sessions, newest first"""
+        pass
+    
+    @abstractmethod
+    def list_version(self) -> int:
+        """Return a counter that changes whenever the session list changes"""
+        pass
+    
+    @abstractmethod
+    def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return all messages of a session in order"""
+        pass
+    
+    @abstractmethod
+    def get_message_page(self, session_id: str, since: Optional[int] = None, before: Optional[int] = None,
+                         limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Return a page of messages in order and whether more messages lie beyond it
+
+        With since, the page holds the oldest messages after that message id
+        and "more" means newer messages; otherwise it holds the newest
+        messages (before that id, if given) and "more" means older ones.
+        """
+        pass
+    
+    @abstractmethod
+    def last_message_id(self, session_id: str, model: Optional[str] = None) -> Optional[int]:
+        """Return the id of the latest message (of the given "provider/model"), or None"""
+        pass
+    
+    @abstractmethod
+    def append_message(self, session_id: str, message: Dict[str, Any]) -> int:
+        """Append a message to a session, set its id and return the new message count"""
+        pass
+    
+    @abstractmethod
+    def update_title(self, session_id: str, title: str):
+        """Change the title of a session"""
+        pass
+    
+    @abstractmethod
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a session and its messages, returning False if it did not exist"""
+        pass
+    
+    def search(self, query: str, model: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Return the messages matching query, best first, each with its session and a highlighted snippet
+
+        model keeps only messages of that "provider/model"; since and until
+        bound message timestamps (ISO dates or times, until exclusive).
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support search")
+    
+    def archive_idle(self, idle_before: str, limit: int = 100) -> int:
+        """Move up to limit sessions with no message since idle_before to cold storage; returns how many
+
+        Archived sessions keep their metadata and are brought back
+        transparently the next time their messages are read or appended to.
+        Stores without a cold tier keep every session hot.
+        """
+        return 0
+    
+    def archive_stats(self) -> Optional[Dict[str, Any]]:
+        """Return the sizes of the hot and archived tiers, or None for stores without a cold tier"""
+        return None
+    
+    def has_session(self, session_id: str) -> bool:
+        """Check whether a session exists"""
+        return self.get_session(session_id) is not None
+    
+    def import_sessions(self, sessions: Dict[str, Dict[str, Any]]) -> int:
+        """Import sessions in the legacy chat_sessions.json layout"""
+        imported = 0
+        for session_id, session in sessions.items():
+            if self.has_session(session_id):
+                continue
+            self.create_session(session_id, session.get('title', 'New Chat'), session.get('created_at', ''))
+            for message in session.get('messages', []):
+                self.append_message(session_id, message)
+            imported += 1
+        return imported
@@ -0,0 +1,124 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only
+    fcntl = None
+
+class KeyStore(ABC):
+    """Base class for the API key configuration shared by all worker processes
+    
+    version() is cheap, so workers can poll it on every request and reload
+    the configuration only when another worker changed it.
+    """
+    
+    @abstractmethod
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Return the key configuration of every provider"""
+        pass
+    
+    @abstractmethod
+    def save(self, provider: str, config: Dict[str, Any]):
+        """Add or replace the key configuration of a provider"""
+        pass
+    
+    @abstractmethod
+    def delete(self, provider: str) -> bool:
+        """Remove the key configuration of a provider, returning False if there was none"""
+        pass
+    
+    @abstractmethod
+    def version(self) -> Any:
+        """Return a value that changes whenever the configuration changes"""
+        pass
+
+class FileKeyStore(KeyStore):
+    """Key configuration in a JSON file shared by the workers of one host
+    
+    Writers hold an exclusive lock on a sidecar lock file for their
+    read-modify-write and replace the file atomically, so concurrent
+    workers neither lose each other's updates nor read a partial file.
+    """
+    
+    def __init__(self, path: str = 'api_keys.json'):
+        self.path = path
+        self.lock_path = path + '.lock'
+    
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+    
+    def save(self, provider: str, config: Dict[str, Any]):
+        with self._locked():
+            keys = self.load()
+            keys[provider] = config
+            self._write(keys)
+    
+    def delete(self, provider: str) -> bool:
+        with self._locked():
+            keys = self.load()
+            if provider not in keys:
+                return False
+            del keys[provider]
+            self._write(keys)
+            return True
+    
+    def version(self) -> Any:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # Every write replaces the file, so the inode changes even within one mtime tick
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _write(self, keys: Dict[str, Dict[str, Any]]):
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(keys, f, indent=2)
+        os.replace(temp_path, self.path)
+
+class RedisKeyStore(KeyStore):
+    """Key configuration in Redis, shared by workers on any number of hosts (requires the redis package)"""
+    
+    def __init__(self, url: str = 'redis://localhost:6379/0', prefix: str = 'chatagent'):
+        import redis
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.key = f"{prefix}:api_keys"
+        self.version_key = f"{prefix}:api_keys:version"
+    
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        return {provider: json.loads(config) for provider, config in self.redis.hgetall(self.key).items()}
+    
+    def save(self, provider: str, config: Dict[str, Any]):
+        pipe = self.redis.pipeline()
+        pipe.hset(self.key, provider, json.dumps(config))
+        pipe.incr(self.version_key)
+        pipe.execute()
+    
+    def delete(self, provider: str) -> bool:
+        pipe = self.redis.pipeline()
+        pipe.hdel(self.key, provider)
+        pipe.incr(self.version_key)
+        removed, _ = pipe.execute()
+        return removed > 0
+    
+    def version(self) -> Any:
+        return self.redis.get(self.version_key)
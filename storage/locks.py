@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict
+
+class SessionLocks:
+    """Per-session mutexes that keep the turns of each chat session strictly ordered
+    
+    A turn (user message, model call, assistant message) runs under its
+    session's lock, so concurrent requests to one session, e.g. from two tabs
+    or a retrying client, neither interleave their messages nor share an
+    agent's history mid-turn, while different sessions run in parallel.
+    Locks exist only while a session has a turn running or waiting.
+    
+    The locks are process-local: ordering is only guaranteed among the turns
+    one worker serves. With several workers sharing a store, two workers can
+    still interleave the turns of one session; route a session's requests
+    to one worker (sticky sessions) where that matters.
+    """
+    
+    def __init__(self):
+        self._locks = {}  # session_id -> [threading.Lock, holders and waiters]
+        self._async_locks = {}  # session_id -> [asyncio.Lock, holders and waiters]
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    @contextmanager
+    def hold(self, session_id: str):
+        """Run a block as the only turn of session_id in this process's thread pool"""
+        entry = self._checkout(self._locks, session_id, threading.Lock)
+        try:
+            if not entry[0].acquire(blocking=False):
+                start = time.perf_counter()
+                entry[0].acquire()
+                self._record_wait(time.perf_counter() - start)
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            self._checkin(self._locks, session_id, entry)
+    
+    @asynccontextmanager
+    async def ahold(self, session_id: str):
+        """Run a block as the only turn of session_id on the event loop"""
+        entry = self._checkout(self._async_locks, session_id, asyncio.Lock)
+        try:
+            if entry[0].locked():
+                start = time.perf_counter()
+                await entry[0].acquire()
+                self._record_wait(time.perf_counter() - start)
+            else:
+                await entry[0].acquire()
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            self._checkin(self._async_locks, session_id, entry)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of busy sessions and how long turns waited for each other"""
+        with self._lock:
+            return {
+                'active_sessions': len(self._locks) + len(self._async_locks),
+                'turns': self.turns,
+                'contended': self.contended,
+                'avg_wait_ms': self.total_wait / self.contended * 1000 if self.contended else 0.0,
+                'max_wait_ms': self.max_wait * 1000
+            }
+    
+    def _checkout(self, locks: Dict[str, list], session_id: str, lock_type) -> list:
+        with self._lock:
+            entry = locks.get(session_id)
+            if entry is None:
+                entry = locks[session_id] = [lock_type(), 0]
+            entry[1] += 1
+            self.turns += 1
+            return entry
+    
+    def _checkin(self, locks: Dict[str, list], session_id: str, entry: list):
+        with self._lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del locks[session_id]
+    
+    def _record_wait(self, seconds: float):
+        with self._lock:
+            self.contended += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
@@ -0,0 +1,123 @@
+import bisect
+import itertools
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from .base import SessionStore
+from .search import InvertedIndex, in_range, snippet
+
+class MemorySessionStore(SessionStore):
+    """Non-persistent session store, useful for development and tests"""
+    
+    def __init__(self):
+        self._sessions = {}
+        self._messages = {}
+        self._order = []  # (created_at, session_id), kept sorted so listing never sorts
+        self._message_ids = itertools.count(1)
+        self._index = InvertedIndex()
+        self._indexed = {}  # message_id -> (session_id, message)
+        self._version = 0
+        self._lock = threading.Lock()
+    
+    def create_session(self, session_id: str, title: str, created_at: str) -> Dict[str, Any]:
+        with self._lock:
+            self._sessions[session_id] = {
+                'id': session_id,
+                'title': title,
+                'created_at': created_at,
+                'message_count': 0
+            }
+            self._messages[session_id] = []
+            bisect.insort(self._order, (created_at, session_id))
+            self._version += 1
+            return dict(self._sessions[session_id])
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        return dict(session) if session else None
+    
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(self._sessions[session_id]) for _, session_id in reversed(self._order)]
+    
+    def list_version(self) -> int:
+        return self._version
+    
+    def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(message) for message in self._messages.get(session_id, [])]
+    
+    def get_message_page(self, session_id: str, since: Optional[int] = None, before: Optional[int] = None,
+                         limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        with self._lock:
+            messages = self._messages.get(session_id, [])
+            if since is not None:
+                start = bisect.bisect_right(messages, since, key=lambda message: message['id'])
+                end = len(messages) if limit is None else min(len(messages), start + limit)
+                has_more = end < len(messages)
+            else:
+                end = len(messages) if before is None else bisect.bisect_left(messages, before, key=lambda message: message['id'])
+                start = 0 if limit is None else max(0, end - limit)
+                has_more = start > 0
+            return [dict(message) for message in messages[start:end]], has_more
+    
+    def last_message_id(self, session_id: str, model: Optional[str] = None) -> Optional[int]:
+        with self._lock:
+            for message in reversed(self._messages.get(session_id, [])):
+                if model is None or message.get('model') == model:
+                    return message['id']
+        return None
+    
+    def append_message(self, session_id: str, message: Dict[str, Any]) -> int:
+        with self._lock:
+            if session_id not in self._sessions:
+                raise KeyError(f"Chat session not found: {session_id}")
+            message['id'] = next(self._message_ids)
+            stored = dict(message)
+            self._messages[session_id].append(stored)
+            self._index.add(stored['id'], stored['content'])
+            self._indexed[stored['id']] = (session_id, stored)
+            self._sessions[session_id]['message_count'] += 1
+            self._version += 1
+            return self._sessions[session_id]['message_count']
+    
+    def update_title(self, session_id: str, title: str):
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id]['title'] = title
+                self._version += 1
+    
+    def delete_session(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            session = self._sessions.pop(session_id)
+            for message in self._messages.pop(session_id):
+                self._index.remove(message['id'], message['content'])
+                del self._indexed[message['id']]
+            self._order.remove((session['created_at'], session_id))
+            self._version += 1
+            return True
+    
+    def search(self, query: str, model: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        results = []
+        with self._lock:
+            for score, message_id in self._index.search(query):
+                session_id, message = self._indexed[message_id]
+                if model is not None and message.get('model') != model:
+                    continue
+                if not in_range(message.get('timestamp'), since, until):
+                    continue
+                results.append({
+                    'session_id': session_id,
+                    'session_title': self._sessions[session_id]['title'],
+                    'message_id': message_id,
+                    'role': message['role'],
+                    'model': message.get('model'),
+                    'timestamp': message.get('timestamp'),
+                    'snippet': snippet(message['content'], query),
+                    'score': round(score, 3)
+                })
+                if len(results) >= limit:
+                    break
+        return results
@@ -0,0 +1,149 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from .base import SessionStore
+
+class RedisSessionStore(SessionStore):
+    """Session store in Redis, shared by workers on any number of hosts (requires the redis package)
+    
+    Each session is a hash of its metadata plus a sorted set of messages
+    scored by message id, so appends and cursor pages are single commands.
+    A sorted set of session ids scored by creation time is the list index.
+    """
+    
+    def __init__(self, url: str = 'redis://localhost:6379/0', prefix: str = 'chatagent'):
+        import redis
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+    
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.prefix}:session:{session_id}"
+    
+    def _messages_key(self, session_id: str) -> str:
+        return f"{self.prefix}:messages:{session_id}"
+    
+    @property
+    def _index_key(self) -> str:
+        return f"{self.prefix}:sessions"
+    
+    @property
+    def _version_key(self) -> str:
+        return f"{self.prefix}:sessions:version"
+    
+    @staticmethod
+    def _created_score(created_at: str) -> float:
+        try:
+            return datetime.fromisoformat(created_at).timestamp()
+        except ValueError:
+            return 0.0
+    
+    def create_session(self, session_id: str, title: str, created_at: str) -> Dict[str, Any]:
+        session = {'id': session_id, 'title': title, 'created_at': created_at, 'message_count': 0}
+        pipe = self.redis.pipeline()
+        pipe.hset(self._session_key(session_id), mapping=session)
+        pipe.zadd(self._index_key, {session_id: self._created_score(created_at)})
+        pipe.incr(self._version_key)
+        pipe.execute()
+        return session
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._to_session(self.redis.hgetall(self._session_key(session_id)))
+    
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        session_ids = self.redis.zrevrange(self._index_key, 0, -1)
+        pipe = self.redis.pipeline()
+        for session_id in session_ids:
+            pipe.hgetall(self._session_key(session_id))
+        return [session for session in map(self._to_session, pipe.execute()) if session]
+    
+    def list_version(self) -> int:
+        return int(self.redis.get(self._version_key) or 0)
+    
+    def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        return [json.loads(message) for message in self.redis.zrange(self._messages_key(session_id), 0, -1)]
+    
+    def get_message_page(self, session_id: str, since: Optional[int] = None, before: Optional[int] = None,
+                         limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        # One extra message tells whether the page is the last one
+        fetch = None if limit is None else limit + 1
+        page = {'start': 0, 'num': fetch} if fetch is not None else {}
+        if since is not None:
+            messages = self.redis.zrangebyscore(self._messages_key(session_id), f"({since}", '+inf', **page)
+            has_more = limit is not None and len(messages) > limit
+            messages = messages[:limit]
+        else:
+            upper = f"({before}" if before is not None else '+inf'
+            messages = self.redis.zrevrangebyscore(self._messages_key(session_id), upper, '-inf', **page)
+            has_more = limit is not None and len(messages) > limit
+            messages = messages[:limit][::-1]
+        return [json.loads(message) for message in messages], has_more
+    
+    def last_message_id(self, session_id: str, model: Optional[str] = None) -> Optional[int]:
+        value = self.redis.hget(self._session_key(session_id), f"last:{model or ''}")
+        return int(value) if value else None
+    
+    def append_message(self, session_id: str, message: Dict[str, Any]) -> int:
+        message['id'] = self.redis.incr(f"{self.prefix}:message_id")
+        
+        def append(pipe):
+            pipe.zadd(self._messages_key(session_id), {json.dumps(message): message['id']})
+            pipe.hincrby(self._session_key(session_id), 'message_count', 1)
+            # Latest message id overall and per model, for cross-worker staleness checks
+            pipe.hset(self._session_key(session_id), mapping={
+                'last:': message['id'],
+                f"last:{message.get('model') or ''}": message['id']
+            })
+            pipe.incr(self._version_key)
+        
+        results = self._if_session_exists(session_id, append)
+        if results is None:
+            raise KeyError(f"Chat session not found: {session_id}")
+        return results[1]
+    
+    def update_title(self, session_id: str, title: str):
+        def update(pipe):
+            pipe.hset(self._session_key(session_id), 'title', title)
+            pipe.incr(self._version_key)
+        
+        self._if_session_exists(session_id, update)
+    
+    def delete_session(self, session_id: str) -> bool:
+        pipe = self.redis.pipeline()
+        pipe.delete(self._session_key(session_id), self._messages_key(session_id))
+        pipe.zrem(self._index_key, session_id)
+        pipe.incr(self._version_key)
+        deleted, _, _ = pipe.execute()
+        return deleted > 0
+    
+    def _if_session_exists(self, session_id: str, queue) -> Optional[List[Any]]:
+        """Run the commands queue(pipe) adds as one transaction, only if the session exists
+
+        The session hash is watched, so a concurrent delete between the check
+        and the transaction retries it instead of leaving a partial session
+        behind. Returns the command results, or None if there is no session.
+        """
+        from redis.exceptions import WatchError
+        
+        key = self._session_key(session_id)
+        with self.redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    if not pipe.exists(key):
+                        return None
+                    pipe.multi()
+                    queue(pipe)
+                    return pipe.execute()
+                except WatchError:
+                    continue
+    
+    @staticmethod
+    def _to_session(fields: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        if not fields:
+            return None
+        return {
+            'id': fields['id'],
+            'title': fields['title'],
+            'created_at': fields['created_at'],
+            'message_count': int(fields['message_count'])
+        }
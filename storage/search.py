@@ -0,0 +1,146 @@
+import math
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# Query terms in snippets are wrapped in private-use characters, which message text (and its markdown) does not use
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+SNIPPET_TOKENS = 16
+
+# Shorter last terms match whole words only; a one or two letter prefix matches most messages
+MIN_PREFIX = 3
+
+# Letters and digits, as the unicode61 tokenizer splits text
+WORD = re.compile(r'[^\W_]+')
+
+def normalize(text: str) -> str:
+    """Case-fold and strip diacritics, the way the SQLite index's unicode61 tokenizer does"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def query_terms(query: str) -> List[str]:
+    """Split a search query into normalized terms"""
+    return WORD.findall(normalize(query))
+
+def fts_query(query: str) -> Optional[str]:
+    """Turn a search box query into an FTS5 MATCH expression: every term, the last as a prefix
+
+    Terms are quoted, so operators and punctuation in the user's query are
+    searched for as text instead of being parsed as FTS5 syntax.
+    """
+    terms = WORD.findall(query)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + ('*' if len(terms[-1]) >= MIN_PREFIX else '')
+
+class InvertedIndex:
+    """In-process full-text index of messages, ranked with BM25
+
+    Every term maps to the messages containing it and how often, so a query
+    only touches the postings of its own terms. The last query term matches
+    as a prefix (from MIN_PREFIX characters), like the SQLite FTS5 index, so
+    results appear while typing.
+    """
+    
+    K1 = 1.2
+    B = 0.75
+    
+    def __init__(self):
+        self._postings = {}  # term -> {message_id: term frequency}
+        self._lengths = {}  # message_id -> number of terms
+        self._total_length = 0
+    
+    def add(self, message_id: int, text: str):
+        terms = query_terms(text)
+        self._lengths[message_id] = len(terms)
+        self._total_length += len(terms)
+        for term in terms:
+            postings = self._postings.setdefault(term, {})
+            postings[message_id] = postings.get(message_id, 0) + 1
+    
+    def remove(self, message_id: int, text: str):
+        self._total_length -= self._lengths.pop(message_id, 0)
+        for term in set(query_terms(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(message_id, None)
+                if not postings:
+                    del self._postings[term]
+    
+    def search(self, query: str) -> List[Tuple[float, int]]:
+        """Return (score, message_id) of the messages that contain every query term, best first"""
+        terms = query_terms(query)
+        if not terms or not self._lengths:
+            return []
+        
+        # The last term matches as a prefix, merging the postings of every term it starts
+        prefix = terms[-1]
+        if len(prefix) < MIN_PREFIX:
+            expanded = self._postings.get(prefix, {})
+        else:
+            expanded = {}
+            for term, postings in self._postings.items():
+                if term.startswith(prefix):
+                    for message_id, frequency in postings.items():
+                        expanded[message_id] = expanded.get(message_id, 0) + frequency
+        term_postings = [self._postings.get(term, {}) for term in terms[:-1]] + [expanded]
+        
+        # Intersect starting from the rarest term
+        ordered = sorted(term_postings, key=len)
+        matches = set(ordered[0])
+        for postings in ordered[1:]:
+            matches.intersection_update(postings)
+            if not matches:
+                return []
+        
+        count = len(self._lengths)
+        average_length = self._total_length / count or 1
+        scored = []
+        for message_id in matches:
+            length_norm = self.K1 * (1 - self.B + self.B * self._lengths[message_id] / average_length)
+            score = 0.0
+            for postings in term_postings:
+                frequency = postings[message_id]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                score += idf * frequency * (self.K1 + 1) / (frequency + length_norm)
+            scored.append((score, message_id))
+        scored.sort(reverse=True)
+        return scored
+    
+    def stats(self) -> Dict[str, Any]:
+        return {'messages': len(self._lengths), 'terms': len(self._postings)}
+
+def snippet(text: str, query: str, tokens: int = SNIPPET_TOKENS) -> str:
+    """Return a window of text around the first query match, with matching words highlighted"""
+    terms = query_terms(query)
+    if not terms:
+        return text[:200]
+    words = list(WORD.finditer(text))
+    if not words:
+        return text[:200]
+    
+    def matches(word: str) -> bool:
+        word = normalize(word)
+        return word in terms or (len(terms[-1]) >= MIN_PREFIX and word.startswith(terms[-1]))
+    
+    first = next((index for index, word in enumerate(words) if matches(word.group())), 0)
+    start = max(0, first - tokens // 4)
+    end = min(len(words), start + tokens)
+    
+    parts = []
+    position = words[start].start()
+    for word in words[start:end]:
+        parts.append(text[position:word.start()])
+        parts.append(f"{HIGHLIGHT_START}{word.group()}{HIGHLIGHT_END}" if matches(word.group()) else word.group())
+        position = word.end()
+    result = ''.join(parts)
+    return ('…' if start > 0 else '') + result + ('…' if end < len(words) else '')
+
+def in_range(timestamp: Optional[str], since: Optional[str], until: Optional[str]) -> bool:
+    """Check an ISO timestamp against an optional [since, until) range"""
+    if since is not None and (timestamp is None or timestamp < since):
+        return False
+    if until is not None and (timestamp is None or timestamp >= until):
+        return False
+    return True
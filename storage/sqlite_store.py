@@ -0,0 +1,391 @@
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from .base import SessionStore
+from .search import HIGHLIGHT_END, HIGHLIGHT_START, SNIPPET_TOKENS, fts_query, snippet
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions (created_at DESC);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT,
+    model TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id);
+CREATE TABLE IF NOT EXISTS store_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    list_version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta (id, list_version) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS sessions_inserted AFTER INSERT ON sessions
+BEGIN UPDATE store_meta SET list_version = list_version + 1; END;
+CREATE TRIGGER IF NOT EXISTS sessions_updated AFTER UPDATE ON sessions
+BEGIN UPDATE store_meta SET list_version = list_version + 1; END;
+CREATE TRIGGER IF NOT EXISTS sessions_deleted AFTER DELETE ON sessions
+BEGIN UPDATE store_meta SET list_version = list_version + 1; END;
+CREATE TABLE IF NOT EXISTS archived_sessions (
+    session_id TEXT PRIMARY KEY REFERENCES sessions (id) ON DELETE CASCADE,
+    message_count INTEGER NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    compressed_bytes INTEGER NOT NULL,
+    archived_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archive.session_archives (
+    session_id TEXT PRIMARY KEY,
+    contents BLOB NOT NULL
+);
+"""
+
+# Full-text index over message contents, kept in step with the messages table by triggers
+# (deleting a session cascades to its messages, which fires the delete trigger)
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE messages_fts USING fts5(
+    content, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER messages_fts_inserted AFTER INSERT ON messages
+BEGIN INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content); END;
+CREATE TRIGGER messages_fts_deleted AFTER DELETE ON messages
+BEGIN INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END;
+INSERT INTO messages_fts (messages_fts) VALUES ('rebuild');
+"""
+
+class SQLiteSessionStore(SessionStore):
+    """Session store backed by a SQLite database
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    readers never block the writer. Appending a message is a single indexed
+    insert plus a counter update on the session row. Triggers bump a list
+    version on every session change, so conditional requests for the
+    session list are answered without reading it, and keep an FTS5 index of
+    message contents up to date for search.
+
+    Idle sessions can be archived: their message contents move, compressed,
+    into a separate archive database and the hot database keeps only the
+    session and message metadata (and the search index, so archived
+    sessions still turn up in search). Reading or appending to an archived
+    session restores its contents first.
+    """
+    
+    supports_archive = True
+    
+    def __init__(self, path: str = 'chat_sessions.db', archive_path: Optional[str] = None):
+        self.path = path
+        self.archive_path = archive_path or os.path.splitext(path)[0] + '.archive.db'
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+        self.searchable = self._create_search_index()
+        self.archived = 0  # sessions archived and restored by this process
+        self.restored = 0
+    
+    def _create_search_index(self) -> bool:
+        """Create the full-text index on first use, indexing the messages already stored"""
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone():
+            return True
+        try:
+            # One transaction, so concurrent workers never see a half-built index
+            conn.executescript('BEGIN IMMEDIATE;' + SEARCH_SCHEMA + 'COMMIT;')
+            return True
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if 'already exists' in str(e):
+                return True  # another worker created it first
+            print(f"Full-text search unavailable (SQLite built without FTS5?): {e}")
+            return False
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection for the current thread, opening it if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            conn.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+            conn.execute('PRAGMA archive.journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+    
+    def create_session(self, session_id: str, title: str, created_at: str) -> Dict[str, Any]:
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT INTO sessions (id, title, created_at) VALUES (?, ?, ?)',
+                (session_id, title, created_at)
+            )
+        return {'id': session_id, 'title': title, 'created_at': created_at, 'message_count': 0}
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            'SELECT id, title, created_at, message_count FROM sessions WHERE id = ?',
+            (session_id,)
+        ).fetchone()
+        return dict(row) if row else None
+    
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            'SELECT id, title, created_at, message_count FROM sessions ORDER BY created_at DESC'
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def list_version(self) -> int:
+        return self._connection().execute('SELECT list_version FROM store_meta').fetchone()[0]
+    
+    def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        self._restore(session_id)
+        rows = self._connection().execute(
+            'SELECT id, role, content, timestamp, model FROM messages WHERE session_id = ? ORDER BY id',
+            (session_id,)
+        ).fetchall()
+        return [self._row_to_message(row) for row in rows]
+    
+    def get_message_page(self, session_id: str, since: Optional[int] = None, before: Optional[int] = None,
+                         limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        self._restore(session_id)
+        # One extra row tells whether the page is the last one
+        fetch = -1 if limit is None else limit + 1
+        if since is not None:
+            rows = self._connection().execute(
+                'SELECT id, role, content, timestamp, model FROM messages '
+                'WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?',
+                (session_id, since, fetch)
+            ).fetchall()
+            has_more = limit is not None and len(rows) > limit
+            rows = rows[:limit]
+        else:
+            rows = self._connection().execute(
+                'SELECT id, role, content, timestamp, model FROM messages '
+                'WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?',
+                (session_id, before if before is not None else 2 ** 63 - 1, fetch)
+            ).fetchall()
+            has_more = limit is not None and len(rows) > limit
+            rows = rows[:limit][::-1]
+        return [self._row_to_message(row) for row in rows], has_more
+    
+    def last_message_id(self, session_id: str, model: Optional[str] = None) -> Optional[int]:
+        self._restore(session_id)
+        # Walks the (session_id, id) index backwards and stops at the first match
+        if model is None:
+            row = self._connection().execute(
+                'SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT 1',
+                (session_id,)
+            ).fetchone()
+        else:
+            row = self._connection().execute(
+                'SELECT id FROM messages WHERE session_id = ? AND model = ? ORDER BY id DESC LIMIT 1',
+                (session_id, model)
+            ).fetchone()
+        return row['id'] if row else None
+    
+    def append_message(self, session_id: str, message: Dict[str, Any]) -> int:
+        self._restore(session_id)
+        with self._connection() as conn:
+            cursor = conn.execute(
+                'UPDATE sessions SET message_count = message_count + 1 WHERE id = ?',
+                (session_id,)
+            )
+            if cursor.rowcount == 0:
+                raise KeyError(f"Chat session not found: {session_id}")
+            cursor = conn.execute(
+                'INSERT INTO messages (session_id, role, content, timestamp, model) VALUES (?, ?, ?, ?, ?)',
+                (session_id, message['role'], message['content'], message.get('timestamp'), message.get('model'))
+            )
+            message['id'] = cursor.lastrowid
+            row = conn.execute('SELECT message_count FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return row['message_count']
+    
+    def update_title(self, session_id: str, title: str):
+        with self._connection() as conn:
+            conn.execute('UPDATE sessions SET title = ? WHERE id = ?', (title, session_id))
+    
+    def delete_session(self, session_id: str) -> bool:
+        # The search index can only drop a message given its original content
+        self._restore(session_id)
+        with self._connection() as conn:
+            cursor = conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+        return cursor.rowcount > 0
+    
+    def search(self, query: str, model: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        if not self.searchable:
+            return super().search(query, model, since, until, limit)
+        match = fts_query(query)
+        if match is None:
+            return []
+        
+        conditions = ['messages_fts MATCH ?']
+        params = [match]
+        for condition, value in (('m.model = ?', model), ('m.timestamp >= ?', since), ('m.timestamp < ?', until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        rows = self._connection().execute(
+            'SELECT m.id, m.session_id, s.title, m.role, m.model, m.timestamp, '
+            f"snippet(messages_fts, 0, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet, bm25(messages_fts) AS rank "
+            'FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid JOIN sessions s ON s.id = m.session_id '
+            f"WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT ?",
+            [HIGHLIGHT_START, HIGHLIGHT_END] + params + [limit]
+        ).fetchall()
+        
+        # Archived messages are still indexed, but their text has to come from the archive
+        snippets = {}
+        for session_id in self._archived_among({row['session_id'] for row in rows}):
+            for message_id, content in self._archived_contents(session_id).items():
+                snippets[message_id] = snippet(content, query)
+        return [
+            {
+                'session_id': row['session_id'],
+                'session_title': row['title'],
+                'message_id': row['id'],
+                'role': row['role'],
+                'model': row['model'],
+                'timestamp': row['timestamp'],
+                'snippet': snippets.get(row['id'], row['snippet']),
+                'score': round(-row['rank'], 3)  # bm25() is lower for better matches
+            }
+            for row in rows
+        ]
+    
+    def archive_idle(self, idle_before: str, limit: int = 100) -> int:
+        rows = self._connection().execute(
+            'SELECT s.id FROM sessions s WHERE s.message_count > 0 '
+            'AND NOT EXISTS (SELECT 1 FROM archived_sessions a WHERE a.session_id = s.id) '
+            'AND (SELECT m.timestamp FROM messages m WHERE m.session_id = s.id ORDER BY m.id DESC LIMIT 1) < ? '
+            'LIMIT ?',
+            (idle_before, limit)
+        ).fetchall()
+        return sum(self.archive_session(row['id']) for row in rows)
+    
+    def archive_session(self, session_id: str) -> bool:
+        """Move a session's message contents to the archive; returns False if it changed meanwhile"""
+        conn = self._connection()
+        rows = conn.execute('SELECT id, content FROM messages WHERE session_id = ? ORDER BY id', (session_id,)).fetchall()
+        if not rows:
+            return False
+        raw = json.dumps([[row['id'], row['content']] for row in rows], ensure_ascii=False).encode()
+        contents = zlib.compress(raw, 9)
+        
+        # Write the archive copy first: WAL mode commits each database on its own, and a copy
+        # left behind by a crash is simply replaced the next time the session is archived
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO archive.session_archives (session_id, contents) VALUES (?, ?)',
+                         (session_id, contents))
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            current = conn.execute('SELECT COUNT(*), MAX(id) FROM messages WHERE session_id = ?', (session_id,)).fetchone()
+            if tuple(current) != (len(rows), rows[-1]['id']):
+                return False  # a message was appended since the contents were read
+            try:
+                conn.execute(
+                    'INSERT INTO archived_sessions (session_id, message_count, raw_bytes, compressed_bytes, archived_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (session_id, len(rows), sum(len(row['content'].encode()) for row in rows), len(contents),
+                     datetime.now().isoformat())
+                )
+            except sqlite3.IntegrityError:
+                return False  # archived by another worker
+            conn.execute("UPDATE messages SET content = '' WHERE session_id = ?", (session_id,))
+        self.archived += 1
+        return True
+    
+    def archive_stats(self) -> Optional[Dict[str, Any]]:
+        conn = self._connection()
+        archived = conn.execute(
+            'SELECT COUNT(*) AS sessions, COALESCE(SUM(message_count), 0) AS messages, '
+            'COALESCE(SUM(raw_bytes), 0) AS raw_bytes, COALESCE(SUM(compressed_bytes), 0) AS compressed_bytes '
+            'FROM archived_sessions'
+        ).fetchone()
+        total = conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return {
+            'hot_sessions': total - archived['sessions'],
+            'archived_sessions': archived['sessions'],
+            'archived_messages': archived['messages'],
+            'archived_content_bytes': archived['raw_bytes'],
+            'compressed_bytes': archived['compressed_bytes'],
+            # Logical bytes: the database file only shrinks after VACUUM (see database_free_bytes)
+            'logical_bytes_saved': archived['raw_bytes'] - archived['compressed_bytes'],
+            'compression_ratio': round(archived['raw_bytes'] / archived['compressed_bytes'], 2) if archived['compressed_bytes'] else None,
+            # Pages freed by archiving are reused for new messages; VACUUM returns them to the filesystem
+            'database_free_bytes': conn.execute('PRAGMA freelist_count').fetchone()[0] * page_size,
+            'database_bytes': self._file_size(self.path),
+            'archive_bytes': self._file_size(self.archive_path),
+            'archived': self.archived,
+            'restored': self.restored
+        }
+    
+    def _restore(self, session_id: str):
+        """Bring an archived session's message contents back into the hot database"""
+        conn = self._connection()
+        if not conn.execute('SELECT 1 FROM archived_sessions WHERE session_id = ?', (session_id,)).fetchone():
+            return
+        try:
+            contents = self._archived_contents(session_id)
+        except KeyError:
+            if not conn.execute('SELECT 1 FROM archived_sessions WHERE session_id = ?', (session_id,)).fetchone():
+                return  # restored by another worker meanwhile
+            raise
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('DELETE FROM archived_sessions WHERE session_id = ?', (session_id,)).rowcount == 0:
+                return  # restored by another thread or worker
+            conn.executemany(
+                'UPDATE messages SET content = ? WHERE id = ?',
+                [(content, message_id) for message_id, content in contents.items()]
+            )
+        with conn:
+            conn.execute('DELETE FROM archive.session_archives WHERE session_id = ?', (session_id,))
+        self.restored += 1
+    
+    def _archived_contents(self, session_id: str) -> Dict[int, str]:
+        row = self._connection().execute(
+            'SELECT contents FROM archive.session_archives WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Archived chat session missing from {self.archive_path}: {session_id}")
+        return {message_id: content for message_id, content in json.loads(zlib.decompress(row['contents']))}
+    
+    def _archived_among(self, session_ids) -> List[str]:
+        session_ids = list(session_ids)
+        if not session_ids:
+            return []
+        rows = self._connection().execute(
+            f"SELECT session_id FROM archived_sessions WHERE session_id IN ({', '.join('?' * len(session_ids))})",
+            session_ids
+        ).fetchall()
+        return [row['session_id'] for row in rows]
+    
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    
+    @staticmethod
+    def _row_to_message(row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a message row into the message dict served by the API"""
+        message = {
+            'id': row['id'],
+            'role': row['role'],
+            'content': row['content'],
+            'timestamp': row['timestamp']
+        }
+        if row['model'] is not None:
+            message['model'] = row['model']
+        return message
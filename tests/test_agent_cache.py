@@ -0,0 +1,46 @@
+import time
+from agent.cache import AgentCache
+
+def build(name, built):
+    def factory():
+        built.append(name)
+        return object()
+    return factory
+
+def test_least_recently_used_agent_is_evicted():
+    cache = AgentCache(capacity=2)
+    built = []
+    first = cache.get_or_create('a', build('a', built))
+    cache.get_or_create('b', build('b', built))
+    assert cache.get_or_create('a', build('a', built)) is first  # 'a' becomes most recently used
+    cache.get_or_create('c', build('c', built))
+    
+    assert len(cache) == 2
+    assert cache.get_or_create('a', build('a', built)) is first
+    assert built == ['a', 'b', 'c']
+    
+    # 'b' was evicted and is rebuilt on its next use
+    cache.get_or_create('b', build('b', built))
+    assert built == ['a', 'b', 'c', 'b']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 4, 2)
+
+def test_idle_agents_expire_and_are_rebuilt():
+    cache = AgentCache(capacity=10, idle_ttl=0.05)
+    built = []
+    first = cache.get_or_create('a', build('a', built))
+    time.sleep(0.1)
+    assert cache.get_or_create('a', build('a', built)) is not first
+    assert built == ['a', 'a']
+    assert cache.stats()['expirations'] == 1
+
+def test_invalidate_drops_matching_agents():
+    cache = AgentCache()
+    built = []
+    for key in [('s1', 'openai', 'm'), ('s2', 'openai', 'm'), ('s1', 'claude', 'm')]:
+        cache.get_or_create(key, build(key, built))
+    
+    assert cache.invalidate(lambda key: key[1] == 'openai') == 2
+    assert len(cache) == 1
+    cache.get_or_create(('s1', 'openai', 'm'), build('rebuilt', built))
+    assert built[-1] == 'rebuilt'
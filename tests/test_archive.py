@@ -0,0 +1,72 @@
+import pytest
+from storage.search import HIGHLIGHT_END, HIGHLIGHT_START
+from storage.sqlite_store import SQLiteSessionStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    store.create_session('old', 'Old chat', '2026-01-01T00:00:00')
+    store.append_message('old', {'role': 'user', 'content': 'Tell me about zeppelins', 'timestamp': '2026-01-01T00:00:00'})
+    store.append_message('old', {'role': 'assistant', 'content': 'Zeppelins are rigid airships.',
+                                 'timestamp': '2026-01-01T00:00:01', 'model': 'openai/gpt'})
+    store.create_session('new', 'New chat', '2026-03-01T00:00:00')
+    store.append_message('new', {'role': 'user', 'content': 'Tell me about submarines', 'timestamp': '2026-03-01T00:00:00'})
+    return store
+
+def hot_contents(store, session_id):
+    rows = store._connection().execute('SELECT content FROM messages WHERE session_id = ? ORDER BY id', (session_id,))
+    return [row['content'] for row in rows]
+
+def test_idle_sessions_are_archived(store):
+    assert store.archive_idle('2026-02-01T00:00:00') == 1
+    assert hot_contents(store, 'old') == ['', '']
+    assert hot_contents(store, 'new') == ['Tell me about submarines']
+    
+    stats = store.archive_stats()
+    assert (stats['hot_sessions'], stats['archived_sessions'], stats['archived_messages']) == (1, 1, 2)
+    assert stats['archived_content_bytes'] == len('Tell me about zeppelins') + len('Zeppelins are rigid airships.')
+    # Already archived sessions are skipped
+    assert store.archive_idle('2026-02-01T00:00:00') == 0
+
+def test_reading_an_archived_session_restores_it(store):
+    expected = store.get_messages('old')
+    store.archive_idle('2026-02-01T00:00:00')
+    
+    assert store.get_session('old')['message_count'] == 2  # metadata stays hot
+    assert store.get_messages('old') == expected
+    assert hot_contents(store, 'old') == ['Tell me about zeppelins', 'Zeppelins are rigid airships.']
+    assert store.archive_stats()['archived_sessions'] == 0
+    assert store._connection().execute('SELECT COUNT(*) FROM archive.session_archives').fetchone()[0] == 0
+
+def test_appending_to_an_archived_session_restores_it_first(store):
+    store.archive_idle('2026-02-01T00:00:00')
+    store.append_message('old', {'role': 'user', 'content': 'And blimps?', 'timestamp': '2026-03-02T00:00:00'})
+    assert [message['content'] for message in store.get_messages('old')] == [
+        'Tell me about zeppelins', 'Zeppelins are rigid airships.', 'And blimps?'
+    ]
+
+def test_archived_sessions_stay_searchable(store):
+    store.archive_idle('2026-02-01T00:00:00')
+    hits = store.search('airships')
+    assert [hit['session_id'] for hit in hits] == ['old']
+    assert f"{HIGHLIGHT_START}airships{HIGHLIGHT_END}" in hits[0]['snippet']
+    # Searching does not restore the session
+    assert store.archive_stats()['archived_sessions'] == 1
+
+def test_deleting_an_archived_session_clears_the_index_and_archive(store):
+    store.archive_idle('2026-02-01T00:00:00')
+    assert store.delete_session('old')
+    
+    assert store.search('zeppelins') == []
+    assert store.get_session('old') is None
+    assert store.archive_stats()['archived_sessions'] == 0
+    assert store._connection().execute('SELECT COUNT(*) FROM archive.session_archives').fetchone()[0] == 0
+    # The index is consistent with its content table
+    store._connection().execute("INSERT INTO messages_fts (messages_fts) VALUES ('integrity-check')")
+
+def test_archive_survives_reopening_the_database(store, tmp_path):
+    store.archive_idle('2026-02-01T00:00:00')
+    reopened = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    assert [message['content'] for message in reopened.get_messages('old')] == [
+        'Tell me about zeppelins', 'Zeppelins are rigid airships.'
+    ]
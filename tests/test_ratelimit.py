@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from provider.ratelimit import AdmissionController, RateLimitExceeded, TokenBucket
+
+def empty_controller(**kwargs) -> AdmissionController:
+    controller = AdmissionController(requests_per_minute=600, **kwargs)
+    controller.request_bucket.tokens = 0
+    return controller
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1, bucket.updated) == pytest.approx(1.0)
+    assert bucket.wait_time(1, bucket.updated + 1.0) == 0.0
+
+def test_requests_within_the_limit_are_admitted_immediately():
+    controller = AdmissionController(requests_per_minute=2)
+    assert controller.try_acquire(10)
+    assert controller.try_acquire(10)
+    assert not controller.try_acquire(10)
+    assert controller.stats()['admitted'] == 2
+
+def test_queue_is_served_round_robin_across_sessions():
+    controller = empty_controller()
+    admitted = []
+    
+    async def request(session_id, label):
+        await controller.aacquire(session_id, 1)
+        admitted.append(label)
+    
+    async def main():
+        tasks = []
+        for session_id, label in [('a', 'a1'), ('a', 'a2'), ('a', 'a3'), ('b', 'b1'), ('c', 'c1')]:
+            tasks.append(asyncio.create_task(request(session_id, label)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+    
+    asyncio.run(main())
+    assert admitted == ['a1', 'b1', 'c1', 'a2', 'a3']
+    assert controller.stats()['queue_depth'] == 0
+
+def test_full_queue_rejects_requests():
+    controller = empty_controller(max_queue=2)
+    
+    async def main():
+        waiting = [asyncio.create_task(controller.aacquire(session_id, 1)) for session_id in ('a', 'b')]
+        await asyncio.sleep(0.01)
+        assert controller.stats()['queue_depth'] == 2
+        with pytest.raises(RateLimitExceeded, match='queue is full'):
+            await controller.aacquire('c', 1)
+        with pytest.raises(RateLimitExceeded, match='queue is full'):
+            controller.acquire('c', 1)
+        await asyncio.gather(*waiting)
+    
+    asyncio.run(main())
+    stats = controller.stats()
+    assert (stats['admitted'], stats['rejected'], stats['queue_depth']) == (2, 2, 0)
+
+def test_requests_waiting_longer_than_max_wait_are_rejected():
+    controller = AdmissionController(requests_per_minute=1, max_wait=0.1)
+    controller.request_bucket.tokens = 0
+    with pytest.raises(RateLimitExceeded, match='not admitted'):
+        controller.acquire('a', 1)
+    with pytest.raises(RateLimitExceeded, match='not admitted'):
+        asyncio.run(controller.aacquire('a', 1))
+    assert controller.stats()['queue_depth'] == 0
+
+def test_cancelled_waiter_leaves_the_queue():
+    controller = empty_controller()
+    
+    async def main():
+        waiter = asyncio.create_task(controller.aacquire('a', 1))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        assert controller.stats()['queue_depth'] == 0
+        await controller.aacquire('b', 1)
+    
+    asyncio.run(main())
+    assert controller.stats()['admitted'] == 1
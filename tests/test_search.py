@@ -0,0 +1,62 @@
+import pytest
+from storage.memory_store import MemorySessionStore
+from storage.search import HIGHLIGHT_END, HIGHLIGHT_START, InvertedIndex, fts_query, snippet
+from storage.sqlite_store import SQLiteSessionStore
+
+def test_fts_query_quotes_terms_and_prefixes_the_last():
+    assert fts_query('rate limit') == '"rate" "limit"*'
+    assert fts_query('OR "x" NEAR(') == '"OR" "x" "NEAR"*'
+    assert fts_query('go to') == '"go" "to"'  # too short for a prefix match
+    assert fts_query('?!') is None
+
+def test_inverted_index_matches_every_term_and_ranks_with_bm25():
+    index = InvertedIndex()
+    index.add(1, 'The quick brown fox jumps over the lazy dog')
+    index.add(2, 'Quick fox, quick fox')
+    index.add(3, 'Brown bread')
+    
+    assert [message_id for _, message_id in index.search('quick fox')] == [2, 1]
+    assert [message_id for _, message_id in index.search('brow')] == [3, 1]  # last term as a prefix
+    assert index.search('Café') == []
+    
+    index.add(4, 'CAFÉ au lait')
+    assert [message_id for _, message_id in index.search('cafe')] == [4]
+    
+    index.remove(2, 'Quick fox, quick fox')
+    assert [message_id for _, message_id in index.search('quick')] == [1]
+    assert index.stats()['messages'] == 3
+
+def test_snippet_highlights_matches_with_delimiters_outside_markdown():
+    text = 'Use **bold** for widget names'
+    assert snippet(text, 'widget') == f"Use **bold** for {HIGHLIGHT_START}widget{HIGHLIGHT_END} names"
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemorySessionStore()
+    return SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+
+def add_conversation(store):
+    store.create_session('s1', 'Deploy', '2026-01-01T00:00:00')
+    store.append_message('s1', {'role': 'user', 'content': 'How do I deploy with gunicorn?', 'timestamp': '2026-01-01T00:00:00'})
+    store.append_message('s1', {'role': 'assistant', 'content': 'Run gunicorn with four workers.',
+                                'timestamp': '2026-01-01T00:00:01', 'model': 'openai/gpt'})
+    store.create_session('s2', 'Cooking', '2026-02-01T00:00:00')
+    store.append_message('s2', {'role': 'user', 'content': 'A recipe for bread, not gunicorn', 'timestamp': '2026-02-01T00:00:00'})
+
+def test_store_search_filters_by_model_and_date(store):
+    add_conversation(store)
+    
+    assert {hit['session_id'] for hit in store.search('gunicorn')} == {'s1', 's2'}
+    hits = store.search('gunicorn', model='openai/gpt')
+    assert [(hit['session_id'], hit['role']) for hit in hits] == [('s1', 'assistant')]
+    assert HIGHLIGHT_START + 'gunicorn' + HIGHLIGHT_END in hits[0]['snippet']
+    assert [hit['session_id'] for hit in store.search('gunicorn', since='2026-01-15')] == ['s2']
+    assert store.search('gunicorn', until='2026-01-01T00:00:00') == []
+    assert len(store.search('gunicorn', limit=1)) == 1
+
+def test_deleted_sessions_leave_the_index(store):
+    add_conversation(store)
+    assert store.delete_session('s1')
+    assert [hit['session_id'] for hit in store.search('gunicorn')] == ['s2']
+    assert store.search('workers') == []
@@ -0,0 +1,55 @@
+from agent.history import SessionLog, SessionLogs
+
+def message(id, role, content, model=None):
+    return {'id': id, 'role': role, 'content': content, 'timestamp': None, 'model': model}
+
+def contents(messages):
+    return [message.content for message in messages]
+
+def test_view_pairs_each_question_with_the_models_own_answer():
+    log = SessionLog([
+        message(1, 'user', 'q1'),
+        message(2, 'assistant', 'gpt a1', 'openai/gpt'),
+        message(3, 'assistant', 'claude a1', 'claude/sonnet'),
+        message(4, 'user', 'q2'),
+        message(5, 'assistant', 'gpt a2', 'openai/gpt'),
+        message(6, 'user', 'q3'),
+        message(7, 'assistant', 'gpt a3', 'openai/gpt'),
+    ])
+    
+    assert contents(log.view('openai/gpt')) == ['q1', 'gpt a1', 'q2', 'gpt a2', 'q3', 'gpt a3']
+    # A model sees another model's answer where it did not answer, but not for the latest question
+    assert contents(log.view('claude/sonnet')) == ['q1', 'claude a1', 'q2', 'gpt a2', 'q3']
+
+def test_append_skips_messages_already_in_the_log():
+    logs = SessionLogs()
+    log = logs.get('s', lambda: [message(1, 'user', 'q1')])
+    logs.record('s', message(1, 'user', 'q1'))
+    logs.record('s', message(2, 'assistant', 'a1', 'openai/gpt'))
+    assert contents(log.view('openai/gpt')) == ['q1', 'a1']
+
+def test_log_is_reloaded_when_the_store_is_ahead():
+    logs = SessionLogs()
+    stored = [message(1, 'user', 'q1')]
+    loads = []
+    
+    def load():
+        loads.append(1)
+        return list(stored)
+    
+    log = logs.get('s', load, version=1)
+    assert logs.get('s', load, version=1) is log
+    assert len(loads) == 1
+    
+    # Another worker appended to the session
+    stored.append(message(2, 'assistant', 'a1', 'openai/gpt'))
+    assert logs.get('s', load, version=2) is log
+    assert len(loads) == 2
+    assert contents(log.view('openai/gpt')) == ['q1', 'a1']
+
+def test_log_lives_only_while_referenced():
+    logs = SessionLogs()
+    log = logs.get('s', lambda: [message(1, 'user', 'q1')])
+    assert logs.stats() == {'sessions': 1, 'messages': 1}
+    del log
+    assert logs.stats() == {'sessions': 0, 'messages': 0}
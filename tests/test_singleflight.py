@@ -0,0 +1,198 @@
+import asyncio
+import threading
+import time
+import pytest
+from provider.base import BaseProvider
+from provider.singleflight import CoalescingProvider, SingleFlight
+
+def test_do_coalesces_concurrent_calls():
+    group = SingleFlight()
+    calls = []
+    release = threading.Event()
+    
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do('key', fn))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert results == ['answer'] * 5
+    assert len(calls) == 1
+    assert group.stats() == {'in_flight': 0, 'upstream_calls': 1, 'coalesced_calls': 4}
+
+def test_do_propagates_errors_to_followers():
+    group = SingleFlight()
+    release = threading.Event()
+    
+    def fn():
+        release.wait(5)
+        raise ValueError('upstream failed')
+    
+    errors = []
+    
+    def call():
+        try:
+            group.do('key', fn)
+        except ValueError as e:
+            errors.append(str(e))
+    
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == ['upstream failed'] * 3
+    assert group.stats()['in_flight'] == 0
+
+def test_stream_followers_replay_and_follow():
+    group = SingleFlight()
+    
+    def upstream():
+        yield 'a'
+        yield 'b'
+    
+    leader = group.stream('key', upstream)
+    assert next(leader) == 'a'
+    follower = group.stream('key', upstream)
+    assert next(follower) == 'a'
+    assert list(leader) == ['b']
+    assert list(follower) == ['b']
+    assert group.stats()['upstream_calls'] == 1
+
+def test_ado_coalesces_and_propagates_errors():
+    group = SingleFlight()
+    calls = []
+    
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'answer'
+    
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise ValueError('upstream failed')
+    
+    async def main():
+        assert await asyncio.gather(*(group.ado('ok', answer) for _ in range(4))) == ['answer'] * 4
+        results = await asyncio.gather(*(group.ado('bad', fail) for _ in range(2)), return_exceptions=True)
+        assert [str(result) for result in results] == ['upstream failed'] * 2
+    
+    asyncio.run(main())
+    assert len(calls) == 1
+    assert group.stats() == {'in_flight': 0, 'upstream_calls': 2, 'coalesced_calls': 4}
+
+def test_ado_follower_survives_leader_cancellation():
+    group = SingleFlight()
+    
+    async def answer():
+        await asyncio.sleep(0.1)
+        return 'answer'
+    
+    async def main():
+        leader = asyncio.create_task(group.ado('key', answer))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(group.ado('key', answer))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == 'answer'
+        assert leader.cancelled()
+    
+    asyncio.run(main())
+    assert group.stats()['in_flight'] == 0
+
+def test_astream_follower_survives_leader_cancellation():
+    group = SingleFlight()
+    
+    async def upstream():
+        for delta in ('a', 'b', 'c'):
+            await asyncio.sleep(0.02)
+            yield delta
+    
+    async def read():
+        return [delta async for delta in group.astream('key', upstream)]
+    
+    async def main():
+        leader = asyncio.create_task(read())
+        await asyncio.sleep(0.03)
+        follower = asyncio.create_task(read())
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == ['a', 'b', 'c']
+    
+    asyncio.run(main())
+    assert group.stats()['in_flight'] == 0
+
+def test_astream_cancelled_leader_does_not_block_later_streams():
+    group = SingleFlight()
+    
+    async def upstream():
+        for delta in ('a', 'b'):
+            await asyncio.sleep(0.05)
+            yield delta
+    
+    async def read():
+        return [delta async for delta in group.astream('key', upstream)]
+    
+    async def main():
+        leader = asyncio.create_task(read())
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await asyncio.sleep(0)
+        assert group.stats()['in_flight'] == 0
+        assert await asyncio.wait_for(read(), 2) == ['a', 'b']
+    
+    asyncio.run(main())
+    assert group.stats() == {'in_flight': 0, 'upstream_calls': 2, 'coalesced_calls': 0}
+
+class StubProvider(BaseProvider):
+    def __init__(self, api_key, base_url=None):
+        super().__init__(api_key, 'model')
+        if base_url:
+            self.base_url = base_url
+        self.calls = 0
+    
+    def generate_response(self, message, **kwargs):
+        self.calls += 1
+        time.sleep(0.1)
+        return f"answer for {self.api_key}"
+    
+    def stream_response(self, message, **kwargs):
+        yield self.generate_response(message, **kwargs)
+    
+    def validate_model(self):
+        return True
+    
+    @property
+    def provider_name(self):
+        return 'stub'
+
+def test_coalescing_is_scoped_to_the_account():
+    group = SingleFlight()
+    providers = [StubProvider('key-1'), StubProvider('key-2'), StubProvider('key-1', 'https://proxy.example')]
+    results = [None] * len(providers)
+    
+    def call(index):
+        results[index] = CoalescingProvider(providers[index], group).generate_response('hello')
+    
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(providers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results == ['answer for key-1', 'answer for key-2', 'answer for key-1']
+    assert [provider.calls for provider in providers] == [1, 1, 1]
+    assert group.stats()['coalesced_calls'] == 0